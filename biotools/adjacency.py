@@ -0,0 +1,175 @@
+"""Adjacency graph of polygons and its connected components.
+
+Two polygons are adjacent if their interiors overlap or they share a boundary
+of positive length, which is when dissolving merges them into one part.
+Polygons touching only at corners are not adjacent. The graph is built once
+with a spatial index and can be saved, so that metrics based on adjacency do
+not have to build dissolved geometries. After edits of a few polygons, it is
+updated by finding the edges of the edited polygons only.
+"""
+import json
+from os import PathLike
+from pathlib import Path
+from typing import NamedTuple, Optional, Sequence, Union
+
+import numpy as np
+import pandas as pd
+import shapely
+
+
+class AdjacencyGraph(NamedTuple):
+    """Undirected graph whose nodes are polygons, identified by `bt_ids`.
+
+    `edges` is an int64 array of shape (edge count, 2) of node indices, each
+    pair once with the smaller index first. `digests` identifies the content
+    of the polygon of each node, if it is known, so that the graph can be
+    updated after edits.
+    """
+
+    bt_ids: np.ndarray
+    edges: np.ndarray
+    digests: Optional[np.ndarray] = None
+
+    def subgraph(self, is_selected: np.ndarray) -> "AdjacencyGraph":
+        """Gets graph of selected nodes, numbered in their order."""
+        indices = np.cumsum(is_selected) - 1
+        is_kept = is_selected[self.edges].all(axis=1)
+        return AdjacencyGraph(
+            self.bt_ids[is_selected],
+            indices[self.edges[is_kept]],
+            None if self.digests is None else self.digests[is_selected],
+        )
+
+    def components(self) -> np.ndarray:
+        """Gets the smallest node index of the component of each node."""
+        return connected_components(len(self.bt_ids), self.edges)
+
+    def save(self, npz: Union[str, PathLike], key=None) -> Path:
+        """Saves graph as .npz file, with `key` to validate it at load."""
+        npz = Path(npz)
+        arrays = {"bt_ids": self.bt_ids.astype(str), "edges": self.edges}
+        if self.digests is not None:
+            arrays["digests"] = self.digests.astype(str)
+        np.savez(npz, key=json.dumps(key), **arrays)
+        return npz
+
+    @classmethod
+    def load(
+        cls, npz: Union[str, PathLike], key=None, any_key: bool = False
+    ) -> "AdjacencyGraph":
+        """Loads graph saved with `key`, or with any key if `any_key` is `True`.
+        Gets `None` if it was saved with another key or cannot be read.
+        """
+        try:
+            with np.load(npz) as data:
+                if not any_key and str(data["key"]) != json.dumps(key):
+                    return None
+                digests = data["digests"].astype(object) if "digests" in data else None
+                return cls(data["bt_ids"].astype(object), data["edges"], digests)
+        except (OSError, KeyError, ValueError):
+            return None
+
+
+def _find_edges(geometries, is_node, batch_size):
+    """Finds edges of polygons where `is_node` is `True` to any polygon, each
+    with the smaller index first.
+
+    Candidate pairs are found with an STRtree, and kept if their DE-9IM
+    relation shows overlapping interiors or a shared boundary line.
+    """
+    nodes = np.flatnonzero(is_node)
+    tree = shapely.STRtree(geometries)
+    lefts, rights = tree.query(geometries[nodes], predicate="intersects")
+    lefts = nodes[lefts]
+    # pairs of two nodes are found from both ends, and kept once
+    is_pair = (lefts < rights) | ((lefts != rights) & ~is_node[rights])
+    lefts, rights = lefts[is_pair], rights[is_pair]
+
+    is_adjacent = np.zeros(len(lefts), dtype=bool)
+    for start in range(0, len(lefts), batch_size):
+        batch = slice(start, start + batch_size)
+        is_adjacent[batch] = shapely.relate_pattern(
+            geometries[lefts[batch]], geometries[rights[batch]], "T********"
+        ) | shapely.relate_pattern(
+            geometries[lefts[batch]], geometries[rights[batch]], "****1****"
+        )
+    edges = np.column_stack([lefts[is_adjacent], rights[is_adjacent]])
+    return np.sort(edges, axis=1).astype(np.int64)
+
+
+def build_graph(
+    geometries: Sequence,
+    bt_ids: Sequence,
+    batch_size: int = 100_000,
+    digests: Sequence = None,
+) -> AdjacencyGraph:
+    """Builds adjacency graph of polygons, with `digests` of them if given."""
+    geometries = np.asarray(geometries, dtype=object)
+    edges = _find_edges(geometries, np.ones(len(geometries), dtype=bool), batch_size)
+    return AdjacencyGraph(
+        np.asarray(bt_ids, dtype=object),
+        edges,
+        None if digests is None else np.asarray(digests, dtype=object),
+    )
+
+
+def update_graph(
+    previous: AdjacencyGraph,
+    geometries: Sequence,
+    bt_ids: Sequence,
+    digests: Sequence,
+    batch_size: int = 100_000,
+) -> AdjacencyGraph:
+    """Updates adjacency graph of polygons after some of them were edited.
+
+    Polygons whose BT_ID and digest are the same as in `previous` keep their
+    edges among themselves, and edges of the others are found again. It is
+    the same graph as `build_graph` makes, with edges in another order.
+    """
+    geometries = np.asarray(geometries, dtype=object)
+    bt_ids = np.asarray(bt_ids, dtype=object)
+    digests = np.asarray(digests, dtype=object)
+    if previous.digests is None:
+        return build_graph(geometries, bt_ids, batch_size, digests)
+
+    positions = pd.Index(bt_ids).get_indexer(previous.bt_ids)
+    is_kept = positions >= 0
+    is_kept[is_kept] = digests[positions[is_kept]] == previous.digests[is_kept]
+    is_changed = np.ones(len(bt_ids), dtype=bool)
+    is_changed[positions[is_kept]] = False
+
+    kept_edges = previous.edges[is_kept[previous.edges].all(axis=1)]
+    edges = np.concatenate(
+        [
+            np.sort(positions[kept_edges], axis=1).reshape(-1, 2),
+            _find_edges(geometries, is_changed, batch_size),
+        ]
+    )
+    return AdjacencyGraph(bt_ids, edges.astype(np.int64), digests)
+
+
+def connected_components(node_count: int, edges: np.ndarray) -> np.ndarray:
+    """Labels connected components with union-find.
+
+    All edges are processed together: the root of each endpoint is hooked to
+    the smaller root, and paths are compressed by pointer jumping, until every
+    edge joins nodes with the same root.
+
+    Returns:
+        The smallest node index of the component of each node.
+    """
+    parents = np.arange(node_count)
+    edges = np.asarray(edges, dtype=np.int64).reshape(-1, 2)
+    while True:
+        roots = parents[edges]
+        is_split = roots[:, 0] != roots[:, 1]
+        if not is_split.any():
+            return parents
+        roots = roots[is_split]
+        edges = edges[is_split]
+        np.minimum.at(parents, roots.max(axis=1), roots.min(axis=1))
+        while True:
+            grandparents = parents[parents]
+            if np.array_equal(grandparents, parents):
+                break
+            parents = grandparents
@@ -1,90 +1,435 @@
+"""Geoprocessing backend using arcpy."""
 import importlib.resources
-import itertools
 from os import PathLike
 from pathlib import Path
 from typing import Sequence, Union
 
 import arcpy
+import arcpy.analysis as aa
 import arcpy.management as am
+import arcpy.sa as asa
+import numpy as np
 import pandas as pd
 
+from biotools import tablecache
+from biotools.raster import combine_any, combine_mean
+from biotools.shputils import clean_join
+
 
 def _init_projection(name):
     with importlib.resources.path("biotools.res", name) as path:
         return arcpy.SpatialReference(path)
 
 
-def _init_biotope_codes():
-    with importlib.resources.path("biotools.res", "biotope_codes.csv") as path:
-        df = pd.read_csv(path)
+WGS1984_PRJ = _init_projection("GCS_WGS_1984.prj")
+ITRF2000_PRJ = _init_projection("ITRF_2000_UTM_K.prj")
 
-    result = {}
-    for large_category_code, sub_df in df.groupby("LARGE_CATEGORY_CODE"):
-        result[large_category_code] = sub_df["MEDIUM_CATEGORY_CODE"].tolist()
-    return result
 
+# ranges of object ids in each where clause of `select_records`
+SELECT_CHUNK_SIZE = 500
 
-WGS1984_PRJ = _init_projection("GCS_WGS_1984.prj")
-ITRF2000_PRJ = _init_projection("ITRF_2000_UTM_K.prj")
 
-BIOTOPE_CODES = _init_biotope_codes()
+def select_records(layer, selection):
+    """Selects records of `layer` where the boolean mask `selection` is `True`.
 
+    The mask is aligned with the records of the attribute table, so object ids
+    are taken from the table which is read, as records deleted from it leave
+    gaps in them. Runs of consecutive ids are selected by ranges, a chunk of
+    ranges at a time, to keep where clauses short.
+    """
+    table_df = shp_to_df(layer, [])
+    oid_field = table_df.index.name
+    fids = table_df.index.to_numpy()[np.asarray(selection, dtype=bool)]
+    breaks = np.flatnonzero(np.diff(fids) != 1) + 1
+    starts = fids[np.r_[0, breaks]] if len(fids) else fids
+    ends = fids[np.r_[breaks - 1, -1]] if len(fids) else fids
+    clauses = [
+        f"{oid_field} = {start}"
+        if start == end
+        else f"({oid_field} >= {start} AND {oid_field} <= {end})"
+        for start, end in zip(starts, ends)
+    ] or [f"{oid_field} = -1"]
 
-def get_medium_codes(large_codes):
-    return itertools.chain(*(BIOTOPE_CODES[large_code] for large_code in large_codes))
+    selected = str(layer)
+    for i in range(0, len(clauses), SELECT_CHUNK_SIZE):
+        selected = am.SelectLayerByAttribute(
+            selected,
+            "ADD_TO_SELECTION" if i else "NEW_SELECTION",
+            " OR ".join(clauses[i : i + SELECT_CHUNK_SIZE]),
+        )
+    return selected
 
 
-def query_isin(field, targets):
-    return " OR ".join([f"{field} = '{target}'" for target in targets])
+def read_wkb(shp):
+    """Reads features as WKB, in the coordinate system of `shp`."""
+    with arcpy.da.SearchCursor(str(shp), ["SHAPE@WKB"]) as cursor:
+        return [None if row[0] is None else bytes(row[0]) for row in cursor]
 
 
 def get_fields(layer):
     return [field.name for field in arcpy.ListFields(str(layer))]
 
 
-def shp_to_df(shp: Union[str, PathLike]):
+def shp_to_df(shp: Union[str, PathLike], fields: Sequence[str] = None):
+    """Reads attribute table indexed by object id.
+
+    If `fields` is given, only those fields are read. Tables of shapefiles
+    on disk are decoded in bulk without arcpy unless "Shape" is requested, and
+    kept in the session table cache until they change.
+    """
     shp = str(shp)
-    fields = get_fields(shp)
+    if fields is not None and "Shape" not in fields and _is_shapefile(shp):
+        return tablecache.SESSION.read_dbf(shp, fields)
+
+    all_fields = get_fields(shp)
+    fields = all_fields if fields is None else [all_fields[0], *fields]
     table = [row for row in arcpy.da.SearchCursor(shp, fields)]
     result_df = pd.DataFrame(table, columns=fields)
     result_df = result_df.set_index(fields[0])
     return result_df
 
 
+def _is_shapefile(path):
+    return path.lower().endswith(".shp") and Path(path).exists()
+
+
 def get_coordsys(layer):
     """for debug"""
     return arcpy.Describe(layer).spatialReference.name
 
 
-def clean_join(target_shp, df, result_shp, on="BT_ID"):
-    target_shp = str(target_shp)
-    result_shp = str(result_shp)
-    temp_csv = str(Path(result_shp).with_suffix(".csv"))
-    df.to_csv(temp_csv, encoding="euc-kr", index=False)
+def project(in_shp, out_shp, spatial_reference):
+    am.Project(str(in_shp), str(out_shp), spatial_reference)
+    return out_shp
+
+
+def add_id_field(shp, idfield):
+    am.CalculateField(
+        str(shp),
+        idfield,
+        f"'{idfield}!FID!'",
+        expression_type="PYTHON3",
+        field_type="TEXT",
+    )
+
+
+def spatial_join(target_shp, join_shp):
+    """Joins attributes of `join_shp` to each feature of `target_shp`."""
+    with arcpy.EnvManager(outputCoordinateSystem=WGS1984_PRJ):
+        joined = aa.SpatialJoin(str(target_shp), str(join_shp), "memory/joined")
+    result_df = shp_to_df(joined)
+    am.Delete(joined)
+    return result_df
+
+
+def locate_points(point_shp, polygon_shp, field="BT_ID"):
+    """Gets `field` of the polygon containing each point of `point_shp`.
 
-    joined = am.AddJoin(target_shp, on, temp_csv, on)
-    if Path(result_shp).exists():
-        am.Delete(result_shp)
-    am.CopyFeatures(joined, result_shp)
+    Returns:
+        Array aligned with the records of `point_shp`. Points out of every
+        polygon get `None`.
+    """
+    with arcpy.EnvManager(outputCoordinateSystem=WGS1984_PRJ):
+        joined = aa.SpatialJoin(str(point_shp), str(polygon_shp), "memory/located")
+    table = sorted(arcpy.da.SearchCursor(joined, ["TARGET_FID", field]))
     am.Delete(joined)
+    return np.array([value for _, value in table], dtype=object)
+
+
+def patch_hectares(biotope_shp, selection, targets=None):
+    """Dissolves selected biotopes into single part patches, and gets the area
+    of the patch containing each biotope in hectares.
+
+    `targets` is accepted for the same signature as the native backend, but
+    the whole selection is dissolved and every biotope is measured.
+    """
+    selected = select_records(biotope_shp, selection)
+
+    with arcpy.EnvManager(outputCoordinateSystem=WGS1984_PRJ):
+        dissolved = am.Dissolve(
+            selected,
+            "memory/dissolved",
+            multi_part="SINGLE_PART",
+        )
+    am.Delete(selected)
+
+    with arcpy.EnvManager(outputCoordinateSystem=ITRF2000_PRJ):
+        am.CalculateGeometryAttributes(
+            dissolved,
+            [["HECTARE", "AREA"]],
+            area_unit="HECTARES",
+        )
+
+    with arcpy.EnvManager(outputCoordinateSystem=WGS1984_PRJ):
+        sized = aa.SpatialJoin(
+            str(biotope_shp), dissolved, "memory/sized", match_option="WITHIN"
+        )
+    am.Delete(dissolved)
+
+    result_df = shp_to_df(sized, ["BT_ID", "HECTARE"])
+    am.Delete(sized)
+    return result_df
+
+
+def tabulate_buffer_intersection(
+    biotope_shp, selection, buffer_distance, targets=None
+):
+    """Gets the area and percentage of each buffered biotope covered by the
+    dissolved selected biotopes.
+
+    If the boolean mask `targets` is given, only those biotopes are buffered.
+    """
+    is_buffered = selection if targets is None else np.logical_and(selection, targets)
+    buffered = select_records(biotope_shp, is_buffered)
+    with arcpy.EnvManager(outputCoordinateSystem=ITRF2000_PRJ):
+        buffer_layer = aa.Buffer(
+            buffered, "memory/buffer_layer", f"{buffer_distance} Meters"
+        )
+    am.Delete(buffered)
+
+    selected = select_records(biotope_shp, selection)
+
+    with arcpy.EnvManager(outputCoordinateSystem=ITRF2000_PRJ):
+        dissolved = am.Dissolve(
+            selected,
+            "memory/dissolved",
+        )
+    am.Delete(selected)
+
+    with arcpy.EnvManager(outputCoordinateSystem=ITRF2000_PRJ):
+        in_buffer_table = aa.TabulateIntersection(
+            buffer_layer,
+            "BT_ID",
+            dissolved,
+            "memory/in_buffer_table",
+            out_units="SQUARE_METERS",
+        )
+    result_df = shp_to_df(in_buffer_table)
+    am.Delete(in_buffer_table)
+    am.Delete(buffer_layer)
+    am.Delete(dissolved)
+    return result_df
+
+
+def tabulate_buffer_fraction(
+    biotope_shp, selection, buffer_distance, cellsize, targets=None
+):
+    """Approximates `tabulate_buffer_intersection` on a raster of `cellsize`.
 
-    fields = arcpy.ListFields(result_shp)
-    good_names = get_fields(target_shp) + df.columns.tolist()
-    for field, good_name in zip(fields, good_names):
-        if field.type == "OID" or field.type == "Geometry":
-            continue
-        if good_name not in get_fields(result_shp):  # skip double "BT_ID"
-            am.AddField(result_shp, good_name, field.type)
-            am.CalculateField(result_shp, good_name, f"!{field.name}!")
-        am.DeleteField(result_shp, field.name)
+    PERCENTAGE is the mean over cells of each selected biotope of the fraction
+    of selected biotopes within `buffer_distance` from the cell, and AREA is
+    PERCENTAGE of the buffer area, which is area + perimeter * distance +
+    pi * distance ** 2 for a convex biotope. If the boolean mask `targets` is
+    given, only those biotopes are summarized.
+    """
+    selected = select_records(biotope_shp, selection)
+    extent = arcpy.Describe(str(biotope_shp)).extent.projectAs(ITRF2000_PRJ)
+    extent = arcpy.Extent(
+        extent.XMin - buffer_distance,
+        extent.YMin - buffer_distance,
+        extent.XMax + buffer_distance,
+        extent.YMax + buffer_distance,
+        spatial_reference=ITRF2000_PRJ,
+    )
 
-    return result_shp
+    with arcpy.EnvManager(
+        outputCoordinateSystem=ITRF2000_PRJ, extent=extent, cellSize=cellsize
+    ):
+        green = arcpy.conversion.PolygonToRaster(
+            selected, "FID", "memory/green", cell_assignment="CELL_CENTER"
+        )
+        is_green = asa.Con(asa.IsNull(green), 0, 1)
+        fraction_raster = asa.FocalStatistics(
+            is_green, asa.NbrCircle(buffer_distance, "MAP"), "MEAN"
+        )
+    am.Delete(selected)
+    am.Delete(green)
+
+    if targets is not None:
+        selection = np.logical_and(selection, targets)
+    fraction_df = zonal_statistics(biotope_shp, fraction_raster, "MEAN", selection)
+    shape_df = pd.DataFrame(
+        arcpy.da.SearchCursor(
+            str(biotope_shp),
+            ["BT_ID", "SHAPE@AREA", "SHAPE@LENGTH"],
+            spatial_reference=ITRF2000_PRJ,
+        ),
+        columns=["BT_ID", "SHAPE_AREA", "SHAPE_LENGTH"],
+    )
+    result_df = fraction_df.merge(shape_df, on="BT_ID")
+    buffer_areas = (
+        result_df["SHAPE_AREA"]
+        + result_df["SHAPE_LENGTH"] * buffer_distance
+        + np.pi * buffer_distance**2
+    )
+    result_df = result_df.assign(
+        AREA=result_df["MEAN"] * buffer_areas, PERCENTAGE=result_df["MEAN"] * 100
+    )[["BT_ID", "AREA", "PERCENTAGE"]]
+    result_df.index = pd.RangeIndex(1, len(result_df) + 1, name="OBJECTID")
+    return result_df[result_df["AREA"] > 0]
+
+
+def read_raster(asc):
+    return arcpy.Raster(str(asc))
+
+
+class _RasterRows:
+    """Reads rows of an arcpy raster as a numpy array, to combine it by blocks."""
+
+    def __init__(self, raster):
+        self._raster = raster
+        self.shape = (raster.height, raster.width)
+
+    def __getitem__(self, rows):
+        extent = self._raster.extent
+        lower_left = arcpy.Point(
+            extent.XMin, extent.YMax - rows.stop * self._raster.meanCellHeight
+        )
+        return arcpy.RasterToNumPyArray(
+            self._raster,
+            lower_left,
+            self.shape[1],
+            rows.stop - rows.start,
+            nodata_to_value=np.nan,
+        )
+
+
+# NoData of rasters made from arrays, where the arrays have nan
+NODATA = -9999.0
+
+
+def _array_to_raster(array, like):
+    """Makes a raster on the grid of `like`, with NoData where `array` is nan.
+    `array` is modified in place.
+    """
+    array[np.isnan(array)] = NODATA
+    return arcpy.NumPyArrayToRaster(
+        array,
+        arcpy.Point(like.extent.XMin, like.extent.YMin),
+        like.meanCellWidth,
+        like.meanCellHeight,
+        value_to_nodata=NODATA,
+    )
 
 
 def any_raster(rasters: Sequence[arcpy.Raster]):
-    """For each cell, get the probability that at least one probability will be true."""
-    complements = [1.0 - raster for raster in rasters]
-    product = complements[0]
-    for complement in complements[1:]:
-        product *= complement
-    return 1.0 - product
+    """For each cell, get the probability that at least one probability will be true.
+
+    Rasters on the same grid are combined by blocks of rows.
+    """
+    array = combine_any([_RasterRows(raster) for raster in rasters])
+    return _array_to_raster(array, rasters[0])
+
+
+def mean_raster(ascs):
+    """Gets mean of rasters on the same grid by blocks of rows."""
+    rasters = [arcpy.Raster(str(asc)) for asc in ascs]
+    array = combine_mean([_RasterRows(raster) for raster in rasters])
+    return _array_to_raster(array, rasters[0])
+
+
+def threshold_raster(raster, threshold):
+    """Cells greater than or equal to `threshold` get 1, the others get NoData."""
+    return asa.Con(raster >= threshold, 1)
+
+
+def euc_distance(source_raster, cellsize):
+    return asa.EucDistance(source_raster, cell_size=cellsize)
+
+
+def point_distance(
+    point_csv, biotope_shp, cellsize, x_field="경도", y_field="위도", search_radius=5000
+):
+    """Gets euclidean distance raster to WGS1984 points in `point_csv` within
+    `search_radius` meters from biotopes, covering both of them.
+    """
+    point_layer = am.XYTableToPoint(
+        str(point_csv),
+        "memory/point_layer",
+        x_field,
+        y_field,
+        coordinate_system=WGS1984_PRJ,
+    )
+
+    selected = am.SelectLayerByLocation(  # for efficiency
+        point_layer, "INTERSECT", str(biotope_shp), f"{search_radius} Meters"
+    )
+
+    extent = _merge_extent(
+        arcpy.Describe(str(biotope_shp)).extent,
+        arcpy.Describe(selected).extent,
+        ITRF2000_PRJ,
+    )
+
+    with arcpy.EnvManager(outputCoordinateSystem=ITRF2000_PRJ, extent=extent):
+        distance_raster = asa.EucDistance(
+            selected,
+            cell_size=cellsize,
+        )
+    am.Delete(point_layer)
+    return distance_raster
+
+
+def nearest_point_distance(
+    point_csv, biotope_shp, x_field="경도", y_field="위도", targets=None
+):
+    """Gets the exact distance in meters from each biotope to the nearest WGS1984
+    point in `point_csv`, which is 0 for a point inside the biotope.
+
+    Returns:
+        Table of BT_ID and MIN in the order of biotopes, or of biotopes where
+        the boolean mask `targets` is `True`.
+    """
+    with arcpy.EnvManager(outputCoordinateSystem=ITRF2000_PRJ):
+        point_layer = am.XYTableToPoint(
+            str(point_csv),
+            "memory/point_layer",
+            x_field,
+            y_field,
+            coordinate_system=WGS1984_PRJ,
+        )
+        biotopes = str(biotope_shp)
+        if targets is not None:
+            biotopes = select_records(biotopes, targets)
+        biotopes = am.Project(biotopes, "memory/biotopes", ITRF2000_PRJ)
+    aa.Near(biotopes, point_layer)
+    table = list(arcpy.da.SearchCursor(biotopes, ["BT_ID", "NEAR_DIST"]))
+    am.Delete(biotopes)
+    am.Delete(point_layer)
+    result_df = pd.DataFrame(table, columns=["BT_ID", "MIN"])
+    return result_df.replace({"MIN": {-1: np.nan}})  # no point
+
+
+def _merge_extent(extent1, extent2, spatial_reference):
+    extent1 = extent1.projectAs(spatial_reference)
+    extent2 = extent2.projectAs(spatial_reference)
+    xmin = min(extent1.XMin, extent2.XMin)
+    ymin = min(extent1.YMin, extent2.YMin)
+    xmax = max(extent1.XMax, extent2.XMax)
+    ymax = max(extent1.YMax, extent2.YMax)
+    return arcpy.Extent(xmin, ymin, xmax, ymax, spatial_reference=spatial_reference)
+
+
+def zonal_statistics(zone_shp, raster, statistics_type, selection=None):
+    """Summarizes `raster` within each biotope of `zone_shp`.
+
+    If `selection` is given, only biotopes where the mask is `True` are
+    summarized.
+    """
+    zones = str(zone_shp)
+    if selection is not None:
+        zones = select_records(zones, selection)
+
+    with arcpy.EnvManager(outputCoordinateSystem=ITRF2000_PRJ):
+        result_table = asa.ZonalStatisticsAsTable(
+            zones,
+            "BT_ID",
+            raster,
+            "memory/result_table",
+            statistics_type=statistics_type,
+        )
+    if selection is not None:
+        am.Delete(zones)
+    result_df = shp_to_df(result_table)
+    am.Delete(result_table)
+    return result_df
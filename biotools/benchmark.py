@@ -0,0 +1,204 @@
+"""Benchmark of how the time and memory of each indicator scale with the size
+of the biotope map, on inputs made by `synthetic`.
+
+Each indicator runs in a fresh process on a fresh result directory, so caches
+of earlier runs do not hide its cost. Memory is the peak resident set size of
+that process, which includes native allocations of GEOS and PROJ as well as
+those of Python. Allocations traced by `tracemalloc` can be measured too, in
+another run as tracing would slow the timed one. Exponents of the fitted
+power laws show regressions of complexity, and runs can be compared with a
+baseline of earlier results.
+
+    $ python -m biotools.benchmark --sizes 1000 10000 100000 --output bench.csv
+    $ python -m biotools.benchmark --baseline bench.csv
+"""
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from os import PathLike
+from pathlib import Path
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Sequence, Union
+import warnings
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+import numpy as np
+import pandas as pd
+
+from biotools import synthetic
+from biotools.core import REQUIREMENTS, Biotools
+
+DEFAULT_SIZES = (1_000, 10_000, 100_000, 1_000_000)
+# indicators which run maxent
+JAVA_INDICATORS = ("h4", "h6", "f6")
+
+
+def _peak_rss():
+    """Gets peak resident set size of this process in bytes, or nan if it is
+    not available on the platform."""
+    if resource is None:
+        return np.nan
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024  # kilobytes on Linux
+
+
+def _measure(inputs, tag, trace_memory):
+    """Runs indicator `tag` on `inputs` once, and gets its seconds and the peak
+    resident memory of the process in bytes, or the peak of traced memory in
+    bytes if `trace_memory` is `True`."""
+    with tempfile.TemporaryDirectory() as result_dir:
+        if tag == "prepare":
+
+            def run():
+                Biotools(inputs.biotope_shp, result_dir, backend="native")
+
+        else:
+            bt = Biotools(
+                inputs.biotope_shp, result_dir, backend="native", **inputs.arguments
+            )
+            run = getattr(bt, f"run_{tag}")
+        if trace_memory:
+            tracemalloc.start()
+            run()
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            return peak
+        start = time.perf_counter()
+        run()
+        return time.perf_counter() - start, _peak_rss()
+
+
+def _measure_in_process(inputs, tag, trace_memory):
+    with ProcessPoolExecutor(max_workers=1) as executor:
+        return executor.submit(_measure, inputs, tag, trace_memory).result()
+
+
+def run_benchmark(
+    data_directory: Union[str, PathLike],
+    sizes: Sequence[int] = DEFAULT_SIZES,
+    tags: Sequence[str] = None,
+    trace_memory: bool = False,
+    seed: int = 0,
+) -> pd.DataFrame:
+    """Measures indicators on synthetic biotope maps of `sizes` polygons.
+
+    Args:
+        `data_directory`: Path to directory in which inputs of each size are
+            generated, and reused by later benchmarks.
+        `sizes`: Numbers of polygons of biotope maps.
+        `tags`: Indicators to measure, or "prepare" for the projection of the
+            biotope map. All of them if it is `None`. Those which run maxent
+            are skipped without java.
+        `trace_memory`: If it is `True`, peak of memory allocated through
+            Python by each indicator is also measured with `tracemalloc` in
+            another run.
+        `seed`: Seed of synthetic inputs.
+
+    Returns:
+        Table of polygons, tag, seconds, peak_mb and traced_mb of each
+        measurement. peak_mb is the peak resident memory of the process
+        running the indicator, and nan on Windows. traced_mb is nan unless
+        `trace_memory` is `True`.
+    """
+    if tags is None:
+        tags = ["prepare", *REQUIREMENTS]
+    if shutil.which("java") is None and set(tags) & set(JAVA_INDICATORS):
+        warnings.warn(f"{', '.join(JAVA_INDICATORS)} are skipped without java.")
+        tags = [tag for tag in tags if tag not in JAVA_INDICATORS]
+
+    rows = []
+    for size in sizes:
+        inputs = synthetic.generate(Path(data_directory) / str(size), size, seed)
+        for tag in tags:
+            seconds, peak = _measure_in_process(inputs, tag, False)
+            traced = _measure_in_process(inputs, tag, True) if trace_memory else np.nan
+            rows.append((size, tag, seconds, peak / 2**20, traced / 2**20))
+            print(f"{size:>9} {tag:<8} {seconds:10.3f} s", file=sys.stderr)
+    return pd.DataFrame(
+        rows, columns=["polygons", "tag", "seconds", "peak_mb", "traced_mb"]
+    )
+
+
+def scaling_exponents(result_df: pd.DataFrame, column: str = "seconds") -> pd.Series:
+    """Fits `column` of each tag to a power law of polygons, and gets its
+    exponent: about 1 for linear growth, and 2 for quadratic growth.
+    """
+
+    def fit(df):
+        df = df[df[column] > 0]
+        if df["polygons"].nunique() < 2:
+            return np.nan
+        return np.polyfit(np.log(df["polygons"]), np.log(df[column]), 1)[0]
+
+    return result_df.groupby("tag", sort=False)[["polygons", column]].apply(fit)
+
+
+def compare(
+    result_df: pd.DataFrame, baseline_df: pd.DataFrame, tolerance: float = 1.5
+) -> pd.DataFrame:
+    """Compares measurements with the baseline of the same polygons and tag.
+
+    Returns:
+        Table of measurements with the ratios of seconds and peak_mb to the
+        baseline, and `regressed` which is `True` where either ratio exceeds
+        `tolerance`.
+    """
+    merged_df = result_df.merge(
+        baseline_df, on=["polygons", "tag"], suffixes=("", "_baseline")
+    )
+    for column in ["seconds", "peak_mb"]:
+        merged_df[f"{column}_ratio"] = (
+            merged_df[column] / merged_df[f"{column}_baseline"]
+        )
+    merged_df["regressed"] = (merged_df["seconds_ratio"] > tolerance) | (
+        merged_df["peak_mb_ratio"] > tolerance
+    )
+    return merged_df
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m biotools.benchmark", description=__doc__.split("\n\n")[0]
+    )
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--tags", nargs="+")
+    parser.add_argument("--data-directory", default="benchmark_data")
+    parser.add_argument("--output", help="csv file to save measurements")
+    parser.add_argument("--baseline", help="csv file of earlier measurements")
+    parser.add_argument("--tolerance", type=float, default=1.5)
+    parser.add_argument(
+        "--trace-memory", action="store_true", help="also measure with tracemalloc"
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    result_df = run_benchmark(
+        args.data_directory, args.sizes, args.tags, args.trace_memory, args.seed
+    )
+    if args.output is not None:
+        result_df.to_csv(args.output, index=False)
+    print(result_df.pivot(index="tag", columns="polygons", values="seconds"))
+    columns = ["seconds", "peak_mb"] + (["traced_mb"] if args.trace_memory else [])
+    exponents_df = pd.DataFrame(
+        {column: scaling_exponents(result_df, column) for column in columns}
+    )
+    print("\nexponents of power laws\n", exponents_df.round(2))
+    if args.baseline is None:
+        return 0
+    compared_df = compare(result_df, pd.read_csv(args.baseline), args.tolerance)
+    regressed_df = compared_df[compared_df["regressed"]]
+    print(f"\n{len(regressed_df)} regressions beyond {args.tolerance}x of baseline")
+    if len(regressed_df):
+        print(regressed_df[["polygons", "tag", "seconds_ratio", "peak_mb_ratio"]])
+    return 1 if len(regressed_df) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
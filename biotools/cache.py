@@ -0,0 +1,147 @@
+"""Intermediates of the process directory, identified by the content of their
+inputs.
+
+A manifest in the process directory records the key of each intermediate, a
+hash of its inputs and parameters. An intermediate is built again only when
+its key changes, so an input edited under the same file name is not reused
+stale. With a shared directory, built intermediates are also kept there by
+key and copied into other process directories instead of being built again.
+"""
+import hashlib
+import json
+from os import PathLike
+from pathlib import Path
+import shutil
+import threading
+import uuid
+from typing import Callable, Dict, List, Sequence, Union
+
+from biotools.shputils import file_digest
+
+MANIFEST = "manifest.json"
+SHAPEFILE_SUFFIXES = (".shp", ".shx", ".dbf", ".prj", ".cpg")
+
+
+def input_files(path: Union[str, PathLike]) -> List[Path]:
+    """Gets files of an input, which are the components of a shapefile."""
+    path = Path(path)
+    if path.suffix.lower() != ".shp":
+        return [path]
+    return [
+        path.with_suffix(suffix)
+        for suffix in SHAPEFILE_SUFFIXES
+        if path.with_suffix(suffix).exists()
+    ]
+
+
+def content_key(inputs: Sequence[Union[str, PathLike]], params: dict) -> str:
+    """Hashes the contents of `inputs` and JSON serializable `params`."""
+    digest = hashlib.sha256()
+    for path in inputs:
+        for file in input_files(path):
+            digest.update(file.suffix.lower().encode())
+            digest.update(file_digest(file).encode())
+    digest.update(json.dumps(params, sort_keys=True, default=str).encode())
+    return digest.hexdigest()[:16]
+
+
+def _output_files(output):
+    paths = output.parent.glob(output.stem + ".*")
+    return sorted(path for path in paths if path.stem == output.stem)
+
+
+class ProcessCache:
+    """Manifest of intermediates in `process_directory`.
+
+    Args:
+        `process_directory`: Directory in which intermediates are built.
+        `shared_directory`: Directory in which intermediates are also kept by
+            key, to be shared by process directories. Not shared if `None`.
+    """
+
+    def __init__(
+        self,
+        process_directory: Union[str, PathLike],
+        shared_directory: Union[str, PathLike] = None,
+    ):
+        self._process_dir = Path(process_directory)
+        self._shared_dir = None if shared_directory is None else Path(shared_directory)
+        self._lock = threading.Lock()
+
+    def _read_manifest(self) -> Dict[str, dict]:
+        try:
+            text = (self._process_dir / MANIFEST).read_text(encoding="utf-8")
+            return json.loads(text)
+        except (OSError, ValueError):
+            return {}
+
+    def _record(self, output, entry):
+        with self._lock:
+            manifest = self._read_manifest()
+            manifest[output.name] = entry
+            temp = self._process_dir / f"{MANIFEST}.{uuid.uuid4().hex}.tmp"
+            text = json.dumps(manifest, ensure_ascii=False, indent=2)
+            temp.write_text(text, encoding="utf-8")
+            temp.replace(self._process_dir / MANIFEST)
+
+    def build(
+        self,
+        name: str,
+        inputs: Sequence[Union[str, PathLike]],
+        params: dict,
+        function: Callable[[Path], None],
+    ) -> Path:
+        """Gets intermediate `name` in the process directory, built by
+        `function` from `inputs` unless it was built from the same contents.
+
+        Args:
+            `name`: File name of the intermediate, such as "biotope_WGS.shp".
+                Files with the same stem, such as .dbf, belong to it.
+            `inputs`: Paths to input files. Shapefiles include their .dbf,
+                .shx, .prj and .cpg files.
+            `params`: JSON serializable parameters which change the result.
+            `function`: Function which builds the intermediate to its path.
+
+        Returns:
+            Path to the intermediate.
+        """
+        output = self._process_dir / name
+        key = content_key(inputs, {"name": name, "params": params})
+        entry = self._read_manifest().get(name, {})
+        if entry.get("key") == key and all(
+            (self._process_dir / file).exists() for file in entry["files"]
+        ):
+            return output
+
+        for path in _output_files(output):
+            path.unlink()
+        shared = None if self._shared_dir is None else self._shared_dir / key
+        if shared is not None and (shared / MANIFEST).exists():
+            for path in _output_files(shared / name):
+                shutil.copy2(path, self._process_dir)
+        else:
+            function(output)
+
+        entry = {
+            "key": key,
+            "inputs": [str(path) for path in inputs],
+            "params": params,
+            "files": [path.name for path in _output_files(output)],
+        }
+        if shared is not None and not shared.exists():
+            self._share(output, shared, entry)
+        self._record(output, entry)
+        return output
+
+    def _share(self, output, shared, entry):
+        """Copies files of `output` to `shared`, which appears only complete."""
+        temp = shared.with_name(f"{shared.name}.{uuid.uuid4().hex}.tmp")
+        temp.mkdir(parents=True)
+        for path in _output_files(output):
+            shutil.copy2(path, temp)
+        text = json.dumps(entry, ensure_ascii=False, indent=2)
+        (temp / MANIFEST).write_text(text, encoding="utf-8")
+        try:
+            temp.rename(shared)
+        except OSError:  # shared by another process meanwhile
+            shutil.rmtree(temp)
@@ -0,0 +1,73 @@
+import importlib.resources
+import itertools
+from typing import Dict, Iterable, List, Sequence
+import warnings
+
+import numpy as np
+import pandas as pd
+
+
+def _init_biotope_codes():
+    with importlib.resources.path("biotools.res", "biotope_codes.csv") as path:
+        df = pd.read_csv(path)
+
+    result = {}
+    for large_category_code, sub_df in df.groupby("LARGE_CATEGORY_CODE"):
+        result[large_category_code] = sub_df["MEDIUM_CATEGORY_CODE"].tolist()
+    return result
+
+
+BIOTOPE_CODES = _init_biotope_codes()
+
+# large category codes of biotope groups which indicators select
+GROUPS = {
+    "developed": tuple(range(1, 9)),
+    "green": (9, 10, 12, 13, 14, 15),
+    "main_habitat": (16,),
+}
+
+
+def get_medium_codes(large_codes: Iterable[int]) -> List[str]:
+    return list(
+        itertools.chain(*(BIOTOPE_CODES[large_code] for large_code in large_codes))
+    )
+
+
+class ClassificationIndex:
+    """Large category of each biotope of a map, and masks of biotope groups.
+
+    It is built once per map, so that indicators select biotopes by boolean
+    masks aligned with the records instead of comparing codes again. Codes
+    which are not in `BIOTOPE_CODES` get -1 and are warned about.
+
+    Args:
+        `medium_codes`: 비오톱 code of each biotope in the order of records.
+    """
+
+    def __init__(self, medium_codes: Sequence[str]):
+        large_of = {
+            medium_code: large_code
+            for large_code, members in BIOTOPE_CODES.items()
+            for medium_code in members
+        }
+        codes_s = pd.Series(medium_codes, dtype=object)
+        self.large_codes = codes_s.map(large_of).fillna(-1).to_numpy(dtype=np.int64)
+
+        is_unknown = self.large_codes < 0
+        self.unknown_codes: Dict[str, int] = (
+            codes_s[is_unknown].fillna("").value_counts().sort_index().to_dict()
+        )
+        if self.unknown_codes:
+            warnings.warn(
+                f"{is_unknown.sum()} biotopes have unknown 비오톱 codes "
+                f"{self.unknown_codes}, and are not selected by any group.",
+                stacklevel=2,
+            )
+        self.masks = {name: self.select(group) for name, group in GROUPS.items()}
+
+    def __len__(self):
+        return len(self.large_codes)
+
+    def select(self, large_codes: Iterable[int]) -> np.ndarray:
+        """Gets mask of biotopes in `large_codes`."""
+        return np.isin(self.large_codes, list(large_codes))
@@ -1,11 +1,56 @@
+import contextlib
+import datetime
+import functools
+import importlib
 from os import PathLike
 from pathlib import Path
-from typing import Sequence, Union
+import threading
+import time
+from typing import Dict, List, Sequence, Union
 
-import arcpy.management as am
 import pandas as pd
 
-from biotools import arcutils, habitat, foodchain
+from biotools import (
+    cache,
+    codes,
+    habitat,
+    foodchain,
+    gpkg,
+    maxent,
+    scheduler,
+    shputils,
+    tablecache,
+)
+from biotools.incremental import MapState, ResultStore, measure_incrementally
+
+
+BACKENDS = {
+    "arcpy": "biotools.arcutils",
+    "native": "biotools.geoutils",
+}
+
+
+# inputs which each indicator requires besides the biotope map
+REQUIREMENTS = {
+    "h1": (),
+    "h2": (),
+    "h3": (),
+    "h4": ("environmentallayer_directory", "keystone_species_csv"),
+    "h5": ("commercialpoint_csv",),
+    "h6": ("environmentallayer_directory", "keystone_species_csv"),
+    "f1": ("surveypoint_shp", "foodchain_info_csv"),
+    "f2": ("surveypoint_shp", "foodchain_info_csv"),
+    "f3": ("surveypoint_shp", "foodchain_info_csv"),
+    "f4": ("surveypoint_shp", "foodchain_info_csv"),
+    "f5": ("surveypoint_shp", "foodchain_info_csv"),
+    "f6": ("environmentallayer_directory", "surveypoint_shp", "foodchain_info_csv"),
+}
+
+
+def _load_backend(name):
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown backend {name!r}. Choose one of {list(BACKENDS)}.")
+    return importlib.import_module(BACKENDS[name])
 
 
 class Biotools:
@@ -27,6 +72,25 @@ class Biotools:
             F2, F3, F4, F5, F6.
         `foodchain_info_csv`: Path to foodchain information csv file. It is
             used at F1, F2, F3, F4, F5.
+        `backend`: Geoprocessing backend. "arcpy" uses ArcGIS Pro, and "native"
+            uses numpy, shapely and pyproj so that it runs without arcpy.
+        `write_csv`: If it is `True`, each result table is also saved as a csv
+            file next to its result shapefile.
+        `maxent_options`: Keyword arguments of `maxent.run_maxent` used at H4,
+            H6, F6, such as `workers`, `memory` and `threads`.
+        `incremental`: If it is `True`, H1, H3, H5 and H6 keep their
+            measurements in process directory, and later runs measure again
+            only biotopes which edits of the biotope map since then can change. BT_ID is
+            given by record order, so edit records in place or append them.
+        `cache_directory`: Path to directory which keeps intermediates, such as
+            projected shapefiles and maxent results, by the content of their
+            inputs. Result directories with the same `cache_directory` share
+            identical intermediates. Process directory is used if `None`.
+        `results_gpkg`: Path to GeoPackage file which also stores results of
+            all indicators in one table of biotopes, keyed by BT_ID. Each
+            evaluation writes only rows whose values changed, and adds its
+            arguments and timing to the biotools_runs table. See
+            `gpkg.GeoPackageStore` to read it.
     """
 
     def __init__(
@@ -38,11 +102,47 @@ class Biotools:
         commercialpoint_csv: Union[str, PathLike] = None,
         surveypoint_shp: Union[str, PathLike] = None,
         foodchain_info_csv: Union[str, PathLike] = None,
+        backend: str = "arcpy",
+        write_csv: bool = True,
+        maxent_options: dict = None,
+        incremental: bool = False,
+        cache_directory: Union[str, PathLike] = None,
+        results_gpkg: Union[str, PathLike] = None,
     ):
+        self._gis = _load_backend(backend)
+        self._backend = backend
+        # arcpy geoprocessing is not thread-safe
+        self._gis_lock = threading.Lock() if backend == "arcpy" else None
+        self._inputs = {
+            name
+            for name, value in [
+                ("environmentallayer_directory", environmentallayer_directory),
+                ("keystone_species_csv", keystone_species_csv),
+                ("commercialpoint_csv", commercialpoint_csv),
+                ("surveypoint_shp", surveypoint_shp),
+                ("foodchain_info_csv", foodchain_info_csv),
+            ]
+            if value is not None
+        }
+        self._write_csv = write_csv
+        self._enriched_surveypoints = {}
         self._base_dir = Path(result_directory).absolute()
         self._process_dir = self._base_dir / "process"
         self._process_dir.mkdir(parents=True, exist_ok=True)
+        if cache_directory is None:
+            self._cache_dir = self._process_dir
+            self._cache = cache.ProcessCache(self._process_dir)
+        else:
+            self._cache_dir = Path(cache_directory).absolute()
+            self._cache = cache.ProcessCache(self._process_dir, self._cache_dir)
+        self._maxent_options = maxent_options or {}
+        self._incremental = incremental
+        self._results = ResultStore(self._process_dir / "incremental")
         self._biotope_wgs_shp = self._prepare_shp(biotope_shp, "BT_ID")
+        self._classification = self._classify(self._biotope_wgs_shp)
+        self._gpkg = None
+        if results_gpkg is not None:
+            self._gpkg = self._open_gpkg(results_gpkg)
 
         if environmentallayer_directory is not None:
             self._environmentallayer_dir = Path(environmentallayer_directory).absolute()
@@ -56,18 +156,67 @@ class Biotools:
             self._foodchain_info_csv = Path(foodchain_info_csv).absolute()
 
     def _prepare_shp(self, shp, newidfield):
-        newshp = self._process_dir / (Path(shp).stem + "_WGS.shp")
-        if not newshp.exists():
-            am.Project(str(shp), str(newshp), arcutils.WGS1984_PRJ)
-        if newidfield not in arcutils.get_fields(newshp):  # create unique field
-            am.CalculateField(
-                str(newshp),
-                newidfield,
-                f"'{newidfield}!FID!'",
-                expression_type="PYTHON3",
-                field_type="TEXT",
+        def build(newshp):
+            self._gis.project(shp, newshp, self._gis.WGS1984_PRJ)
+            if newidfield not in self._gis.get_fields(newshp):  # create unique field
+                self._gis.add_id_field(newshp, newidfield)
+
+        return self._cache.build(
+            Path(shp).stem + "_WGS.shp",
+            [shp],
+            {"backend": self._backend, "crs": "WGS1984", "id_field": newidfield},
+            build,
+        )
+
+    def _open_gpkg(self, path):
+        """Opens results store, storing biotopes again if the map changed."""
+        store = gpkg.GeoPackageStore(path)
+        key = cache.content_key([self._biotope_wgs_shp], {})
+        if store.biotopes_key != key:
+            biotope_df = self._gis.shp_to_df(self._biotope_wgs_shp, ["BT_ID"])
+            wkbs = self._gis.read_wkb(self._biotope_wgs_shp)
+            store.write_biotopes(biotope_df["BT_ID"], wkbs, key)
+        return store
+
+    def _classify(self, biotope_shp):
+        """Builds classification index of biotopes, warning about unknown codes."""
+        biotope_df = self._gis.shp_to_df(biotope_shp, ["비오톱"])
+        return codes.ClassificationIndex(biotope_df["비오톱"].to_numpy())
+
+    @property
+    def table_cache(self) -> tablecache.TableCache:
+        """Session table cache, with its `hits`, `misses` and `nbytes`."""
+        return tablecache.SESSION
+
+    @property
+    def unknown_codes(self) -> dict:
+        """Number of biotopes of each 비오톱 code not in the code table."""
+        return self._classification.unknown_codes
+
+    def _get_enriched_surveypoint(self, skip_noname):
+        """Gets survey points joined with biotopes and foodchain information.
+
+        The table of each `skip_noname` is computed once and reused by F1, F2,
+        F3, F4 and F5 until the survey point, biotope or foodchain information
+        input changes.
+        """
+        fingerprints = (
+            shputils.fingerprint(self._biotope_wgs_shp),
+            shputils.fingerprint(self._surveypoint_wgs_shp),
+            shputils.fingerprint(self._foodchain_info_csv),
+        )
+        cached = self._enriched_surveypoints.get(skip_noname)
+        if cached is None or cached[0] != fingerprints:
+            surveypoint_df = foodchain.enrich_surveypoint(
+                self._gis,
+                self._biotope_wgs_shp,
+                self._surveypoint_wgs_shp,
+                self._foodchain_info_csv,
+                skip_noname,
             )
-        return newshp
+            cached = (fingerprints, surveypoint_df)
+            self._enriched_surveypoints[skip_noname] = cached
+        return cached[1]
 
     def _create_result_shp(self, tag):
         result = (
@@ -79,10 +228,67 @@ class Biotools:
         return result
 
     def _create_maxent_dir(self, stem):
-        result = self._process_dir / (stem + "_maxent")
+        result = self._cache_dir / (stem + "_maxent")
         result.mkdir(parents=True, exist_ok=True)
         return result
 
+    def _run_indicator(self, tag, indicator, arguments, get_key=None, affected=None):
+        """Runs `indicator` with `arguments`, and stores its result.
+
+        If `get_key` is given, it is measured incrementally if it is enabled.
+        `get_key` gets the arguments and inputs other than the biotope map, and
+        `affected` gets the mask of biotopes to measure again from the current
+        and previous states of the map and BT_ID of changed biotopes. Only the
+        changed biotopes are measured again by default.
+        """
+        started = datetime.datetime.now()
+        start = time.perf_counter()
+        if self._incremental and get_key is not None:
+            result_shp = self._measure_incrementally(
+                tag, indicator, get_key, affected
+            )
+        else:
+            result_shp = indicator.run()
+        self._store_results(
+            {tag: result_shp}, arguments, started, time.perf_counter() - start
+        )
+        return result_shp
+
+    def _measure_incrementally(self, tag, indicator, get_key, affected):
+        if affected is None:
+
+            def affected(state, previous, changed):
+                return state.digests.index.isin(changed)
+
+        state = MapState.read(self._biotope_wgs_shp)
+        result_df = measure_incrementally(
+            self._results,
+            tag,
+            get_key(),
+            state,
+            indicator.measure,
+            lambda previous, changed: affected(state, previous, changed),
+        )
+        return indicator.save(result_df)
+
+    def _store_results(self, result_shps, arguments, started, seconds):
+        """Upserts results into the results store, if it is enabled."""
+        if self._gpkg is None:
+            return
+        for tag, result_shp in result_shps.items():
+            changed_rows = self._gpkg.upsert(self._result_table(result_shp))
+            self._gpkg.record_run(tag, arguments, started, seconds, changed_rows)
+
+    def _result_table(self, result_shp):
+        """Reads BT_ID and the fields of `result_shp` not in the biotope map."""
+        biotope_fields = self._gis.get_fields(self._biotope_wgs_shp)
+        fields = [
+            field
+            for field in self._gis.get_fields(result_shp)
+            if field not in biotope_fields
+        ]
+        return self._gis.shp_to_df(result_shp, ["BT_ID", *fields])
+
     def evaluate_habitat_size(
         self,
         lower_bounds: Sequence[float] = (50, 10, 1, 0),
@@ -102,9 +308,25 @@ class Biotools:
         """
         result_shp = self._create_result_shp("h1")
         h1 = habitat.HabitatSize(
-            self._biotope_wgs_shp, result_shp, lower_bounds, scores
+            self._gis,
+            self._biotope_wgs_shp,
+            result_shp,
+            lower_bounds,
+            scores,
+            write_csv=self._write_csv,
+            classification=self._classification,
+        )
+        return self._run_indicator(
+            "h1",
+            h1,
+            {"lower_bounds": list(lower_bounds), "scores": list(scores)},
+            lambda: [],
+            # biotopes adjacent to changed ones, before or after the edit, have
+            # intersecting bounds, and their patches are measured again
+            lambda state, previous, changed: (
+                state.digests.index.isin(changed) | state.near(previous, changed, 1)
+            ),
         )
-        return h1.run()
 
     def evaluate_structured_layer(self, scores: Sequence[float] = (0.3, 0.6, 1)) -> str:
         """Evaluates structured layer.
@@ -119,32 +341,68 @@ class Biotools:
             Path to result shapefile.
         """
         result_shp = self._create_result_shp("h2")
-        h2 = habitat.StructuredLayer(self._biotope_wgs_shp, result_shp, scores)
-        return h2.run()
+        h2 = habitat.StructuredLayer(
+            self._gis,
+            self._biotope_wgs_shp,
+            result_shp,
+            scores,
+            write_csv=self._write_csv,
+            classification=self._classification,
+        )
+        return self._run_indicator("h2", h2, {"scores": list(scores)})
 
-    def evaluate_patch_isolation(self):
+    def evaluate_patch_isolation(
+        self, buffer_distance: float = 125, method: str = "vector", cellsize: float = 5
+    ):
         """Evaluates patch isolation.
 
         Creates result_h3 directory in the result directory, and saves result shapefile in it.
 
         Args:
-            [to do] buffer_size?
+            `buffer_distance`: Buffer distance around green biotopes in meters.
+            `method`: "vector" to intersect buffers with dissolved green biotopes
+                exactly, or "raster" to approximate it on a raster of `cellsize`
+                for maps with too many biotopes. In "raster", H3_RESULT is the
+                mean over each green biotope of the green fraction within
+                `buffer_distance` from its cells, which differs from "vector" by
+                a few percentage points, and biotopes too small to contain a
+                cell get 0.
 
         Returns:
             Path to result shapefile.
         """
         result_shp = self._create_result_shp("h3")
         h3 = habitat.PatchIsolation(
+            self._gis,
             self._biotope_wgs_shp,
             result_shp,
+            buffer_distance,
+            write_csv=self._write_csv,
+            classification=self._classification,
+            method=method,
+            cellsize=cellsize,
+        )
+        return self._run_indicator(
+            "h3",
+            h3,
+            {
+                "buffer_distance": buffer_distance,
+                "method": method,
+                "cellsize": cellsize,
+            },
+            lambda: [buffer_distance, method, cellsize],
+            lambda state, previous, changed: state.near(
+                previous, changed, buffer_distance
+            ),
         )
-        return h3.run()
 
     def evaluate_least_cost_distribution(self):
         """Evaluates least cost distribution.
 
         Creates result_h4 directory in the result directory, creates a maxent directory
-        containing maxent results in process directory, and saves final result shapefile in result_h4.
+        containing maxent results in the cache directory, which is the process
+        directory unless `cache_directory` is given, and saves final result
+        shapefile in result_h4.
 
         Returns:
             Path to result shapefile.
@@ -152,15 +410,20 @@ class Biotools:
         maxent_dir = self._create_maxent_dir(self._keystone_species_csv.stem)
         result_shp = self._create_result_shp("h4")
         h4 = habitat.LeastCostDistribution(
+            self._gis,
             self._biotope_wgs_shp,
             self._keystone_species_csv,
             self._environmentallayer_dir,
             maxent_dir,
             result_shp,
+            write_csv=self._write_csv,
+            maxent_options=self._maxent_options,
         )
-        return h4.run()
+        return self._run_indicator("h4", h4, {})
 
-    def evaluate_pieceofland_occurrence(self, cellsize: float = 5):
+    def evaluate_pieceofland_occurrence(
+        self, cellsize: float = 5, method: str = "raster"
+    ):
         """Evaluates occurrence probability of piece of land.
 
         Creates result_h5 directory in the result directory, and saves result shapefile in it.
@@ -169,15 +432,35 @@ class Biotools:
             `cellsize`: Cell size used for `EucDistance`. It should be less than
                 the smallest biotope. If a biotope is too small to contain a cell,
                 `ZonalStatisticsAsTable` will skip the biotope.
+            `method`: "raster" to take the zonal minimum of `EucDistance`, or
+                "vector" to measure exact distances from each biotope to the
+                nearest commercial point, which is 0 for a point inside it.
+                "vector" ignores `cellsize`, skips no biotope, and writes only
+                H5_MIN and H5_RESULT.
 
         Returns:
             Path to result shapefile.
         """
         result_shp = self._create_result_shp("h5")
         h5 = habitat.PieceoflandOccurrence(
-            self._biotope_wgs_shp, self._commercialpoint_csv, result_shp, cellsize
+            self._gis,
+            self._biotope_wgs_shp,
+            self._commercialpoint_csv,
+            result_shp,
+            cellsize,
+            write_csv=self._write_csv,
+            method=method,
+        )
+        return self._run_indicator(
+            "h5",
+            h5,
+            {"cellsize": cellsize, "method": method},
+            lambda: [
+                cellsize,
+                method,
+                str(shputils.fingerprint(self._commercialpoint_csv)),
+            ],
         )
-        return h5.run()
 
     def evaluate_pieceofland_availability(
         self, threshold: float = 0.5, cellsize: float = 5
@@ -185,7 +468,9 @@ class Biotools:
         """Evaluate availability of piece of land.
 
         Creates result_h6 directory in the result directory, creates a maxent directory
-        containing maxent results in process directory, and saves final result shapefile in result_h6.
+        containing maxent results in the cache directory, which is the process
+        directory unless `cache_directory` is given, and saves final result
+        shapefile in result_h6.
 
         Args:
             `threshold`: Probability threshold for defining major habitat.
@@ -199,6 +484,7 @@ class Biotools:
         maxent_dir = self._create_maxent_dir(self._keystone_species_csv.stem)
         result_shp = self._create_result_shp("h6")
         h6 = habitat.PieceoflandAvailability(
+            self._gis,
             self._biotope_wgs_shp,
             self._keystone_species_csv,
             self._environmentallayer_dir,
@@ -206,8 +492,24 @@ class Biotools:
             result_shp,
             threshold,
             cellsize,
+            write_csv=self._write_csv,
+            classification=self._classification,
+            maxent_options=self._maxent_options,
+        )
+        return self._run_indicator(
+            "h6",
+            h6,
+            {"threshold": threshold, "cellsize": cellsize},
+            lambda: [
+                threshold,
+                cellsize,
+                maxent.run_key(
+                    self._keystone_species_csv,
+                    self._environmentallayer_dir,
+                    **self._maxent_options,
+                ),
+            ],
         )
-        return h6.run()
 
     def evaluate_food_resource_count(self, skip_noname: bool = True):
         """Evaluate the number of food resources.
@@ -224,13 +526,16 @@ class Biotools:
         """
         result_shp = self._create_result_shp("f1")
         f1 = foodchain.FoodResourceCount(
+            self._gis,
             self._biotope_wgs_shp,
             self._surveypoint_wgs_shp,
             self._foodchain_info_csv,
             result_shp,
             skip_noname,
+            write_csv=self._write_csv,
+            surveypoint_df=self._get_enriched_surveypoint(skip_noname),
         )
-        return f1.run()
+        return self._run_indicator("f1", f1, {"skip_noname": skip_noname})
 
     def evaluate_diversity_index(self, skip_noname: bool = True):
         """Evaluate Shannon diversity index.
@@ -247,13 +552,16 @@ class Biotools:
         """
         result_shp = self._create_result_shp("f2")
         f2 = foodchain.DiversityIndex(
+            self._gis,
             self._biotope_wgs_shp,
             self._surveypoint_wgs_shp,
             self._foodchain_info_csv,
             result_shp,
             skip_noname,
+            write_csv=self._write_csv,
+            surveypoint_df=self._get_enriched_surveypoint(skip_noname),
         )
-        return f2.run()
+        return self._run_indicator("f2", f2, {"skip_noname": skip_noname})
 
     def evaluate_combinable_producers_and_consumers(
         self,
@@ -276,14 +584,19 @@ class Biotools:
         """
         result_shp = self._create_result_shp("f3")
         f3 = foodchain.CombinableProducersAndConsumers(
+            self._gis,
             self._biotope_wgs_shp,
             self._surveypoint_wgs_shp,
             self._foodchain_info_csv,
             result_shp,
             skip_noname,
             scores,
+            write_csv=self._write_csv,
+            surveypoint_df=self._get_enriched_surveypoint(skip_noname),
+        )
+        return self._run_indicator(
+            "f3", f3, {"skip_noname": skip_noname, "scores": list(scores)}
         )
-        return f3.run()
 
     def evaluate_connection_strength(self, skip_noname: bool = True):
         """Evaluate connection strength
@@ -300,13 +613,16 @@ class Biotools:
         """
         result_shp = self._create_result_shp("f4")
         f4 = foodchain.ConnectionStrength(
+            self._gis,
             self._biotope_wgs_shp,
             self._surveypoint_wgs_shp,
             self._foodchain_info_csv,
             result_shp,
             skip_noname,
+            write_csv=self._write_csv,
+            surveypoint_df=self._get_enriched_surveypoint(skip_noname),
         )
-        return f4.run()
+        return self._run_indicator("f4", f4, {"skip_noname": skip_noname})
 
     def evaluate_similar_functional_species(self, skip_noname: bool = True):
         """Evaluates similar functional species.
@@ -323,13 +639,70 @@ class Biotools:
         """
         result_shp = self._create_result_shp("f5")
         f5 = foodchain.SimilarFunctionalSpecies(
+            self._gis,
             self._biotope_wgs_shp,
             self._surveypoint_wgs_shp,
             self._foodchain_info_csv,
             result_shp,
             skip_noname,
+            write_csv=self._write_csv,
+            surveypoint_df=self._get_enriched_surveypoint(skip_noname),
+        )
+        return self._run_indicator("f5", f5, {"skip_noname": skip_noname})
+
+    def evaluate_foodchain_all(
+        self,
+        skip_noname: bool = True,
+        scores: Sequence[float] = (0.3, 0.6, 1),
+    ) -> List[str]:
+        """Evaluates F1, F2, F3, F4 and F5 at once.
+
+        Survey points are aggregated by biotope in one pass, so it is much faster
+        than running them one by one for large survey tables. Results are saved
+        as each of them does.
+
+        Args:
+            `skip_noname`: See `evaluate_food_resource_count`.
+            `scores`: See `evaluate_combinable_producers_and_consumers`.
+
+        Returns:
+            Paths to result shapefiles of F1, F2, F3, F4 and F5.
+        """
+        surveypoint_df = self._get_enriched_surveypoint(skip_noname)
+        inputs = (
+            self._gis,
+            self._biotope_wgs_shp,
+            self._surveypoint_wgs_shp,
+            self._foodchain_info_csv,
+        )
+        options = {"write_csv": self._write_csv, "surveypoint_df": surveypoint_df}
+        indicators = [
+            foodchain.FoodResourceCount(
+                *inputs, self._create_result_shp("f1"), skip_noname, **options
+            ),
+            foodchain.DiversityIndex(
+                *inputs, self._create_result_shp("f2"), skip_noname, **options
+            ),
+            foodchain.CombinableProducersAndConsumers(
+                *inputs, self._create_result_shp("f3"), skip_noname, scores, **options
+            ),
+            foodchain.ConnectionStrength(
+                *inputs, self._create_result_shp("f4"), skip_noname, **options
+            ),
+            foodchain.SimilarFunctionalSpecies(
+                *inputs, self._create_result_shp("f5"), skip_noname, **options
+            ),
+        ]
+        started = datetime.datetime.now()
+        start = time.perf_counter()
+        result_shps = foodchain.run_together(indicators, surveypoint_df)
+        self._store_results(
+            dict(zip(["f1", "f2", "f3", "f4", "f5"], result_shps)),
+            {"skip_noname": skip_noname, "scores": list(scores)},
+            started,
+            time.perf_counter() - start,
         )
-        return f5.run()
+        return result_shps
 
     def evaluate_food_resource_inhabitation(
         self,
@@ -337,24 +710,30 @@ class Biotools:
         """Evaluates inhabitation of food resources.
 
         Creates result_f6 directory in the result directory, creates a maxent directory
-        containing maxent results in process directory, and saves final result shapefile in result_f6.
+        containing maxent results in the cache directory, which is the process
+        directory unless `cache_directory` is given, and saves final result
+        shapefile in result_f6.
 
         Returns:
             Path to result shapefile.
         """
-        newname = self._surveypoint_wgs_shp.name.replace("WGS", "ITRF")
-        surveypoint_itrf_shp = self._surveypoint_wgs_shp.with_name(newname)
-        if not surveypoint_itrf_shp.exists():
-            am.Project(
-                str(self._surveypoint_wgs_shp),
-                str(surveypoint_itrf_shp),
-                arcutils.ITRF2000_PRJ,
-            )
+        return self._run_indicator("f6", self._food_resource_inhabitation(), {})
+
+    def _food_resource_inhabitation(self):
+        surveypoint_itrf_shp = self._cache.build(
+            self._surveypoint_wgs_shp.name.replace("WGS", "ITRF"),
+            [self._surveypoint_wgs_shp],
+            {"backend": self._backend, "crs": "ITRF2000"},
+            lambda newshp: self._gis.project(
+                self._surveypoint_wgs_shp, newshp, self._gis.ITRF2000_PRJ
+            ),
+        )
 
         maxent_dir = self._create_maxent_dir("prey")
         result_shp = self._create_result_shp("f6")
         sample_csv = self._process_dir / "prey_sample.csv"
-        f6 = foodchain.FoodResourceInhabitation(
+        return foodchain.FoodResourceInhabitation(
+            self._gis,
             self._biotope_wgs_shp,
             self._environmentallayer_dir,
             surveypoint_itrf_shp,
@@ -362,24 +741,149 @@ class Biotools:
             sample_csv,
             maxent_dir,
             result_shp,
+            write_csv=self._write_csv,
+            maxent_options=self._maxent_options,
         )
-        return f6.run()
 
-    def merge(self):
-        """Merges each result to one file.
+    def run_all(
+        self, tags: Sequence[str] = None, workers: int = 4, arguments: dict = None
+    ) -> Dict[str, str]:
+        """Runs indicators at the same time, as their dependencies allow.
+
+        Intermediates shared by indicators run once as their own tasks before
+        the indicators which need them: the maxent runs of keystone species for
+        H4 and H6 and of prey species for F6, and the survey points enriched
+        with biotopes for F1 to F5. Other indicators, such as H1, H3 and H5, run
+        alongside them. With the arcpy backend, geoprocessing of indicators and
+        intermediates runs one at a time, while maxent runs alongside it.
+
+        Args:
+            `tags`: Indicators to run, such as "h1" and "f6". All indicators
+                whose inputs were given are run if it is `None`.
+            `workers`: Number of tasks running at the same time.
+            `arguments`: Keyword arguments of each indicator by tag, such as
+                `{"h6": {"threshold": 0.936}}`.
 
         Returns:
-            Path to merged result shapefile.
+            Path to result shapefile of each indicator by tag.
         """
-        result_df = arcutils.shp_to_df(self._biotope_wgs_shp)[["BT_ID"]]
-        habitats = sorted(self._base_dir.glob("result_h[1-6]/*.csv"))
-        foodchains = sorted(self._base_dir.glob("result_f[1-6]/*.csv"))
+        if tags is None:
+            tags = [
+                tag
+                for tag, requirements in REQUIREMENTS.items()
+                if self._inputs.issuperset(requirements)
+            ]
+        for tag in tags:
+            missing = set(REQUIREMENTS[tag]) - self._inputs
+            if missing:
+                raise ValueError(f"{tag} requires {sorted(missing)}.")
+        arguments = arguments or {}
+
+        tasks = {}
+        if {"h4", "h6"} & set(tags):
+            tasks["keystone_maxent"] = scheduler.Task(self._run_keystone_maxent)
+        if "f6" in tags:
+            tasks["prey_maxent"] = scheduler.Task(self._run_prey_maxent)
+        if {"f1", "f2", "f3", "f4", "f5"} & set(tags):
+            skip_noname = {
+                arguments.get(tag, {}).get("skip_noname", True)
+                for tag in ["f1", "f2", "f3", "f4", "f5"]
+                if tag in tags
+            }
+            tasks["surveypoint"] = scheduler.Task(
+                self._locked(
+                    lambda: [
+                        self._get_enriched_surveypoint(skip) for skip in skip_noname
+                    ]
+                )
+            )
+
+        dependencies = {
+            "h4": ("keystone_maxent",),
+            "h6": ("keystone_maxent",),
+            "f1": ("surveypoint",),
+            "f2": ("surveypoint",),
+            "f3": ("surveypoint",),
+            "f4": ("surveypoint",),
+            "f5": ("surveypoint",),
+            "f6": ("prey_maxent",),
+        }
+        for tag in tags:
+            tasks[tag] = scheduler.Task(
+                self._locked(
+                    functools.partial(
+                        getattr(self, f"run_{tag}"), **arguments.get(tag, {})
+                    )
+                ),
+                dependencies.get(tag, ()),
+            )
+
+        results = scheduler.run_tasks(tasks, workers)
+        return {tag: results[tag] for tag in tags}
+
+    def _run_keystone_maxent(self):
+        return maxent.run_maxent(
+            str(self._keystone_species_csv),
+            str(self._environmentallayer_dir),
+            str(self._create_maxent_dir(self._keystone_species_csv.stem)),
+            **self._maxent_options,
+        )
+
+    def _run_prey_maxent(self):
+        with self._gis_lock or contextlib.nullcontext():
+            f6 = self._food_resource_inhabitation()
+            f6.export_samples()
+        return f6.run_maxent()
+
+    def _locked(self, run):
+        """Wraps `run` to hold the lock of the arcpy backend while it runs."""
+
+        def task():
+            with self._gis_lock or contextlib.nullcontext():
+                return run()
+
+        return task
+
+    def merge(self, shapefile: bool = False) -> str:
+        """Merges each result into one GeoParquet file with the biotope map.
+
+        Creates result_full directory in the result directory. Result columns
+        are aligned by BT_ID in one concatenation, and those of results saved
+        in this session are taken from memory. It requires pyarrow.
+
+        Args:
+            `shapefile`: If it is `True`, the merged result is also saved as a
+                shapefile, with a csv file if `write_csv` is set. Field names
+                of shapefiles are cut to 10 bytes.
+
+        Returns:
+            Path to merged GeoParquet file.
+        """
+        geoparquet = importlib.import_module("biotools.geoparquet")
+        biotope_fields = [
+            field
+            for field in self._gis.get_fields(self._biotope_wgs_shp)
+            if field not in ("FID", "Shape")
+        ]
+        biotope_df = self._gis.shp_to_df(self._biotope_wgs_shp, biotope_fields)
+        tables = [biotope_df.set_index("BT_ID")]
+        habitats = sorted(self._base_dir.glob("result_h[1-6]/*.shp"))
+        foodchains = sorted(self._base_dir.glob("result_f[1-6]/*.shp"))
         for path in habitats + foodchains:
-            df = pd.read_csv(path)
-            result_df = result_df.merge(df, how="left", on="BT_ID")
+            tables.append(self._result_table(path).set_index("BT_ID"))
+        result_df = pd.concat(tables, axis=1).reindex(tables[0].index).reset_index()
 
-        result_path = self._create_result_shp("full")
-        return arcutils.clean_join(self._biotope_wgs_shp, result_df, result_path)
+        result_shp = self._create_result_shp("full")
+        if shapefile:  # biotope fields are not joined again
+            self._gis.clean_join(
+                self._biotope_wgs_shp, result_df, result_shp, csv=self._write_csv
+            )
+        parquet = geoparquet.write_geoparquet(
+            result_shp.with_suffix(".parquet"),
+            result_df,
+            self._gis.read_wkb(self._biotope_wgs_shp),
+        )
+        return str(parquet)
 
     # aliasing
     run_h1 = evaluate_habitat_size
@@ -0,0 +1,363 @@
+"""Columnar reader and writer of dBASE tables (.dbf) of shapefiles.
+
+Records are loaded at once into a numpy structured array of raw bytes, and each
+column is decoded or encoded with vectorized numpy operations, instead of row
+by row.
+"""
+import datetime
+from os import PathLike
+from pathlib import Path
+import struct
+from typing import Dict, List, NamedTuple, Sequence, Union
+
+import numpy as np
+import pandas as pd
+
+
+class Field(NamedTuple):
+    name: str
+    type: str
+    size: int
+    decimal: int
+
+
+def get_encoding(path: Union[str, PathLike], default: str = "euc-kr") -> str:
+    """Gets encoding of a shapefile from its .cpg file."""
+    cpg = Path(path).with_suffix(".cpg")
+    if cpg.exists():
+        return cpg.read_text().strip() or default
+    return default
+
+
+def _read_header(file, encoding):
+    record_count, header_size, record_size = struct.unpack("<4xIHH", file.read(12))
+    file.seek(32)
+    fields = []
+    while file.tell() < header_size - 1:
+        descriptor = file.read(32)
+        if descriptor[0] == 0x0D:
+            break
+        name = descriptor[:11].split(b"\x00")[0].decode(encoding)
+        fields.append(Field(name, chr(descriptor[11]), descriptor[16], descriptor[17]))
+    return record_count, header_size, record_size, fields
+
+
+def read_fields(dbf: Union[str, PathLike], encoding: str = None) -> List[Field]:
+    dbf = Path(dbf).with_suffix(".dbf")
+    encoding = encoding or get_encoding(dbf)
+    with open(dbf, "rb") as file:
+        return _read_header(file, encoding)[3]
+
+
+def _decode_text(raw, encoding):
+    stripped = np.char.rstrip(raw)
+    if stripped.size == 0:
+        return stripped.astype(object)
+    return np.char.decode(stripped, encoding, errors="replace").astype(object)
+
+
+def _decode_number(raw, field):
+    stripped = np.char.strip(raw)
+    is_null = (stripped == b"") | np.char.startswith(stripped, b"*")
+    stripped[is_null] = b"nan"
+    values = stripped.astype(np.float64)
+    if field.type == "N" and field.decimal == 0 and not is_null.any():
+        return values.astype(np.int64)
+    return values
+
+
+def _decode_logical(raw):
+    upper = np.char.upper(raw)
+    values = np.full(raw.shape, None, dtype=object)
+    values[np.isin(upper, [b"T", b"Y"])] = True
+    values[np.isin(upper, [b"F", b"N"])] = False
+    return values
+
+
+def _decode_date(raw):
+    text = np.char.decode(np.char.strip(raw), "ascii", errors="replace")
+    return pd.to_datetime(text, format="%Y%m%d", errors="coerce").to_numpy()
+
+
+def _decode(raw, field, encoding):
+    if field.type in "NFB":
+        return _decode_number(raw, field)
+    if field.type == "L":
+        return _decode_logical(raw)
+    if field.type == "D":
+        return _decode_date(raw)
+    return _decode_text(raw, encoding)
+
+
+def _load(dbf, encoding, keep_deleted=False):
+    """Loads fields, raw bytes of records which are not deleted, and FIDs of
+    them. If `keep_deleted` is `True`, raw bytes of deleted records are also
+    loaded, with their deletion flag.
+    """
+    with open(dbf, "rb") as file:
+        record_count, header_size, record_size, fields = _read_header(
+            file, encoding
+        )
+        file.seek(header_size)
+        buffer = file.read(record_count * record_size)
+
+    count = min(record_count, len(buffer) // record_size)
+    raw = np.frombuffer(buffer, dtype=np.uint8, count=count * record_size)
+    raw = raw.reshape(count, record_size)
+    is_alive = raw[:, 0] != ord("*")
+    if not is_alive.all() and not keep_deleted:
+        raw = raw[is_alive]
+    return fields, raw, np.flatnonzero(is_alive)
+
+
+def _read(dbf, fields, encoding):
+    dbf = Path(dbf).with_suffix(".dbf")
+    encoding = encoding or get_encoding(dbf)
+    all_fields, raw, fids = _load(dbf, encoding)
+
+    names = [field.name for field in all_fields]
+    if fields is None:
+        fields = names
+    missing = [name for name in fields if name not in names]
+    if missing:
+        raise KeyError(f"Fields not found in {dbf.name}: {missing}")
+
+    dtype = np.dtype(
+        {
+            "names": ["deleted"] + [f"f{i}" for i in range(len(all_fields))],
+            "formats": ["S1"] + [f"S{field.size}" for field in all_fields],
+            "offsets": [0] + list(np.cumsum([1] + [f.size for f in all_fields])[:-1]),
+            "itemsize": raw.shape[1],
+        }
+    )
+    records = np.ascontiguousarray(raw).view(dtype).ravel()
+
+    columns = {}
+    for name in fields:
+        i = names.index(name)
+        columns[name] = _decode(records[f"f{i}"].copy(), all_fields[i], encoding)
+    return fids, columns
+
+
+def read_columns(
+    dbf: Union[str, PathLike], fields: Sequence[str] = None, encoding: str = None
+) -> Dict[str, np.ndarray]:
+    """Reads columns of a dBASE table as typed numpy arrays.
+
+    Args:
+        `dbf`: Path to .dbf file, or shapefile having it.
+        `fields`: Names of fields to read. All fields are read if it is `None`.
+        `encoding`: Encoding of text. If it is `None`, the encoding in .cpg file
+            is used, or euc-kr if there is no .cpg file.
+
+    Returns:
+        Ordered dictionary from field name to its values. Deleted records are
+        excluded.
+    """
+    return _read(dbf, fields, encoding)[1]
+
+
+def read_dbf(
+    dbf: Union[str, PathLike], fields: Sequence[str] = None, encoding: str = None
+) -> pd.DataFrame:
+    """Reads a dBASE table into a DataFrame indexed by FID.
+
+    See `read_columns` for arguments.
+    """
+    fids, columns = _read(dbf, fields, encoding)
+    return pd.DataFrame(columns, index=pd.Index(fids, name="FID"))
+
+
+def infer_field(name: str, values: pd.Series) -> Field:
+    """Gets field definition of values in the way ArcGIS defines it."""
+    if pd.api.types.is_bool_dtype(values) or pd.api.types.is_integer_dtype(values):
+        return Field(name, "N", 10, 0)
+    if pd.api.types.is_float_dtype(values):
+        return Field(name, "F", 19, 11)
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return Field(name, "D", 8, 0)
+    return Field(name, "C", 254, 0)
+
+
+def _encode_text(values, field, encoding):
+    text = values.astype(object).where(values.notna(), "").astype(str)
+    encoded = np.char.encode(text.to_numpy(dtype=str), encoding, errors="replace")
+    return np.char.ljust(encoded, field.size)
+
+
+def _encode_number(values, field):
+    is_null = values.isna().to_numpy()
+    if field.decimal == 0 and field.type == "N":
+        numbers = values.fillna(0).to_numpy().astype(np.int64)
+        text = np.char.mod(f"%{field.size}d", numbers)
+    elif field.type == "N":
+        numbers = values.fillna(0).to_numpy().astype(np.float64)
+        text = np.char.mod(f"%{field.size}.{field.decimal}f", numbers)
+    else:
+        numbers = values.fillna(0).to_numpy().astype(np.float64)
+        text = np.char.mod(f"%{field.size}.{field.decimal}e", numbers)
+    text[is_null] = ""
+    too_wide = np.char.str_len(text) > field.size
+    if too_wide.any():
+        raise ValueError(
+            f"{values[too_wide].iloc[0]} does not fit in field {field.name} of "
+            f"{field.size} characters."
+        )
+    return np.char.rjust(np.char.encode(text, "ascii"), field.size)
+
+
+def _encode_logical(values):
+    text = np.full(len(values), b"?", dtype="S1")
+    text[values.eq(True).to_numpy()] = b"T"
+    text[values.eq(False).to_numpy()] = b"F"
+    return text
+
+
+def _encode_date(values):
+    text = pd.to_datetime(values).dt.strftime("%Y%m%d").fillna("")
+    return np.char.ljust(np.char.encode(text.to_numpy(dtype=str), "ascii"), 8)
+
+
+def _encode(values, field, encoding):
+    if field.type in "NFB":
+        encoded = _encode_number(values, field)
+    elif field.type == "L":
+        encoded = _encode_logical(values)
+    elif field.type == "D":
+        encoded = _encode_date(values)
+    else:
+        encoded = _encode_text(values, field, encoding)
+    return encoded.astype(f"S{field.size}")
+
+
+def _encode_name(name, encoding):
+    """Encodes field name within 10 bytes, without splitting a character."""
+    encoded = name.encode(encoding)
+    while len(encoded) > 10:
+        name = name[:-1]
+        encoded = name.encode(encoding)
+    return encoded
+
+
+def _encode_names(fields, encoding):
+    """Encodes field names, which must differ after they are cut to 10 bytes."""
+    names = [_encode_name(field.name, encoding) for field in fields]
+    seen = {}
+    for field, name in zip(fields, names):
+        if name in seen:
+            raise ValueError(
+                f"Field names {seen[name]} and {field.name} are the same "
+                f"within 10 bytes."
+            )
+        seen[name] = field.name
+    return names
+
+
+def _pack_header(record_count, fields, encoding):
+    today = datetime.date.today()
+    header_size = 32 + 32 * len(fields) + 1
+    record_size = 1 + sum(field.size for field in fields)
+    header = struct.pack(
+        "<4BIHH20x",
+        3,
+        today.year - 1900,
+        today.month,
+        today.day,
+        record_count,
+        header_size,
+        record_size,
+    )
+    descriptors = b"".join(
+        struct.pack(
+            "<11sc4xBB14x",
+            name,
+            field.type.encode("ascii"),
+            field.size,
+            field.decimal,
+        )
+        for field, name in zip(fields, _encode_names(fields, encoding))
+    )
+    return header + descriptors + b"\r"
+
+
+def write_dbf(
+    dbf: Union[str, PathLike],
+    df: pd.DataFrame,
+    encoding: str = "utf-8",
+    template: Union[str, PathLike] = None,
+    fields: Sequence[Field] = None,
+) -> Path:
+    """Writes a DataFrame as a dBASE table in one pass.
+
+    Args:
+        `dbf`: Path to .dbf file to write.
+        `df`: Table to write. Its index is ignored.
+        `encoding`: Encoding of text and field names.
+        `template`: Path to .dbf file whose records are copied as they are.
+            Columns of `df` are appended to them, so `df` must have as many rows
+            as the records of the template which are not deleted, in the same
+            order. Deleted records are kept deleted, so the table stays aligned
+            with the shapes.
+        `fields`: Field definitions of the columns of `df`. They are inferred
+            from dtypes if it is `None`.
+
+    Returns:
+        Path to written .dbf file.
+
+    Raises:
+        `ValueError`: If a number does not fit in its field, or names of two
+            fields are the same within 10 bytes.
+    """
+    dbf = Path(dbf).with_suffix(".dbf")
+    if fields is None:
+        fields = [infer_field(str(name), values) for name, values in df.items()]
+
+    if template is not None:
+        template = Path(template).with_suffix(".dbf")
+        base_fields, base_raw, fids = _load(
+            template, get_encoding(template), keep_deleted=True
+        )
+        if len(fids) != len(df):
+            raise ValueError(
+                f"{len(df)} rows cannot be appended to {len(fids)} records."
+            )
+    else:
+        base_fields, base_raw = [], np.full((len(df), 1), ord(" "), dtype=np.uint8)
+        fids = np.arange(len(df))
+
+    all_fields = [*base_fields, *fields]
+    record_size = 1 + sum(field.size for field in all_fields)
+    raw = np.full((len(base_raw), record_size), ord(" "), dtype=np.uint8)
+    raw[:, : base_raw.shape[1]] = base_raw
+    offset = base_raw.shape[1]
+    for field, (_, values) in zip(fields, df.items()):
+        encoded = _encode(values.reset_index(drop=True), field, encoding)
+        raw[fids, offset : offset + field.size] = encoded.view(np.uint8).reshape(
+            -1, field.size
+        )
+        offset += field.size
+
+    header = _pack_header(len(raw), all_fields, encoding)
+    with open(dbf, "wb") as file:
+        file.write(header)
+        file.write(raw.tobytes())
+        file.write(b"\x1a")
+    return dbf
+
+
+def written_columns(
+    df: pd.DataFrame, encoding: str = "utf-8", fields: Sequence[Field] = None
+) -> Dict[str, np.ndarray]:
+    """Gets columns of `df` as `read_columns` reads them after `write_dbf`, with
+    names cut to 10 bytes and values rounded, without reading the file.
+
+    See `write_dbf` for arguments.
+    """
+    if fields is None:
+        fields = [infer_field(str(name), values) for name, values in df.items()]
+    columns = {}
+    names = _encode_names(fields, encoding)
+    for field, name, (_, values) in zip(fields, names, df.items()):
+        encoded = _encode(values.reset_index(drop=True), field, encoding)
+        columns[name.decode(encoding)] = _decode(encoded, field, encoding)
+    return columns
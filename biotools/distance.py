@@ -0,0 +1,119 @@
+"""Exact Euclidean distance transform processed by strips of rows.
+
+Distances are separable as Felzenszwalb and Huttenlocher show: the distance to
+the nearest source within each column is found first, and then the lower
+envelope of parabolas along each row. Both passes only need a strip of rows at a
+time, with the nearest source rows above and below the strip carried over, so
+the whole grid does not have to be in memory.
+"""
+from typing import Callable, Iterator, Tuple
+
+import numpy as np
+
+from biotools.raster import _blocks
+
+STRIP_ROWS = 256
+_FAR = 1 << 40  # row index standing for no source
+
+
+def distance_strips(
+    source_strip: Callable[[slice], np.ndarray],
+    shape: Tuple[int, int],
+    cellsize: float,
+    strip_rows: int = STRIP_ROWS,
+) -> Iterator[Tuple[slice, np.ndarray]]:
+    """Computes distance from each cell center to the nearest source cell center.
+
+    Args:
+        `source_strip`: Function which gets boolean array of source cells in the
+            given slice of rows. It is called twice for each strip.
+        `shape`: Number of rows and columns of the grid.
+        `cellsize`: Cell size of the grid.
+        `strip_rows`: Number of rows in a strip.
+
+    Yields:
+        Slice of rows and float32 distances of the strip, from north to south.
+        Distances are `nan` if there is no source at all.
+    """
+    nrows, ncols = shape
+    strips = list(_blocks(nrows, strip_rows))
+
+    # nearest source row at or below the end of each strip
+    belows = []
+    below = np.full(ncols, _FAR, dtype=np.int64)
+    for rows in reversed(strips):
+        belows.append(below)
+        row_indices = np.arange(rows.start, rows.stop)[:, np.newaxis]
+        source_rows = np.where(source_strip(rows), row_indices, _FAR)
+        below = np.minimum(below, source_rows.min(axis=0))
+    belows.reverse()
+    source_cols = np.flatnonzero(below < _FAR)
+
+    above = np.full(ncols, -_FAR, dtype=np.int64)
+    for rows, below in zip(strips, belows):
+        if source_cols.size == 0:
+            yield rows, np.full((rows.stop - rows.start, ncols), np.nan, np.float32)
+            continue
+
+        is_source = source_strip(rows)[:, source_cols]
+        row_indices = np.arange(rows.start, rows.stop)[:, np.newaxis]
+        lasts = np.maximum.accumulate(
+            np.where(is_source, row_indices, -_FAR), axis=0
+        )
+        lasts = np.maximum(lasts, above[source_cols])
+        nexts = np.minimum.accumulate(
+            np.where(is_source, row_indices, _FAR)[::-1], axis=0
+        )[::-1]
+        nexts = np.minimum(nexts, below[source_cols])
+        above[source_cols] = lasts[-1]
+
+        column_distances = np.minimum(row_indices - lasts, nexts - row_indices)
+        squared = lower_envelope(
+            column_distances.astype(np.float64) ** 2, source_cols, ncols
+        )
+        yield rows, (np.sqrt(squared) * cellsize).astype(np.float32)
+
+
+def lower_envelope(f: np.ndarray, positions: np.ndarray, ncols: int) -> np.ndarray:
+    """Gets min over j of (q - positions[j]) ** 2 + f[:, j] for q in range(ncols).
+
+    Each row is an independent 1D problem. Rows are processed together, and
+    columns one by one as in Felzenszwalb and Huttenlocher.
+
+    Args:
+        `f`: Squared distances within columns, of shape (rows, len(positions)).
+        `positions`: Increasing column indices of `f`.
+        `ncols`: Number of columns of the result.
+    """
+    nrows, size = f.shape
+    rows = np.arange(nrows)
+    vertices = np.zeros((nrows, size), dtype=np.int32)  # indices of `positions`
+    bounds = np.full((nrows, size + 1), np.inf)
+    bounds[:, 0] = -np.inf
+    k = np.zeros(nrows, dtype=np.int64)
+    intersections = np.empty(nrows)
+    for j in range(1, size):
+        q = positions[j]
+        todo = rows
+        while todo.size:
+            v = vertices[todo, k[todo]]
+            p = positions[v]
+            s = ((f[todo, j] + q * q) - (f[todo, v] + p * p)) / (2.0 * (q - p))
+            is_hidden = s <= bounds[todo, k[todo]]
+            intersections[todo[~is_hidden]] = s[~is_hidden]
+            k[todo[is_hidden]] -= 1
+            todo = todo[is_hidden]
+        k += 1
+        vertices[rows, k] = j
+        bounds[rows, k] = intersections
+        bounds[rows, k + 1] = np.inf
+
+    # index of the parabola covering q is the number of bounds less than q
+    is_used = np.arange(1, size + 1) <= k[:, np.newaxis]
+    upper = np.where(is_used, bounds[:, 1:], np.inf).clip(-1, ncols)
+    offsets = np.arange(nrows)[:, np.newaxis] * (ncols + 2.0)
+    qs = np.arange(ncols)
+    indices = np.searchsorted((upper + offsets).ravel(), (qs + offsets).ravel())
+    indices = indices.reshape(nrows, ncols) - np.arange(nrows)[:, np.newaxis] * size
+    v = vertices[rows[:, np.newaxis], indices]
+    return (qs - positions[v]) ** 2 + f[rows[:, np.newaxis], v]
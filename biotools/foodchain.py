@@ -1,253 +1,254 @@
-import math
+import abc
 
-import arcpy
-import arcpy.analysis as aa
-import arcpy.management as am
-import arcpy.sa as asa
+import numpy as np
 import pandas as pd
 
-from biotools import arcutils, maxent, pdplus
+from biotools import maxent, pdplus
 
 
-class FoodResourceCount:
-    def __init__(
-        self,
-        biotope_shp,
-        surveypoint_shp,
-        foodchin_info_csv,
-        result_shp,
-        skip_noname=True,
-    ):
-        self._biotope_shp = str(biotope_shp)
-        self._surveypoint_shp = str(surveypoint_shp)
-        self._foodchain_info_df = pd.read_csv(foodchin_info_csv, encoding="euc-kr")
-        self._result_shp = str(result_shp)
-        self._skip_noname = skip_noname
-        self._surverpoint = _Surveypoint(self._surveypoint_shp)
+class _Aggregator:
+    """Counts survey points by biotope and category with scatter-adds.
 
-    def run(self):
-        self._surverpoint.enrich(
-            self._biotope_shp, self._foodchain_info_df, self._skip_noname
-        )
-        surveypoint_df = self._surverpoint.df
-
-        table = []
-        for bt_id, sub_df in surveypoint_df.groupby("BT_ID"):
-            if bt_id is None:
-                continue
-            count_s = sub_df.groupby("Owls_foods").sum()["개체수"]
-            total_count = count_s.sum()
-            prey_count = count_s.get("Prey_S", 0)
-            result = prey_count / total_count
-            table.append([bt_id, prey_count, total_count, result])
-
-        result_df = pd.DataFrame(
-            table, columns=["BT_ID", "F1_PREY_N", "F1_TOTAL_N", "F1_RESULT"]
+    BT_ID is factorized once and shared by every count, so F1, F2, F3, F4 and
+    F5 are derived from one pass over the survey points.
+    """
+
+    def __init__(self, surveypoint_df):
+        surveypoint_df = surveypoint_df[surveypoint_df["BT_ID"].notna()]
+        self._bt_codes, self.bt_ids = pd.factorize(surveypoint_df["BT_ID"], sort=True)
+        self._df = surveypoint_df
+        self._weights = surveypoint_df["개체수"].to_numpy(dtype=np.float64)
+
+    def count(self, column, categories=None, weighted=False):
+        """Gets biotope by category matrix of the number of records, or the sum of
+        개체수 if `weighted` is `True`.
+
+        All categories in `column` are counted if `categories` is `None`.
+        Missing values are not counted.
+        """
+        if categories is None:
+            codes, categories = pd.factorize(self._df[column])
+        else:
+            codes = pd.Index(categories).get_indexer(self._df[column])
+        is_valid = codes >= 0
+        size = len(categories)
+        weights = self._weights[is_valid] if weighted else None
+        counts = np.bincount(
+            self._bt_codes[is_valid] * size + codes[is_valid],
+            weights=weights,
+            minlength=len(self.bt_ids) * size,
         )
-        biotope_df = arcutils.shp_to_df(self._biotope_shp)
-        result_df = biotope_df[["BT_ID"]].merge(result_df, how="left", on="BT_ID")
-        result_df = result_df.fillna({"F1_RESULT": 0})
-        return arcutils.clean_join(self._biotope_shp, result_df, self._result_shp)
+        counts = counts.reshape(len(self.bt_ids), size)
+        return counts if weighted else counts.astype(np.int64)
+
+    def table(self, columns):
+        """Creates a result table of biotopes with `columns`, a name to values dict."""
+        return pd.DataFrame({"BT_ID": self.bt_ids, **columns})
+
 
+class _SurveypointIndicator(abc.ABC):
+    result_field = None
 
-class DiversityIndex:
     def __init__(
         self,
+        gis,
         biotope_shp,
         surveypoint_shp,
         foodchain_info_csv,
         result_shp,
         skip_noname=True,
+        write_csv=True,
+        surveypoint_df=None,
     ):
+        self._gis = gis
         self._biotope_shp = str(biotope_shp)
         self._surveypoint_shp = str(surveypoint_shp)
-        self._foodchain_info_df = pd.read_csv(foodchain_info_csv, encoding="euc-kr")
+        self._foodchain_info_csv = str(foodchain_info_csv)
         self._result_shp = str(result_shp)
+        self._write_csv = write_csv
         self._skip_noname = skip_noname
-        self._surverpoint = _Surveypoint(self._surveypoint_shp)
+        self._surveypoint_df = surveypoint_df
 
     def run(self):
-        self._surverpoint.enrich(
-            self._biotope_shp, self._foodchain_info_df, self._skip_noname
+        aggregator = _Aggregator(self._get_surveypoint_df())
+        return self.save(self.evaluate(aggregator))
+
+    @abc.abstractmethod
+    def evaluate(self, aggregator):
+        """Gets result table of biotopes having survey points."""
+
+    def save(self, result_df, biotope_df=None):
+        if biotope_df is None:
+            biotope_df = self._gis.shp_to_df(self._biotope_shp, ["BT_ID"])
+        result_df = biotope_df[["BT_ID"]].merge(result_df, how="left", on="BT_ID")
+        result_df = result_df.fillna({self.result_field: 0})
+        return self._gis.clean_join(
+            self._biotope_shp, result_df, self._result_shp, csv=self._write_csv
+        )
+
+    def _get_surveypoint_df(self):
+        if self._surveypoint_df is None:
+            self._surveypoint_df = enrich_surveypoint(
+                self._gis,
+                self._biotope_shp,
+                self._surveypoint_shp,
+                self._foodchain_info_csv,
+                self._skip_noname,
+            )
+        return self._surveypoint_df
+
+
+class FoodResourceCount(_SurveypointIndicator):
+    result_field = "F1_RESULT"
+
+    def evaluate(self, aggregator):
+        counts = aggregator.count("Owls_foods", weighted=True)
+        prey_counts = aggregator.count("Owls_foods", ["Prey_S"], weighted=True)[:, 0]
+        total_counts = counts.sum(axis=1)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            results = prey_counts / total_counts
+        return aggregator.table(
+            {
+                "F1_PREY_N": prey_counts,
+                "F1_TOTAL_N": total_counts,
+                "F1_RESULT": results,
+            }
         )
-        surveypoint_df = self._surverpoint.df
-
-        table = []
-        for bt_id, sub_df in surveypoint_df.groupby("BT_ID"):
-            if bt_id is None:
-                continue
-            count_s = sub_df.groupby("국명").sum()["개체수"]
-            shannon_index = self._get_shannon_index(count_s)
-            table.append([bt_id, count_s.sum(), shannon_index])
-
-        result_df = pd.DataFrame(table, columns=["BT_ID", "F2_COUNT", "F2_SHANNON"])
-        result_df = result_df.assign(
-            F2_RESULT=lambda x: self._minmax_normalize(x["F2_SHANNON"])
+
+
+class DiversityIndex(_SurveypointIndicator):
+    result_field = "F2_RESULT"
+
+    def evaluate(self, aggregator):
+        counts = aggregator.count("국명", weighted=True)
+        total_counts = counts.sum(axis=1)
+        shannon_indexes = self._get_shannon_index(counts, total_counts)
+        return aggregator.table(
+            {
+                "F2_COUNT": total_counts,
+                "F2_SHANNON": shannon_indexes,
+                "F2_RESULT": self._minmax_normalize(shannon_indexes),
+            }
         )
-        biotope_df = arcutils.shp_to_df(self._biotope_shp)
-        result_df = biotope_df[["BT_ID"]].merge(result_df, how="left", on="BT_ID")
-        result_df = result_df.fillna({"F2_RESULT": 0})
-        return arcutils.clean_join(self._biotope_shp, result_df, self._result_shp)
 
-    def _get_shannon_index(self, counts):
-        total = sum(counts)
-        proportions = [count / total for count in counts]
-        return sum(-(p * math.log2(p)) for p in proportions)
+    def _get_shannon_index(self, counts, total_counts):
+        with np.errstate(divide="ignore", invalid="ignore"):
+            proportions = counts / total_counts[:, np.newaxis]
+            terms = np.where(proportions > 0, proportions * np.log2(proportions), 0)
+        return -terms.sum(axis=1)
 
     def _minmax_normalize(self, seq):
-        maximum = max(seq)
-        minimum = min(seq)
-        return [(i - minimum) / (maximum - minimum) for i in seq]
+        if len(seq) == 0:
+            return seq
+        maximum = seq.max()
+        minimum = seq.min()
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return (seq - minimum) / (maximum - minimum)
+
 
+class CombinableProducersAndConsumers(_SurveypointIndicator):
+    result_field = "F3_RESULT"
 
-class CombinableProducersAndConsumers:
     def __init__(
         self,
+        gis,
         biotope_shp,
         surveypoint_shp,
         foodchain_info_csv,
         result_shp,
         skip_noname=True,
         scores=(0.3, 0.6, 1),
+        write_csv=True,
+        surveypoint_df=None,
     ):
-        self._biotope_shp = str(biotope_shp)
-        self._surveypoint_shp = str(surveypoint_shp)
-        self._foodchain_info_df = pd.read_csv(foodchain_info_csv, encoding="euc-kr")
-        self._result_shp = str(result_shp)
-        self._skip_noname = skip_noname
+        super().__init__(
+            gis,
+            biotope_shp,
+            surveypoint_shp,
+            foodchain_info_csv,
+            result_shp,
+            skip_noname,
+            write_csv,
+            surveypoint_df,
+        )
         self._scores = scores
-        self._surverpoint = _Surveypoint(self._surveypoint_shp)
 
-    def run(self):
-        self._surverpoint.enrich(
-            self._biotope_shp, self._foodchain_info_df, self._skip_noname
-        )
-        surveypoint_df = self._surverpoint.df
-
-        table = []
-        for bt_id, sub_df in surveypoint_df.groupby("BT_ID"):
-            if bt_id is None:
-                continue
-            count_s = sub_df["D_Level"].value_counts()
-            d_counts = [count_s.get(d_name, 0) for d_name in ["D1", "D2", "D3"]]
-            unique_count = sum(bool(d_count) for d_count in d_counts)
-            score = self._scores[unique_count - 1]
-            table.append([bt_id, *d_counts, score])
-
-        result_df = pd.DataFrame(
-            table, columns=["BT_ID", "F3_D1_N", "F3_D2_N", "F3_D3_N", "F3_RESULT"]
+    def evaluate(self, aggregator):
+        d_counts = aggregator.count("D_Level", ["D1", "D2", "D3"])
+        unique_counts = (d_counts > 0).sum(axis=1)
+        scores = np.asarray(self._scores)[unique_counts - 1]
+        return aggregator.table(
+            {
+                "F3_D1_N": d_counts[:, 0],
+                "F3_D2_N": d_counts[:, 1],
+                "F3_D3_N": d_counts[:, 2],
+                "F3_RESULT": scores,
+            }
         )
-        biotope_df = arcutils.shp_to_df(self._biotope_shp)
-        result_df = biotope_df[["BT_ID"]].merge(result_df, how="left", on="BT_ID")
-        result_df = result_df.fillna({"F3_RESULT": 0})
-        return arcutils.clean_join(self._biotope_shp, result_df, self._result_shp)
 
 
-class ConnectionStrength:
-    def __init__(
-        self,
-        biotope_shp,
-        surveypoint_shp,
-        foodchain_info_csv,
-        result_shp,
-        skip_noname=True,
-    ):
-        self._biotope_shp = str(biotope_shp)
-        self._surveypoint_shp = str(surveypoint_shp)
-        self._foodchain_info_df = pd.read_csv(foodchain_info_csv, encoding="euc-kr")
-        self._result_shp = str(result_shp)
-        self._skip_noname = skip_noname
-        self._surverpoint = _Surveypoint(self._surveypoint_shp)
+class ConnectionStrength(_SurveypointIndicator):
+    result_field = "F4_RESULT"
 
-    def run(self):
-        self._surverpoint.enrich(
-            self._biotope_shp, self._foodchain_info_df, self._skip_noname
+    def evaluate(self, aggregator):
+        prey_counts = aggregator.count("Owls_foods", ["Prey_S"])[:, 0]
+        return aggregator.table(
+            {
+                "F4_PREY_N": prey_counts,
+                "F4_RESULT": (prey_counts > 0).astype(np.int64),
+            }
         )
-        surveypoint_df = self._surverpoint.df
-
-        table = []
-        for bt_id, sub_df in surveypoint_df.groupby("BT_ID"):
-            if bt_id is None:
-                continue
-            count_s = sub_df["Owls_foods"].value_counts()
-            prey_count = count_s.get("Prey_S", 0)
-            table.append([bt_id, prey_count, int(prey_count > 0)])
-
-        result_df = pd.DataFrame(table, columns=["BT_ID", "F4_PREY_N", "F4_RESULT"])
-        biotope_df = arcutils.shp_to_df(self._biotope_shp)
-        result_df = biotope_df[["BT_ID"]].merge(result_df, how="left", on="BT_ID")
-        result_df = result_df.fillna({"F4_RESULT": 0})
-        return arcutils.clean_join(self._biotope_shp, result_df, self._result_shp)
 
 
-class SimilarFunctionalSpecies:
-    def __init__(
-        self,
-        biotope_shp,
-        surveypoint_shp,
-        foodchain_info_csv,
-        result_shp,
-        skip_noname=True,
-    ):
-        self._biotope_shp = str(biotope_shp)
-        self._surveypoint_shp = str(surveypoint_shp)
-        self._foodchain_info_df = pd.read_csv(foodchain_info_csv, encoding="euc-kr")
-        self._result_shp = str(result_shp)
-        self._skip_noname = skip_noname
-        self._surverpoint = _Surveypoint(self._surveypoint_shp)
+class SimilarFunctionalSpecies(_SurveypointIndicator):
+    result_field = "F5_RESULT"
 
-    def run(self):
-        self._surverpoint.enrich(
-            self._biotope_shp, self._foodchain_info_df, self._skip_noname
+    def evaluate(self, aggregator):
+        counts = aggregator.count(
+            "Alternative_S", ["Threatened_S", "Alt_Alien_S", "Alt_S", "Normal_S"]
         )
-        surveypoint_df = self._surverpoint.df
-
-        table = []
-        for bt_id, sub_df in surveypoint_df.groupby("BT_ID"):
-            if bt_id is None:
-                continue
-            count_s = sub_df["Alternative_S"].value_counts()
-            threatened_count = count_s.get("Threatened_S", 0)
-            alt_alien_count = count_s.get("Alt_Alien_S", 0)
-            alt_count = count_s.get("Alt_S", 0)
-            normal_count = count_s.get("Normal_S", 0)
-            table.append(
-                [
-                    bt_id,
-                    threatened_count,
-                    alt_alien_count,
-                    alt_count,
-                    normal_count,
-                    self._score_orderly([alt_count, alt_alien_count], [1, 0.5], 0),
-                ]
-            )
-
-        result_df = pd.DataFrame(
-            table,
-            columns=[
-                "BT_ID",
-                "F5_THRT_N",
-                "F5_ALIEN_N",
-                "F5_ALT_N",
-                "F5_NORM_N",
-                "F5_RESULT",
-            ],
+        threatened_counts, alt_alien_counts, alt_counts, normal_counts = counts.T
+        return aggregator.table(
+            {
+                "F5_THRT_N": threatened_counts,
+                "F5_ALIEN_N": alt_alien_counts,
+                "F5_ALT_N": alt_counts,
+                "F5_NORM_N": normal_counts,
+                "F5_RESULT": self._score_orderly(
+                    [alt_counts, alt_alien_counts], [1, 0.5], 0
+                ),
+            }
         )
-        biotope_df = arcutils.shp_to_df(self._biotope_shp)
-        result_df = biotope_df[["BT_ID"]].merge(result_df, how="left", on="BT_ID")
-        result_df = result_df.fillna({"F5_RESULT": 0})
-        return arcutils.clean_join(self._biotope_shp, result_df, self._result_shp)
 
     def _score_orderly(self, counts, scores, default):
-        for count, score in zip(counts, scores):
-            if count > 0:
-                return score
-        return default
+        return np.select([count > 0 for count in counts], scores, default)
+
+
+def run_together(indicators, surveypoint_df):
+    """Runs F1, F2, F3, F4 and F5 indicators over one aggregation of survey points.
+
+    Args:
+        `indicators`: Indicators sharing the same biotope shapefile.
+        `surveypoint_df`: Enriched survey points. See `enrich_surveypoint`.
+
+    Returns:
+        Paths to result shapefiles in the order of `indicators`.
+    """
+    aggregator = _Aggregator(surveypoint_df)
+    biotope_df = None
+    result_shps = []
+    for indicator in indicators:
+        if biotope_df is None:
+            biotope_df = indicator._gis.shp_to_df(indicator._biotope_shp, ["BT_ID"])
+        result_df = indicator.evaluate(aggregator)
+        result_shps.append(indicator.save(result_df, biotope_df))
+    return result_shps
 
 
 class FoodResourceInhabitation:
     def __init__(
         self,
+        gis,
         biotope_shp,
         environmentallayer_dir,
         surveypoint_shp,
@@ -255,38 +256,27 @@ class FoodResourceInhabitation:
         sample_csv,
         maxent_dir,
         result_shp,
+        write_csv=True,
+        maxent_options=None,
     ):
+        self._gis = gis
         self._biotope_shp = str(biotope_shp)
         self._environmentallayer_dir = str(environmentallayer_dir)
         self._surveypoint_shp = str(surveypoint_shp)
         self._foodchain_info_df = pd.read_csv(foodchain_info_csv, encoding="euc-kr")
         self._sample_csv = str(sample_csv)
         self._maxent_dir = str(maxent_dir)
+        self._maxent_options = maxent_options or {}
         self._result_shp = str(result_shp)
-        self._surverpoint = _Surveypoint(self._surveypoint_shp)
+        self._write_csv = write_csv
+        self._surverpoint = _Surveypoint(self._gis, self._surveypoint_shp)
 
     def run(self):
-        self._surverpoint.merge_foodchain_info(self._foodchain_info_df)
-        surveypoint_itrf_df = self._surverpoint.df
-        self._export_samples(surveypoint_itrf_df, self._sample_csv)
+        self.export_samples()
+        ascs = self.run_maxent()
 
-        ascs = maxent.run_maxent(
-            self._sample_csv,
-            self._environmentallayer_dir,
-            self._maxent_dir,
-        )
-
-        mean_raster = asa.CellStatistics([str(asc) for asc in ascs], "MEAN")
-        with arcpy.EnvManager(outputCoordinateSystem=arcutils.ITRF2000_PRJ):
-            result_table = asa.ZonalStatisticsAsTable(
-                self._biotope_shp,
-                "BT_ID",
-                mean_raster,
-                "memory/result_table",
-                statistics_type="MEAN",
-            )
-        result_df = arcutils.shp_to_df(result_table)
-        am.Delete(result_table)
+        mean_raster = self._gis.mean_raster(ascs)
+        result_df = self._gis.zonal_statistics(self._biotope_shp, mean_raster, "MEAN")
 
         result_df = result_df.drop(columns="ZONE_CODE")
         result_df = result_df.rename(
@@ -296,10 +286,26 @@ class FoodResourceInhabitation:
                 "MEAN": "F6_RESULT",
             }
         )
-        biotope_df = arcutils.shp_to_df(self._biotope_shp)
+        biotope_df = self._gis.shp_to_df(self._biotope_shp, ["BT_ID"])
         result_df = biotope_df[["BT_ID"]].merge(result_df, how="left", on="BT_ID")
         result_df = result_df.fillna({"F6_RESULT": 0})
-        return arcutils.clean_join(self._biotope_shp, result_df, self._result_shp)
+        return self._gis.clean_join(
+            self._biotope_shp, result_df, self._result_shp, csv=self._write_csv
+        )
+
+    def export_samples(self):
+        """Exports survey points of prey species as samples of maxent."""
+        self._surverpoint.merge_foodchain_info(self._foodchain_info_df)
+        self._export_samples(self._surverpoint.df, self._sample_csv)
+
+    def run_maxent(self):
+        """Models prey species on exported samples, without geoprocessing."""
+        return maxent.run_maxent(
+            self._sample_csv,
+            self._environmentallayer_dir,
+            self._maxent_dir,
+            **self._maxent_options,
+        )
 
     def _export_samples(self, df, path):
         df = df[df["Owls_foods"] == "Prey_S"]
@@ -312,10 +318,24 @@ class FoodResourceInhabitation:
         df.to_csv(path, index=False, encoding="euc-kr")
 
 
+def enrich_surveypoint(
+    gis, biotope_shp, surveypoint_shp, foodchain_info_csv, skip_noname=True
+):
+    """Joins the biotope and the foodchain information of each survey point.
+
+    The result is shared by F1, F2, F3, F4 and F5, which do not modify it.
+    """
+    foodchain_info_df = pd.read_csv(foodchain_info_csv, encoding="euc-kr")
+    surveypoint = _Surveypoint(gis, surveypoint_shp)
+    surveypoint.enrich(str(biotope_shp), foodchain_info_df, skip_noname)
+    return surveypoint.df
+
+
 class _Surveypoint:
-    def __init__(self, surveypoint_shp):
+    def __init__(self, gis, surveypoint_shp):
+        self._gis = gis
         self._surveypoint_shp = str(surveypoint_shp)
-        self._surverpoint_df = arcutils.shp_to_df(surveypoint_shp)
+        self._surverpoint_df = gis.shp_to_df(surveypoint_shp)
 
     @property
     def df(self):
@@ -326,10 +346,9 @@ class _Surveypoint:
         self.merge_foodchain_info(foodchain_info_df, skip_noname)
 
     def merge_biotope(self, biotope_shp):
-        with arcpy.EnvManager(outputCoordinateSystem=arcutils.WGS1984_PRJ):
-            joined = aa.SpatialJoin(self._surveypoint_shp, biotope_shp, "memory/joined")
-        self._surverpoint_df = arcutils.shp_to_df(joined)
-        am.Delete(joined)
+        self._surverpoint_df = self._surverpoint_df.assign(
+            BT_ID=self._gis.locate_points(self._surveypoint_shp, biotope_shp)
+        )
 
         self._surverpoint_df["개체수"] = pd.to_numeric(
             self._surverpoint_df["개체수"], errors="coerce"
@@ -346,7 +365,7 @@ class _Surveypoint:
 
         if skip_noname:
             self._surverpoint_df = pdplus.drop_if(
-                self._surverpoint_df, lambda x: x["국명"] == " "
+                self._surverpoint_df, lambda x: x["국명"].str.strip() == ""
             )
         else:
             self._surverpoint_df = pdplus.replace_row(
@@ -357,5 +376,5 @@ class _Surveypoint:
                     "D_Level": "D3",
                     "Alternative_s": "Normal_S",
                 },
-                lambda x: x["국명"] == " ",
+                lambda x: x["국명"].str.strip() == "",
             )
@@ -0,0 +1,74 @@
+"""Writer of GeoParquet files, which keep a table with its geometries in one
+columnar file without the limits of shapefiles on field names and file size.
+
+Geometries are stored as WKB in longitude and latitude of WGS1984, which is
+the default CRS of GeoParquet. It requires pyarrow.
+"""
+import json
+from os import PathLike
+from pathlib import Path
+from typing import List, Sequence, Union
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+VERSION = "1.0.0"
+GEOMETRY_TYPES = {
+    1: "Point",
+    2: "LineString",
+    3: "Polygon",
+    4: "MultiPoint",
+    5: "MultiLineString",
+    6: "MultiPolygon",
+    7: "GeometryCollection",
+}
+
+
+def geometry_types(wkbs: Sequence[bytes]) -> List[str]:
+    """Gets names of geometry types in `wkbs` from their headers."""
+    type_ids = set()
+    for wkb in wkbs:
+        if wkb is not None:
+            byteorder = "little" if wkb[0] == 1 else "big"
+            type_ids.add(int.from_bytes(wkb[1:5], byteorder) % 1000)
+    return [GEOMETRY_TYPES[type_id] for type_id in sorted(type_ids)]
+
+
+def write_geoparquet(
+    path: Union[str, PathLike],
+    df: pd.DataFrame,
+    wkbs: Sequence[bytes],
+    geometry_column: str = "geometry",
+) -> Path:
+    """Writes `df` with WKB geometries as a GeoParquet file.
+
+    Args:
+        `path`: Path to .parquet file. Existing one is replaced.
+        `df`: Attribute table. Its index is ignored.
+        `wkbs`: WKB of the geometry of each row in WGS1984, or `None` for rows
+            without geometry.
+        `geometry_column`: Name of the geometry column.
+
+    Returns:
+        Path to written file.
+    """
+    path = Path(path)
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    wkbs = [None if wkb is None else bytes(wkb) for wkb in wkbs]
+    table = table.append_column(geometry_column, pa.array(wkbs, pa.binary()))
+    metadata = {
+        "version": VERSION,
+        "primary_column": geometry_column,
+        "columns": {
+            geometry_column: {
+                "encoding": "WKB",
+                "geometry_types": geometry_types(wkbs),
+            }
+        },
+    }
+    table = table.replace_schema_metadata(
+        {**(table.schema.metadata or {}), b"geo": json.dumps(metadata).encode()}
+    )
+    pq.write_table(table, path)
+    return path
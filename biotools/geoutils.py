@@ -0,0 +1,659 @@
+"""Geoprocessing backend using numpy, shapely and pyproj, without arcpy.
+
+It provides the same functions as `arcutils`, so that evaluations run on any
+platform where the open-source stack is installed.
+"""
+from concurrent.futures import ThreadPoolExecutor
+import functools
+import importlib.resources
+from os import PathLike
+from pathlib import Path
+from typing import Sequence, Union
+
+import numpy as np
+import pandas as pd
+import pyproj
+import shapefile
+import shapely
+
+from biotools import adjacency, dbf, shputils, tablecache, zonal
+from biotools.distance import STRIP_ROWS, distance_strips
+from biotools.raster import (
+    Raster,
+    StripRaster,
+    _blocks,
+    combine_any,
+    combine_mean,
+    disc_offsets,
+    disc_sums,
+    grid_of,
+    read_asc,
+)
+from biotools.shputils import clean_join
+
+
+def _init_projection(name):
+    with importlib.resources.path("biotools.res", name) as path:
+        return pyproj.CRS.from_wkt(Path(path).read_text())
+
+
+WGS1984_PRJ = _init_projection("GCS_WGS_1984.prj")
+ITRF2000_PRJ = _init_projection("ITRF_2000_UTM_K.prj")
+
+
+def _get_crs(shp):
+    return pyproj.CRS.from_wkt(Path(shp).with_suffix(".prj").read_text())
+
+
+def _transformer(from_crs, to_crs):
+    return pyproj.Transformer.from_crs(from_crs, to_crs, always_xy=True)
+
+
+def _read_shapes(shp):
+    with shapefile.Reader(str(shp), encoding=dbf.get_encoding(shp)) as reader:
+        return reader.shapeType, reader.fields[1:], reader.shapes(), reader.records()
+
+
+def _write_shapes(shp, shape_type, fields, shapes, records, crs):
+    shp = Path(shp)
+    with shapefile.Writer(str(shp), shapeType=shape_type, encoding="utf-8") as writer:
+        writer.fields = fields
+        for shape, record in zip(shapes, records):
+            writer.shape(shape)
+            writer.record(*record)
+    shp.with_suffix(".cpg").write_text("UTF-8")
+    shp.with_suffix(".prj").write_text(crs.to_wkt(pyproj.enums.WktVersion.WKT1_ESRI))
+    return shp
+
+
+def read_geometries(shp, crs=None):
+    """Reads features as shapely geometries, projected to `crs` if given.
+
+    Geometries are kept in the session table cache until the shapefile changes,
+    so that the shapefile is decoded once and each projection is made once.
+    The returned array is read-only.
+    """
+    if crs is None:
+        load = functools.partial(_decode_geometries, shp)
+    else:
+        load = functools.partial(_project_geometries, shp, crs)
+    return tablecache.SESSION.read_geometries(shp, load, crs)
+
+
+def _decode_geometries(shp):
+    with shapefile.Reader(str(shp), encoding=dbf.get_encoding(shp)) as reader:
+        return np.array(
+            [shapely.geometry.shape(shape) for shape in reader.iterShapes()],
+            dtype=object,
+        )
+
+
+def _project_geometries(shp, crs):
+    transformer = _transformer(_get_crs(shp), crs)
+    return shapely.transform(
+        read_geometries(shp),
+        lambda xy: np.column_stack(transformer.transform(*xy.T)),
+    )
+
+
+def read_wkb(shp):
+    """Reads features as WKB, in the coordinate system of `shp`."""
+    return shapely.to_wkb(read_geometries(shp))
+
+
+def get_fields(layer):
+    return ["FID", "Shape"] + [field.name for field in dbf.read_fields(layer)]
+
+
+def shp_to_df(shp: Union[str, PathLike], fields: Sequence[str] = None):
+    """Reads attribute table indexed by FID.
+
+    If `fields` is given, only those fields are read. Geometries are read as
+    centroid coordinates only if "Shape" is requested.
+    """
+    if fields is None:
+        fields = get_fields(shp)[1:]
+    result_df = tablecache.SESSION.read_dbf(
+        shp, [field for field in fields if field != "Shape"]
+    )
+    if "Shape" in fields:
+        points = shapely.centroid(read_geometries(shp))
+        result_df.insert(
+            fields.index("Shape"),
+            "Shape",
+            list(zip(shapely.get_x(points), shapely.get_y(points))),
+        )
+    return result_df
+
+
+def get_coordsys(layer):
+    """for debug"""
+    return _get_crs(layer).name
+
+
+def project(in_shp, out_shp, spatial_reference):
+    shape_type, fields, shapes, records = _read_shapes(in_shp)
+    transformer = _transformer(_get_crs(in_shp), spatial_reference)
+    for shape in shapes:
+        if not shape.points:
+            continue
+        xs, ys = transformer.transform(*np.asarray(shape.points)[:, :2].T)
+        shape.points = list(zip(xs, ys))
+        if hasattr(shape, "bbox"):
+            shape.bbox = shapefile.BBox(xs.min(), ys.min(), xs.max(), ys.max())
+    _write_shapes(out_shp, shape_type, fields, shapes, records, spatial_reference)
+    return out_shp
+
+
+def add_id_field(shp, idfield):
+    fids = dbf.read_dbf(shp, []).index
+    id_df = pd.DataFrame({idfield: [f"{idfield}{fid}" for fid in fids]})
+    dbf.write_dbf(shp, id_df, dbf.get_encoding(shp), template=shp)
+
+
+def _locate(points, polygons, batch_size=1_000_000):
+    """Gets index of the first polygon intersecting each point, or -1 if none.
+
+    Polygons are bulk loaded into an STR-tree, and points are queried against
+    it in batches of `batch_size`.
+    """
+    tree = shapely.STRtree(polygons)
+    matched = np.full(len(points), len(polygons))
+    for start in range(0, len(points), batch_size):
+        point_index, polygon_index = tree.query(
+            points[start : start + batch_size], predicate="intersects"
+        )
+        np.minimum.at(matched, point_index + start, polygon_index)
+    matched[matched == len(polygons)] = -1
+    return matched
+
+
+def locate_points(point_shp, polygon_shp, field="BT_ID"):
+    """Gets `field` of the polygon containing each point of `point_shp`.
+
+    Returns:
+        Array aligned with the records of `point_shp`. Points out of every
+        polygon get `None`.
+    """
+    points = read_geometries(point_shp, WGS1984_PRJ)
+    polygons = read_geometries(polygon_shp, WGS1984_PRJ)
+    values = dbf.read_columns(polygon_shp, [field])[field].astype(object)
+
+    matched = _locate(points, polygons)
+    is_matched = matched >= 0
+    result = np.full(len(points), None, dtype=object)
+    result[is_matched] = values[matched[is_matched]]
+    return result
+
+
+def spatial_join(target_shp, join_shp):
+    """Joins attributes of `join_shp` to each feature of `target_shp`."""
+    target_df = shp_to_df(target_shp)
+    join_df = shp_to_df(join_shp).drop(columns="Shape")
+    targets = read_geometries(target_shp, WGS1984_PRJ)
+    joins = read_geometries(join_shp, WGS1984_PRJ)
+
+    matched = _locate(targets, joins)
+    is_matched = matched >= 0
+    joined_df = join_df.iloc[matched.clip(0)].reset_index(drop=True).astype(object)
+    joined_df.loc[~is_matched] = None
+    joined_df.columns = [
+        f"{name}_1" if name in target_df.columns else name
+        for name in joined_df.columns
+    ]
+    result_df = pd.concat(
+        [
+            target_df[["Shape"]].reset_index(drop=True),
+            pd.DataFrame(
+                {
+                    "Join_Count": is_matched.astype(int),
+                    "TARGET_FID": target_df.index.to_numpy(),
+                }
+            ),
+            target_df.drop(columns="Shape").reset_index(drop=True),
+            joined_df,
+        ],
+        axis=1,
+    )
+    result_df.index = pd.RangeIndex(1, len(result_df) + 1, name="OBJECTID")
+    return result_df
+
+
+def _read_biotopes(biotope_shp, selection=None):
+    biotope_df = shp_to_df(biotope_shp, ["BT_ID", "비오톱"]).reset_index(drop=True)
+    geometries = read_geometries(biotope_shp, ITRF2000_PRJ)
+    if selection is not None:
+        biotope_df = biotope_df[selection].reset_index(drop=True)
+        geometries = geometries[selection]
+    return biotope_df, geometries
+
+
+def adjacency_graph(biotope_shp):
+    """Gets adjacency graph of all biotopes of `biotope_shp`.
+
+    The graph is saved next to the shapefile at the first build, and loaded
+    while the shapefile is unchanged. After the shapefile is edited, the saved
+    graph is updated by finding edges of the edited biotopes only.
+    """
+    npz = Path(biotope_shp).with_suffix(".adjacency.npz")
+    key = shputils.fingerprint(biotope_shp)
+    graph = adjacency.AdjacencyGraph.load(npz, key)
+    if graph is None:
+        biotope_df, geometries = _read_biotopes(biotope_shp)
+        digests = shputils.record_digests(biotope_shp)
+        previous = adjacency.AdjacencyGraph.load(npz, any_key=True)
+        if previous is None:
+            graph = adjacency.build_graph(
+                geometries, biotope_df["BT_ID"], digests=digests
+            )
+        else:
+            graph = adjacency.update_graph(
+                previous, geometries, biotope_df["BT_ID"], digests
+            )
+        try:
+            graph.save(npz, key)
+        except OSError:
+            pass  # read-only directory
+    return graph
+
+
+def patch_hectares(biotope_shp, selection, targets=None):
+    """Groups selected biotopes into patches of adjacent ones, as dissolving into
+    single parts does, and gets the area of the patch containing each biotope in
+    hectares.
+
+    Patches are labeled on the adjacency graph, and their areas are the sums of
+    the areas of their biotopes, so no dissolved geometry is built. If the
+    boolean mask `targets` is given, only the targets and the biotopes in the
+    patches of selected targets are measured.
+    """
+    selection = np.asarray(selection)
+    biotope_df = shp_to_df(biotope_shp, ["BT_ID"]).reset_index(drop=True)
+    graph = adjacency_graph(biotope_shp).subgraph(selection)
+    patches = graph.components()
+    is_measured = np.ones(len(patches), dtype=bool)
+    rows = np.ones(len(biotope_df), dtype=bool)
+    if targets is not None:
+        targets = np.asarray(targets)
+        is_measured = np.isin(patches, patches[targets[selection]])
+        rows = targets.copy()
+        rows[np.flatnonzero(selection)[is_measured]] = True
+
+    geometries = read_geometries(biotope_shp, ITRF2000_PRJ)[selection]
+    areas = np.zeros(len(patches))
+    areas[is_measured] = shapely.area(geometries[is_measured])
+    hectares = np.bincount(patches, weights=areas, minlength=len(areas))[patches]
+    hectare_s = pd.Series(
+        hectares[is_measured] / 10000, index=graph.bt_ids[is_measured]
+    )
+    hectare_s = hectare_s[~hectare_s.index.duplicated()]
+    return biotope_df.loc[rows, ["BT_ID"]].assign(
+        HECTARE=lambda x: x["BT_ID"].map(hectare_s).astype(float)
+    )
+
+
+def tabulate_buffer_intersection(
+    biotope_shp, selection, buffer_distance, batch_size=10_000, targets=None
+):
+    """Gets the area and percentage of each buffered biotope covered by the
+    dissolved selected biotopes.
+
+    Dissolved pieces near each buffer are found with a spatial index, and
+    intersections are computed by batches of buffer and piece pairs on threads.
+    If the boolean mask `targets` is given, only those biotopes are buffered,
+    and only selected biotopes near them are dissolved.
+    """
+    selected_df, selected = _read_biotopes(biotope_shp, selection)
+    if targets is not None:
+        return _tabulate_targets(
+            selected_df, selected, np.asarray(targets)[selection], buffer_distance
+        )
+    buffers = shapely.buffer(selected, buffer_distance)
+    pieces = shapely.get_parts(shapely.union_all(selected))
+
+    tree = shapely.STRtree(pieces)
+    buffer_indices, piece_indices = tree.query(buffers, predicate="intersects")
+
+    def intersection_areas(pairs):
+        intersections = shapely.intersection(
+            buffers[buffer_indices[pairs]], pieces[piece_indices[pairs]]
+        )
+        return shapely.area(intersections)
+
+    with ThreadPoolExecutor() as executor:  # GEOS releases the GIL
+        pair_areas = list(
+            executor.map(intersection_areas, _blocks(len(buffer_indices), batch_size))
+        )
+    areas = np.bincount(
+        buffer_indices,
+        weights=np.concatenate([np.zeros(0), *pair_areas]),
+        minlength=len(buffers),
+    )
+    result_df = selected_df[["BT_ID"]].assign(
+        AREA=areas, PERCENTAGE=areas / shapely.area(buffers) * 100
+    )
+    result_df.index = pd.RangeIndex(1, len(result_df) + 1, name="OBJECTID")
+    return result_df[result_df["AREA"] > 0]
+
+
+def _tabulate_targets(selected_df, selected, is_target, buffer_distance):
+    buffers = shapely.buffer(selected[is_target], buffer_distance)
+    tree = shapely.STRtree(selected)
+    buffer_indices, selected_indices = tree.query(buffers, predicate="intersects")
+    # groups the pairs by buffer once, rather than masking them for each buffer
+    order = np.argsort(buffer_indices, kind="stable")
+    bounds = np.cumsum(np.bincount(buffer_indices, minlength=len(buffers)))[:-1]
+    groups = np.split(selected_indices[order], bounds)
+    areas = np.array(
+        [
+            shapely.area(
+                shapely.intersection(buffer, shapely.union_all(selected[group]))
+            )
+            for buffer, group in zip(buffers, groups)
+        ]
+    )
+    result_df = selected_df.loc[is_target, ["BT_ID"]].assign(
+        AREA=areas, PERCENTAGE=areas / shapely.area(buffers) * 100
+    )
+    result_df.index = pd.RangeIndex(1, len(result_df) + 1, name="OBJECTID")
+    return result_df[result_df["AREA"] > 0]
+
+
+def _buffer_fraction_raster(biotopes, selected, buffer_distance, cellsize):
+    """Gets the fraction of cells of `selected` within `buffer_distance` meters
+    from each cell, over `biotopes` and the buffer around them.
+
+    The selected biotopes are rasterized by cell centers, and summed over a disc
+    with a summed-area table, by strips when the raster is read.
+    """
+    xmin, ymin, xmax, ymax = shapely.total_bounds(biotopes)
+    extent = (
+        xmin - buffer_distance,
+        ymin - buffer_distance,
+        xmax + buffer_distance,
+        ymax + buffer_distance,
+    )
+    tree = shapely.STRtree(selected)
+    radius = buffer_distance / cellsize
+    reach = int(np.floor(radius))
+    disc_size = (2 * disc_offsets(radius) + 1).sum()
+
+    def strips():
+        for rows in _blocks(grid.nrows, STRIP_ROWS):
+            start, stop = rows.start - reach, rows.stop + reach
+            halo = slice(max(start, 0), min(stop, grid.nrows))
+            strip = grid.strip(halo)
+            candidates = np.sort(tree.query(shapely.box(*strip.extent)))
+            is_selected = rasterize(selected[candidates], strip, candidates) >= 0
+            is_selected = np.pad(
+                is_selected.astype(np.float64),
+                ((halo.start - start, stop - halo.stop), (0, 0)),
+            )
+            yield rows, (disc_sums(is_selected, radius) / disc_size).astype(np.float32)
+
+    grid = StripRaster(strips, *grid_of(extent, cellsize), cellsize)
+    return grid
+
+
+def tabulate_buffer_fraction(
+    biotope_shp, selection, buffer_distance, cellsize, targets=None
+):
+    """Approximates `tabulate_buffer_intersection` on a raster of `cellsize`.
+
+    PERCENTAGE is the mean over cells of each selected biotope of the fraction
+    of selected biotopes within `buffer_distance` from the cell, and AREA is
+    PERCENTAGE of the buffer area, which is area + perimeter * distance +
+    pi * distance ** 2 for a convex biotope. The cost depends on the size of
+    the raster, not on the number of biotopes. Biotopes too small to contain a
+    cell center are skipped. If the boolean mask `targets` is given, only those
+    biotopes are summarized.
+    """
+    _, selected = _read_biotopes(biotope_shp, selection)
+    biotopes = read_geometries(biotope_shp, ITRF2000_PRJ)
+    fraction_raster = _buffer_fraction_raster(
+        biotopes, selected, buffer_distance, cellsize
+    )
+    if targets is not None:
+        selection = np.logical_and(selection, targets)
+    bt_ids, accumulator = _accumulate_strips(
+        biotope_shp, fraction_raster, selection, ["MEAN"]
+    )
+    result_df = accumulator.result(cellsize)
+    summarized = biotopes[selection]
+    buffer_areas = (
+        shapely.area(summarized)
+        + shapely.length(summarized) * buffer_distance
+        + np.pi * buffer_distance**2
+    )[result_df.index]
+    result_df = pd.DataFrame(
+        {
+            "BT_ID": bt_ids[result_df.index],
+            "AREA": result_df["MEAN"].to_numpy() * buffer_areas,
+            "PERCENTAGE": result_df["MEAN"].to_numpy() * 100,
+        }
+    )
+    result_df.index = pd.RangeIndex(1, len(result_df) + 1, name="OBJECTID")
+    return result_df[result_df["AREA"] > 0]
+
+
+def read_raster(asc):
+    return read_asc(asc)
+
+
+def any_raster(rasters: Sequence[Raster]):
+    """For each cell, get the probability that at least one probability will be true."""
+    return rasters[0].with_array(combine_any([raster.array for raster in rasters]))
+
+
+def mean_raster(ascs):
+    rasters = [read_asc(asc) for asc in ascs]
+    return rasters[0].with_array(combine_mean([raster.array for raster in rasters]))
+
+
+def threshold_raster(raster, threshold):
+    """Cells greater than or equal to `threshold` get 1, the others get NoData."""
+    with np.errstate(invalid="ignore"):
+        array = np.where(raster.array >= threshold, 1.0, np.nan)
+    return raster.with_array(array.astype(np.float32))
+
+
+def _distance_raster(source_strip, extent, cellsize):
+    shape, xmin, ymin = grid_of(extent, cellsize)
+
+    def strips():
+        return distance_strips(source_strip, shape, cellsize)
+
+    return StripRaster(strips, shape, xmin, ymin, cellsize)
+
+
+def euc_distance(source_raster, cellsize):
+    """Gets euclidean distance raster to cells of `source_raster` which are not
+    NoData. The distances are computed by strips when they are read.
+    """
+    result = StripRaster(None, *grid_of(source_raster.extent, cellsize), cellsize)
+    xs = result.center_xs()
+    cols = source_raster.index(xs, np.zeros_like(xs))[1]
+    cols = cols.clip(0, source_raster.ncols - 1)
+
+    def source_strip(rows):
+        ys = result.center_ys(rows.start, rows.stop)
+        source_rows = source_raster.index(np.zeros_like(ys), ys)[0]
+        source_rows = source_rows.clip(0, source_raster.nrows - 1)
+        return ~np.isnan(source_raster.array[np.ix_(source_rows, cols)])
+
+    return _distance_raster(source_strip, source_raster.extent, cellsize)
+
+
+def point_distance(
+    point_csv, biotope_shp, cellsize, x_field="경도", y_field="위도", search_radius=5000
+):
+    """Gets euclidean distance raster to WGS1984 points in `point_csv` within
+    `search_radius` meters from biotopes, covering both of them. The distances
+    are computed by strips when they are read.
+    """
+    point_df = pd.read_csv(point_csv, encoding="euc-kr")
+    transformer = _transformer(WGS1984_PRJ, ITRF2000_PRJ)
+    xs, ys = transformer.transform(
+        point_df[x_field].to_numpy(float), point_df[y_field].to_numpy(float)
+    )
+    points = shapely.points(xs, ys)
+    biotopes = read_geometries(biotope_shp, ITRF2000_PRJ)
+
+    tree = shapely.STRtree(biotopes)
+    point_indices, _ = tree.query(points, predicate="dwithin", distance=search_radius)
+    selected = points[np.unique(point_indices)]
+
+    extent = _merge_extent(
+        shapely.total_bounds(biotopes), shapely.total_bounds(selected)
+    )
+    grid = StripRaster(None, *grid_of(extent, cellsize), cellsize)
+    point_rows, point_cols = grid.index(
+        shapely.get_x(selected), shapely.get_y(selected)
+    )
+    point_rows = point_rows.clip(0, grid.nrows - 1)
+    point_cols = point_cols.clip(0, grid.ncols - 1)
+
+    def source_strip(rows):
+        is_source = np.zeros((rows.stop - rows.start, grid.ncols), dtype=bool)
+        is_in = (point_rows >= rows.start) & (point_rows < rows.stop)
+        is_source[point_rows[is_in] - rows.start, point_cols[is_in]] = True
+        return is_source
+
+    return _distance_raster(source_strip, extent, cellsize)
+
+
+def nearest_point_distance(
+    point_csv, biotope_shp, x_field="경도", y_field="위도", targets=None
+):
+    """Gets the exact distance in meters from each biotope to the nearest WGS1984
+    point in `point_csv`, which is 0 for a point inside the biotope.
+
+    Returns:
+        Table of BT_ID and MIN in the order of biotopes, or of biotopes where
+        the boolean mask `targets` is `True`. MIN is `nan` if there is no point.
+    """
+    point_df = pd.read_csv(point_csv, encoding="euc-kr")
+    transformer = _transformer(WGS1984_PRJ, ITRF2000_PRJ)
+    xs, ys = transformer.transform(
+        point_df[x_field].to_numpy(float), point_df[y_field].to_numpy(float)
+    )
+    biotope_df, biotopes = _read_biotopes(biotope_shp, targets)
+    distances = np.full(len(biotopes), np.nan)
+    if len(xs):
+        tree = shapely.STRtree(shapely.points(xs, ys))
+        (biotope_indices, _), nearest = tree.query_nearest(
+            biotopes, return_distance=True, all_matches=False
+        )
+        distances[biotope_indices] = nearest
+    return pd.DataFrame({"BT_ID": biotope_df["BT_ID"], "MIN": distances})
+
+
+def _merge_extent(extent1, extent2):
+    if np.isnan(extent2).any():
+        return tuple(extent1)
+    return (
+        min(extent1[0], extent2[0]),
+        min(extent1[1], extent2[1]),
+        max(extent1[2], extent2[2]),
+        max(extent1[3], extent2[3]),
+    )
+
+
+def rasterize(geometries, raster, indices=None):
+    """Gets zone raster of which cells have the index of geometry containing
+    their center, or -1.
+
+    If `indices` is given, cells get `indices[i]` for `geometries[i]` instead.
+    Later geometries overwrite earlier ones.
+    """
+    zone = np.full((raster.nrows, raster.ncols), -1, dtype=np.int64)
+    if indices is None:
+        indices = range(len(geometries))
+    for index, geometry in zip(indices, geometries):
+        rows, cols = raster.window(shapely.bounds(geometry))
+        xs, ys = np.meshgrid(
+            raster.center_xs(cols.start, cols.stop),
+            raster.center_ys(rows.start, rows.stop),
+        )
+        is_in = shapely.contains_xy(geometry, xs, ys)
+        zone[rows, cols][is_in] = index
+    return zone
+
+
+_STATISTICS_FIELDS = {
+    "MEAN": ["MEAN"],
+    "MINIMUM": ["MIN"],
+    "MAXIMUM": ["MAX"],
+    "SUM": ["SUM"],
+    "ALL": ["MIN", "MAX", "MEAN", "SUM"],
+}
+
+
+def zone_raster(zone_shp, raster, selection=None):
+    """Gets BT_ID of zones and the zone raster of biotopes on the grid of `raster`.
+
+    Zone rasters are kept in the session table cache per biotope shapefile,
+    `selection` and grid, until the shapefile changes or they are evicted by
+    its limit of bytes, so indicators on the same grid rasterize it once.
+    """
+    zone_df, zones = _read_biotopes(zone_shp, selection)
+    key = (
+        str(Path(zone_shp).absolute()),
+        shputils.fingerprint(zone_shp),
+        "zone",
+        None if selection is None else np.asarray(selection, bool).tobytes(),
+        (raster.xmin, raster.ymin, raster.cellsize, raster.nrows, raster.ncols),
+    )
+
+    def load():
+        grid = Raster(
+            np.empty((raster.nrows, raster.ncols), dtype=np.uint8),
+            raster.xmin,
+            raster.ymin,
+            raster.cellsize,
+        )
+        return rasterize(zones, grid).astype(np.int32)
+
+    return zone_df["BT_ID"].to_numpy(), tablecache.SESSION.get(key, load)
+
+
+def _accumulate_strips(zone_shp, raster, selection, statistics):
+    """Rasterizes zones strip by strip along strips of `raster`, so that neither
+    the zone raster nor the value raster is in memory as a whole.
+    """
+    zone_df, zones = _read_biotopes(zone_shp, selection)
+    tree = shapely.STRtree(zones)
+    accumulator = zonal.ZonalAccumulator(len(zones), statistics)
+    for rows, values in raster.iter_strips():
+        strip = raster.strip(rows)
+        candidates = np.sort(tree.query(shapely.box(*strip.extent)))
+        zone = rasterize(zones[candidates], strip, candidates)
+        accumulator.add(zone, values)
+    return zone_df["BT_ID"].to_numpy(), accumulator
+
+
+def zonal_statistics(zone_shp, raster, statistics_type, selection=None):
+    """Summarizes `raster` within each biotope of `zone_shp`.
+
+    If `selection` is given, only biotopes where the mask is `True` are
+    summarized.
+    `statistics_type` is one of "MEAN", "MINIMUM", "MAXIMUM", "SUM" and "ALL",
+    which gets MIN, MAX, MEAN and SUM together.
+    """
+    fields = _STATISTICS_FIELDS[statistics_type]
+    if isinstance(raster, StripRaster):
+        bt_ids, accumulator = _accumulate_strips(
+            zone_shp, raster, selection, ["COUNT", "AREA", *fields]
+        )
+    else:
+        bt_ids, zone = zone_raster(zone_shp, raster, selection)
+        accumulator = zonal.ZonalAccumulator(len(bt_ids), ["COUNT", "AREA", *fields])
+        accumulator.add(zone, raster.array)
+    result_df = accumulator.result(raster.cellsize)
+    result_df = result_df.assign(
+        BT_ID=bt_ids[result_df.index],
+        ZONE_CODE=result_df.index + 1,
+    )
+    result_df = result_df[["BT_ID", "ZONE_CODE", "COUNT", "AREA", *fields]]
+    result_df.index = pd.RangeIndex(1, len(result_df) + 1, name="OBJECTID")
+    return result_df
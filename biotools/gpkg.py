@@ -0,0 +1,311 @@
+"""Results of all indicators in one GeoPackage file.
+
+The biotope map is stored once as a feature table keyed by BT_ID, and each
+indicator adds its columns to it. Only rows whose values differ from the
+stored ones are written, so re-running an indicator on a partly edited map
+touches a few rows. Arguments and timings of runs are kept in a metadata
+table. The file is an SQLite database, readable by GIS software and sqlite3.
+"""
+import datetime
+import json
+from os import PathLike
+from pathlib import Path
+import sqlite3
+import struct
+import threading
+from typing import Sequence, Union
+
+import numpy as np
+import pandas as pd
+
+RESULTS_TABLE = "biotope_results"
+RUNS_TABLE = "biotools_runs"
+STATE_TABLE = "biotools_state"
+GEOMETRY_COLUMN = "geom"
+WGS1984_SRS_ID = 4326
+WGS1984_WKT = (
+    'GEOGCS["WGS 84",DATUM["WGS_1984",SPHEROID["WGS 84",6378137,298.257223563,'
+    'AUTHORITY["EPSG","7030"]],AUTHORITY["EPSG","6326"]],PRIMEM["Greenwich",0,'
+    'AUTHORITY["EPSG","8901"]],UNIT["degree",0.0174532925199433,'
+    'AUTHORITY["EPSG","9122"]],AUTHORITY["EPSG","4326"]]'
+)
+# "GPKG" and version 1.3
+APPLICATION_ID = 0x47504B47
+USER_VERSION = 10300
+
+_SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS gpkg_spatial_ref_sys (
+    srs_name TEXT NOT NULL,
+    srs_id INTEGER PRIMARY KEY,
+    organization TEXT NOT NULL,
+    organization_coordsys_id INTEGER NOT NULL,
+    definition TEXT NOT NULL,
+    description TEXT
+);
+CREATE TABLE IF NOT EXISTS gpkg_contents (
+    table_name TEXT NOT NULL PRIMARY KEY,
+    data_type TEXT NOT NULL,
+    identifier TEXT UNIQUE,
+    description TEXT DEFAULT '',
+    last_change DATETIME NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%fZ','now')),
+    min_x DOUBLE,
+    min_y DOUBLE,
+    max_x DOUBLE,
+    max_y DOUBLE,
+    srs_id INTEGER REFERENCES gpkg_spatial_ref_sys(srs_id)
+);
+CREATE TABLE IF NOT EXISTS gpkg_geometry_columns (
+    table_name TEXT NOT NULL,
+    column_name TEXT NOT NULL,
+    geometry_type_name TEXT NOT NULL,
+    srs_id INTEGER NOT NULL REFERENCES gpkg_spatial_ref_sys(srs_id),
+    z TINYINT NOT NULL,
+    m TINYINT NOT NULL,
+    PRIMARY KEY (table_name, column_name)
+);
+CREATE TABLE IF NOT EXISTS {RESULTS_TABLE} (
+    fid INTEGER PRIMARY KEY AUTOINCREMENT,
+    {GEOMETRY_COLUMN} BLOB,
+    BT_ID TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS {RUNS_TABLE} (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    tag TEXT NOT NULL,
+    arguments TEXT NOT NULL,
+    started TEXT NOT NULL,
+    seconds REAL NOT NULL,
+    changed_rows INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS {STATE_TABLE} (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+def _geometry_blob(wkb, srs_id=WGS1984_SRS_ID):
+    """Wraps WKB in the GeoPackage geometry header, without envelope."""
+    if wkb is None:
+        return None
+    return b"GP" + struct.pack("<BBi", 0, 1, srs_id) + bytes(wkb)
+
+
+def _sqlite_type(values):
+    if pd.api.types.is_bool_dtype(values) or pd.api.types.is_integer_dtype(values):
+        return "INTEGER"
+    if pd.api.types.is_float_dtype(values):
+        return "REAL"
+    return "TEXT"
+
+
+def _quote(name):
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+def _to_sqlite(values):
+    """Converts values to Python objects sqlite3 takes, with `None` for nulls."""
+    values = values.astype(object)
+    return values.where(values.notna(), None).map(
+        lambda value: value.item() if isinstance(value, np.generic) else value
+    )
+
+
+class GeoPackageStore:
+    """Results table of biotopes in the GeoPackage file `path`."""
+
+    def __init__(self, path: Union[str, PathLike]):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        with self._connect() as connection:
+            connection.executescript(_SCHEMA)
+            connection.execute(f"PRAGMA application_id = {APPLICATION_ID}")
+            connection.execute(f"PRAGMA user_version = {USER_VERSION}")
+            connection.executemany(
+                "INSERT OR IGNORE INTO gpkg_spatial_ref_sys "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                [
+                    ("Undefined cartesian SRS", -1, "NONE", -1, "undefined", None),
+                    ("Undefined geographic SRS", 0, "NONE", 0, "undefined", None),
+                    ("WGS 84", WGS1984_SRS_ID, "EPSG", 4326, WGS1984_WKT, None),
+                ],
+            )
+            connection.execute(
+                "INSERT OR IGNORE INTO gpkg_contents (table_name, data_type, "
+                "identifier, srs_id) VALUES (?, 'features', ?, ?)",
+                (RESULTS_TABLE, RESULTS_TABLE, WGS1984_SRS_ID),
+            )
+            connection.execute(
+                "INSERT OR IGNORE INTO gpkg_geometry_columns VALUES "
+                "(?, ?, 'GEOMETRY', ?, 0, 0)",
+                (RESULTS_TABLE, GEOMETRY_COLUMN, WGS1984_SRS_ID),
+            )
+            for table in [RUNS_TABLE, STATE_TABLE]:
+                connection.execute(
+                    "INSERT OR IGNORE INTO gpkg_contents (table_name, data_type, "
+                    "identifier) VALUES (?, 'attributes', ?)",
+                    (table, table),
+                )
+
+    def _connect(self):
+        connection = sqlite3.connect(self.path, timeout=60)
+        return _Transaction(connection, self._lock)
+
+    def columns(self) -> list:
+        """Gets names of result columns, besides BT_ID."""
+        with self._connect() as connection:
+            rows = connection.execute(f"PRAGMA table_info({RESULTS_TABLE})")
+            names = [row[1] for row in rows]
+        return [
+            name for name in names if name not in ("fid", GEOMETRY_COLUMN, "BT_ID")
+        ]
+
+    @property
+    def biotopes_key(self) -> Union[str, None]:
+        """Key with which the biotopes were stored, or `None`."""
+        with self._connect() as connection:
+            stored = connection.execute(
+                f"SELECT value FROM {STATE_TABLE} WHERE key = 'biotopes'"
+            ).fetchone()
+        return None if stored is None else stored[0]
+
+    def write_biotopes(self, bt_ids: Sequence[str], wkbs: Sequence[bytes], key: str):
+        """Stores geometries of biotopes in WGS1984, identified by `key`.
+
+        Biotopes no longer in `bt_ids` are deleted with their results.
+        """
+        with self._connect() as connection:
+            connection.execute("CREATE TEMP TABLE current_ids (BT_ID TEXT)")
+            connection.executemany(
+                "INSERT INTO current_ids VALUES (?)", [(str(i),) for i in bt_ids]
+            )
+            connection.execute(
+                f"DELETE FROM {RESULTS_TABLE} "
+                "WHERE BT_ID NOT IN (SELECT BT_ID FROM current_ids)"
+            )
+            connection.executemany(
+                f"INSERT INTO {RESULTS_TABLE} (BT_ID, {GEOMETRY_COLUMN}) "
+                "VALUES (?, ?) ON CONFLICT(BT_ID) DO UPDATE SET "
+                f"{GEOMETRY_COLUMN} = excluded.{GEOMETRY_COLUMN}",
+                [
+                    (str(bt_id), _geometry_blob(wkb))
+                    for bt_id, wkb in zip(bt_ids, wkbs)
+                ],
+            )
+            connection.execute(
+                f"INSERT OR REPLACE INTO {STATE_TABLE} VALUES ('biotopes', ?)",
+                (key,),
+            )
+
+    def upsert(self, result_df: pd.DataFrame) -> int:
+        """Stores result columns of `result_df` by its BT_ID column, writing only
+        rows whose values differ from the stored ones.
+
+        Returns:
+            Number of rows written.
+        """
+        result_df = result_df.drop_duplicates("BT_ID").set_index("BT_ID")
+        result_df.index = result_df.index.astype(str)
+        names = list(result_df.columns)
+        with self._connect() as connection:
+            table_info = connection.execute(f"PRAGMA table_info({RESULTS_TABLE})")
+            existing = {row[1] for row in table_info}
+            for name in names:
+                if name not in existing:
+                    connection.execute(
+                        f"ALTER TABLE {RESULTS_TABLE} ADD COLUMN {_quote(name)} "
+                        f"{_sqlite_type(result_df[name])}"
+                    )
+            stored_df = pd.read_sql_query(
+                f"SELECT BT_ID, {', '.join(map(_quote, names))} FROM {RESULTS_TABLE}",
+                connection,
+                index_col="BT_ID",
+            ).reindex(result_df.index)
+            is_same = result_df.eq(stored_df).fillna(False).astype(bool)
+            is_same |= result_df.isna() & stored_df.isna()
+            changed_df = result_df[~is_same.all(axis=1)]
+
+            quoted = [_quote(name) for name in names]
+            connection.executemany(
+                f"INSERT INTO {RESULTS_TABLE} (BT_ID, {', '.join(quoted)}) "
+                f"VALUES ({', '.join('?' * (len(names) + 1))}) ON CONFLICT(BT_ID) "
+                f"DO UPDATE SET {', '.join(f'{q} = excluded.{q}' for q in quoted)}",
+                zip(changed_df.index, *[_to_sqlite(changed_df[n]) for n in names]),
+            )
+            connection.execute(
+                "UPDATE gpkg_contents SET last_change = "
+                "strftime('%Y-%m-%dT%H:%M:%fZ','now') WHERE table_name = ?",
+                (RESULTS_TABLE,),
+            )
+        return len(changed_df)
+
+    def record_run(
+        self,
+        tag: str,
+        arguments: dict,
+        started: datetime.datetime,
+        seconds: float,
+        changed_rows: int,
+    ):
+        """Adds a run of indicator `tag` to the metadata table."""
+        with self._connect() as connection:
+            connection.execute(
+                f"INSERT INTO {RUNS_TABLE} (tag, arguments, started, seconds, "
+                "changed_rows) VALUES (?, ?, ?, ?, ?)",
+                (
+                    tag,
+                    json.dumps(arguments, ensure_ascii=False, default=str),
+                    started.isoformat(timespec="seconds"),
+                    seconds,
+                    changed_rows,
+                ),
+            )
+
+    def read(
+        self, columns: Sequence[str] = None, bt_ids: Sequence[str] = None
+    ) -> pd.DataFrame:
+        """Reads BT_ID and result `columns` of biotopes `bt_ids`, or of all.
+
+        Rows are selected on the BT_ID index, so reading a few biotopes does
+        not scan the table.
+        """
+        columns = self.columns() if columns is None else list(columns)
+        selected = ", ".join(_quote(name) for name in ["BT_ID", *columns])
+        query = f"SELECT {selected} FROM {RESULTS_TABLE}"
+        with self._connect() as connection:
+            if bt_ids is None:
+                return pd.read_sql_query(query + " ORDER BY fid", connection)
+            connection.execute("CREATE TEMP TABLE selected_ids (BT_ID TEXT)")
+            connection.executemany(
+                "INSERT INTO selected_ids VALUES (?)", [(str(i),) for i in bt_ids]
+            )
+            query += " WHERE BT_ID IN (SELECT BT_ID FROM selected_ids) ORDER BY fid"
+            return pd.read_sql_query(query, connection)
+
+    def runs(self) -> pd.DataFrame:
+        """Reads the metadata table of runs."""
+        with self._connect() as connection:
+            return pd.read_sql_query(
+                f"SELECT * FROM {RUNS_TABLE} ORDER BY id", connection, index_col="id"
+            )
+
+
+class _Transaction:
+    """Holds the lock and commits or rolls back, then closes the connection."""
+
+    def __init__(self, connection, lock):
+        self._connection = connection
+        self._lock = lock
+
+    def __enter__(self):
+        self._lock.acquire()
+        return self._connection
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        try:
+            if exc_type is None:
+                self._connection.commit()
+            else:
+                self._connection.rollback()
+        finally:
+            self._connection.close()
+            self._lock.release()
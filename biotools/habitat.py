@@ -1,55 +1,57 @@
-import arcpy
-import arcpy.analysis as aa
-import arcpy.management as am
-import arcpy.sa as asa
 import numpy as np
 import pandas as pd
 
-from biotools import arcutils, maxent
+from biotools import codes, maxent
+
+
+def _classify(gis, biotope_shp, classification):
+    if classification is None:
+        biotope_df = gis.shp_to_df(biotope_shp, ["비오톱"])
+        classification = codes.ClassificationIndex(biotope_df["비오톱"].to_numpy())
+    return classification
 
 
 class HabitatSize:
-    def __init__(self, biotope_shp, result_shp, lower_bounds, scores):
+    def __init__(
+        self,
+        gis,
+        biotope_shp,
+        result_shp,
+        lower_bounds,
+        scores,
+        write_csv=True,
+        classification=None,
+    ):
+        self._gis = gis
         self._biotope_shp = str(biotope_shp)
         self._result_shp = str(result_shp)
+        self._write_csv = write_csv
         self._lower_bounds = lower_bounds
         self._scores = scores
+        self._classification = classification
 
     def run(self):
-        medium_codes = arcutils.get_medium_codes([9, 10, 12, 13, 14, 15])
-        query = arcutils.query_isin("비오톱", medium_codes)
-        selected = am.SelectLayerByAttribute(self._biotope_shp, "NEW_SELECTION", query)
-
-        with arcpy.EnvManager(outputCoordinateSystem=arcutils.WGS1984_PRJ):
-            dissolved = am.Dissolve(
-                selected,
-                "memory/dissolved",
-                # dissolve_field="비오톱",
-                multi_part="SINGLE_PART",
-            )
-        am.Delete(selected)
-
-        with arcpy.EnvManager(outputCoordinateSystem=arcutils.ITRF2000_PRJ):
-            am.CalculateGeometryAttributes(
-                dissolved,
-                [["H1_HECTARE", "AREA"]],
-                area_unit="HECTARES",
-            )
-
-        with arcpy.EnvManager(outputCoordinateSystem=arcutils.WGS1984_PRJ):
-            sized = aa.SpatialJoin(
-                self._biotope_shp, dissolved, "memory/sized", match_option="WITHIN"
-            )
-        am.Delete(dissolved)
-
-        result_df = arcutils.shp_to_df(sized)
-        am.Delete(sized)
+        return self.save(self.measure())
+
+    def measure(self, targets=None):
+        """Gets HECTARE of the patch of each biotope, or of the biotopes in the
+        patches of those where the boolean mask `targets` is `True`.
+        """
+        classification = _classify(self._gis, self._biotope_shp, self._classification)
+        return self._gis.patch_hectares(
+            self._biotope_shp, classification.masks["green"], targets=targets
+        )
 
-        result_df = result_df[["BT_ID", "H1_HECTARE"]]
+    def save(self, result_df):
+        result_df = result_df.rename(columns={"HECTARE": "H1_HECTARE"})
+        biotope_df = self._gis.shp_to_df(self._biotope_shp, ["BT_ID"])
+        result_df = biotope_df[["BT_ID"]].merge(result_df, how="left", on="BT_ID")
         result_df = result_df.assign(
             H1_RESULT=lambda x: x["H1_HECTARE"].apply(self._range_evaluate)
         )
-        return arcutils.clean_join(self._biotope_shp, result_df, self._result_shp)
+        return self._gis.clean_join(
+            self._biotope_shp, result_df, self._result_shp, csv=self._write_csv
+        )
 
     def _range_evaluate(self, value):
         if np.isnan(value):
@@ -62,17 +64,29 @@ class HabitatSize:
 
 
 class StructuredLayer:
-    def __init__(self, biotope_shp, result_shp, scores):
+    def __init__(
+        self,
+        gis,
+        biotope_shp,
+        result_shp,
+        scores,
+        write_csv=True,
+        classification=None,
+    ):
+        self._gis = gis
         self._biotope_shp = str(biotope_shp)
         self._result_shp = str(result_shp)
+        self._write_csv = write_csv
         self._scores = scores
+        self._classification = classification
 
     def run(self):
-        biotope_df = arcutils.shp_to_df(self._biotope_shp)
-        is_green_s = ~biotope_df["비오톱"].isin(arcutils.get_medium_codes(range(1, 9)))
+        biotope_df = self._gis.shp_to_df(self._biotope_shp, ["BT_ID"])
+        classification = _classify(self._gis, self._biotope_shp, self._classification)
+        is_green = ~classification.masks["developed"]
 
-        structure_df = self._create_dummy_structure()
-        green_df = structure_df[is_green_s]
+        structure_df = self._create_dummy_structure(biotope_df)
+        green_df = structure_df[is_green]
         green_df = self._score_structured_layer(green_df)
         green_df = green_df.rename(
             columns={
@@ -83,12 +97,13 @@ class StructuredLayer:
         )
         result_df = biotope_df[["BT_ID"]].merge(green_df, how="left", on="BT_ID")
         result_df = result_df.fillna({"H2_RESULT": 0})
-        return arcutils.clean_join(self._biotope_shp, result_df, self._result_shp)
+        return self._gis.clean_join(
+            self._biotope_shp, result_df, self._result_shp, csv=self._write_csv
+        )
 
-    def _create_dummy_structure(self):
+    def _create_dummy_structure(self, biotope_df):
         import random
 
-        biotope_df = arcutils.shp_to_df(self._biotope_shp)
         return biotope_df[["BT_ID"]].assign(
             HERB=random.choices(["N", "Y"], weights=[1, 1], k=len(biotope_df)),
             SHRUB=random.choices(["N", "Y"], weights=[3, 1], k=len(biotope_df)),
@@ -107,139 +122,159 @@ class StructuredLayer:
 
 
 class PatchIsolation:
-    def __init__(self, biotope_shp, result_shp):
+    METHODS = ("vector", "raster")
+
+    def __init__(
+        self,
+        gis,
+        biotope_shp,
+        result_shp,
+        buffer_distance=125,
+        write_csv=True,
+        method="vector",
+        cellsize=5,
+        classification=None,
+    ):
+        if method not in self.METHODS:
+            raise ValueError(
+                f"Unknown method {method!r}. Choose one of {list(self.METHODS)}."
+            )
+        self._gis = gis
         self._biotope_shp = str(biotope_shp)
         self._result_shp = str(result_shp)
+        self._buffer_distance = buffer_distance
+        self._write_csv = write_csv
+        self._method = method
+        self._cellsize = cellsize
+        self._classification = classification
 
     def run(self):
-        medium_codes = arcutils.get_medium_codes([9, 10, 12, 13, 14, 15])
-        query = arcutils.query_isin("비오톱", medium_codes)
-        selected = am.SelectLayerByAttribute(self._biotope_shp, "NEW_SELECTION", query)
-
-        with arcpy.EnvManager(outputCoordinateSystem=arcutils.ITRF2000_PRJ):
-            buffer_layer = aa.Buffer(selected, "memory/buffer_layer", "125 Meters")
-
-        with arcpy.EnvManager(outputCoordinateSystem=arcutils.ITRF2000_PRJ):
-            dissolved = am.Dissolve(
-                selected,
-                "memory/dissolved",
-            )
-        am.Delete(selected)
-
-        with arcpy.EnvManager(outputCoordinateSystem=arcutils.ITRF2000_PRJ):
-            in_buffer_table = aa.TabulateIntersection(
-                buffer_layer,
-                "BT_ID",
-                dissolved,
-                "memory/in_buffer_table",
-                out_units="SQUARE_METERS",
+        return self.save(self.measure())
+
+    def measure(self, targets=None):
+        """Gets covered AREA and PERCENTAGE of buffers of green biotopes, or of
+        those where the boolean mask `targets` is `True`.
+        """
+        classification = _classify(self._gis, self._biotope_shp, self._classification)
+        is_green = classification.masks["green"]
+        if self._method == "raster":
+            return self._gis.tabulate_buffer_fraction(
+                self._biotope_shp,
+                is_green,
+                self._buffer_distance,
+                self._cellsize,
+                targets=targets,
             )
-        result_df = arcutils.shp_to_df(in_buffer_table)
-        am.Delete(in_buffer_table)
-        am.Delete(buffer_layer)
-        am.Delete(dissolved)
+        return self._gis.tabulate_buffer_intersection(
+            self._biotope_shp, is_green, self._buffer_distance, targets=targets
+        )
 
+    def save(self, result_df):
         result_df = result_df.rename(
             columns={"AREA": "H3_AREA", "PERCENTAGE": "H3_RESULT"}
         )
-        biotope_df = arcutils.shp_to_df(self._biotope_shp)
+        biotope_df = self._gis.shp_to_df(self._biotope_shp, ["BT_ID"])
         result_df = biotope_df[["BT_ID"]].merge(result_df, how="left", on="BT_ID")
         result_df = result_df.fillna({"H3_RESULT": 0})
-        return arcutils.clean_join(self._biotope_shp, result_df, self._result_shp)
+        return self._gis.clean_join(
+            self._biotope_shp, result_df, self._result_shp, csv=self._write_csv
+        )
 
 
 class LeastCostDistribution:
     def __init__(
         self,
+        gis,
         biotope_shp,
         keystone_species_csv,
         environmentallayer_dir,
         maxent_dir,
         result_shp,
+        write_csv=True,
+        maxent_options=None,
     ):
+        self._gis = gis
         self._biotope_shp = str(biotope_shp)
         self._keystone_species_csv = str(keystone_species_csv)
         self._environmentallayer_dir = str(environmentallayer_dir)
         self._maxent_dir = str(maxent_dir)
+        self._maxent_options = maxent_options or {}
         self._result_shp = str(result_shp)
+        self._write_csv = write_csv
 
     def run(self):
         ascs = maxent.run_maxent(
-            self._keystone_species_csv, self._environmentallayer_dir, self._maxent_dir
+            self._keystone_species_csv,
+            self._environmentallayer_dir,
+            self._maxent_dir,
+            **self._maxent_options,
         )
 
-        probability_raster = arcutils.any_raster([arcpy.Raster(asc) for asc in ascs])
-        with arcpy.EnvManager(outputCoordinateSystem=arcutils.ITRF2000_PRJ):
-            result_table = asa.ZonalStatisticsAsTable(
-                self._biotope_shp,
-                "BT_ID",
-                probability_raster,
-                "memory/result_table",
-                statistics_type="MEAN",
-            )
-        result_df = arcutils.shp_to_df(result_table)
-        am.Delete(result_table)
+        probability_raster = self._gis.any_raster(
+            [self._gis.read_raster(asc) for asc in ascs]
+        )
+        result_df = self._gis.zonal_statistics(
+            self._biotope_shp, probability_raster, "MEAN"
+        )
 
         result_df = result_df.assign(H4_RESULT=lambda x: 1 - x["MEAN"])
         result_df = result_df.drop(columns="ZONE_CODE")
         result_df = result_df.rename(
             columns={"COUNT": "H4_COUNT", "AREA": "H4_AREA", "MEAN": "H4_MEAN"}
         )
-        biotope_df = arcutils.shp_to_df(self._biotope_shp)
+        biotope_df = self._gis.shp_to_df(self._biotope_shp, ["BT_ID"])
         result_df = biotope_df[["BT_ID"]].merge(result_df, how="left", on="BT_ID")
         result_df = result_df.fillna({"H4_RESULT": 0})
-        return arcutils.clean_join(self._biotope_shp, result_df, self._result_shp)
+        return self._gis.clean_join(
+            self._biotope_shp, result_df, self._result_shp, csv=self._write_csv
+        )
 
 
 class PieceoflandOccurrence:
-    def __init__(self, biotope_shp, commercialpoint_csv, result_shp, cellsize=5):
+    METHODS = ("raster", "vector")
+
+    def __init__(
+        self,
+        gis,
+        biotope_shp,
+        commercialpoint_csv,
+        result_shp,
+        cellsize=5,
+        write_csv=True,
+        method="raster",
+    ):
+        if method not in self.METHODS:
+            raise ValueError(
+                f"Unknown method {method!r}. Choose one of {list(self.METHODS)}."
+            )
+        self._gis = gis
         self._biotope_shp = str(biotope_shp)
         self._result_shp = str(result_shp)
+        self._write_csv = write_csv
         self._commercialpoint_csv = str(commercialpoint_csv)
         self._cellsize = cellsize
+        self._method = method
 
     def run(self):
-        commercialpoint_layer = am.XYTableToPoint(
-            self._commercialpoint_csv,
-            "memory/commercialpoint_layer",
-            "경도",
-            "위도",
-            coordinate_system=arcutils.WGS1984_PRJ,
-        )
-
-        selected = am.SelectLayerByLocation(  # for efficiency
-            commercialpoint_layer, "INTERSECT", self._biotope_shp, "5 Kilometers"
-        )
-
-        extent = self._merge_extent(
-            arcpy.Describe(self._biotope_shp).extent,
-            arcpy.Describe(selected).extent,
-            arcutils.ITRF2000_PRJ,
-        )
-
-        with arcpy.EnvManager(
-            outputCoordinateSystem=arcutils.ITRF2000_PRJ, extent=extent
-        ):
-            distance_raster = asa.EucDistance(
-                selected,
-                cell_size=self._cellsize,
-            )
-        am.Delete(commercialpoint_layer)
-
-        with arcpy.EnvManager(outputCoordinateSystem=arcutils.ITRF2000_PRJ):
-            result_table = asa.ZonalStatisticsAsTable(
+        return self.save(self.measure())
+
+    def measure(self, targets=None):
+        """Gets MIN distance of biotopes to commercial points, or of those where
+        the boolean mask `targets` is `True`.
+        """
+        if self._method == "vector":
+            return self._gis.nearest_point_distance(
+                self._commercialpoint_csv,
                 self._biotope_shp,
-                "BT_ID",
-                distance_raster,
-                "memory/result_table",
-                statistics_type="MINIMUM",
+                x_field="경도",
+                y_field="위도",
+                targets=targets,
             )
-        result_df = arcutils.shp_to_df(result_table)
-        am.Delete(result_table)
+        return self._zonal_minimum(targets)
 
+    def save(self, result_df):
         max_distance = result_df["MIN"].max()
         result_df = result_df.assign(H5_RESULT=lambda x: x["MIN"] / max_distance)
-        result_df = result_df.drop(columns="ZONE_CODE")
         result_df = result_df.rename(
             columns={
                 "COUNT": "H5_COUNT",
@@ -247,24 +282,32 @@ class PieceoflandOccurrence:
                 "MIN": "H5_MIN",
             }
         )
-        biotope_df = arcutils.shp_to_df(self._biotope_shp)
+        biotope_df = self._gis.shp_to_df(self._biotope_shp, ["BT_ID"])
         result_df = biotope_df[["BT_ID"]].merge(result_df, how="left", on="BT_ID")
         result_df = result_df.fillna({"H5_RESULT": 0})
-        return arcutils.clean_join(self._biotope_shp, result_df, self._result_shp)
+        return self._gis.clean_join(
+            self._biotope_shp, result_df, self._result_shp, csv=self._write_csv
+        )
 
-    def _merge_extent(self, extent1, extent2, spatial_reference):
-        extent1 = extent1.projectAs(spatial_reference)
-        extent2 = extent2.projectAs(spatial_reference)
-        xmin = min(extent1.XMin, extent2.XMin)
-        ymin = min(extent1.YMin, extent2.YMin)
-        xmax = max(extent1.XMax, extent2.XMax)
-        ymax = max(extent1.YMax, extent2.YMax)
-        return arcpy.Extent(xmin, ymin, xmax, ymax, spatial_reference=spatial_reference)
+    def _zonal_minimum(self, targets):
+        distance_raster = self._gis.point_distance(
+            self._commercialpoint_csv,
+            self._biotope_shp,
+            self._cellsize,
+            x_field="경도",
+            y_field="위도",
+            search_radius=5000,  # for efficiency
+        )
+        result_df = self._gis.zonal_statistics(
+            self._biotope_shp, distance_raster, "MINIMUM", targets
+        )
+        return result_df.drop(columns="ZONE_CODE")
 
 
 class PieceoflandAvailability:
     def __init__(
         self,
+        gis,
         biotope_shp,
         keystone_species_csv,
         environmentallayer_dir,
@@ -272,43 +315,56 @@ class PieceoflandAvailability:
         result_shp,
         threshold=0.5,
         cellsize=5,
+        write_csv=True,
+        maxent_options=None,
+        classification=None,
     ):
+        self._gis = gis
         self._biotope_shp = str(biotope_shp)
         self._keystone_species_csv = str(keystone_species_csv)
         self._environmentallayer_dir = str(environmentallayer_dir)
         self._maxent_dir = str(maxent_dir)
+        self._maxent_options = maxent_options or {}
         self._result_shp = str(result_shp)
+        self._write_csv = write_csv
         self._threshold = threshold
         self._cellsize = cellsize
+        self._classification = classification
 
     def run(self):
+        return self.save(self.measure())
+
+    def measure(self, targets=None):
+        """Gets MIN distance of main habitat biotopes to main habitat of keystone
+        species, or of those where the boolean mask `targets` is `True`.
+        """
         ascs = maxent.run_maxent(
-            self._keystone_species_csv, self._environmentallayer_dir, self._maxent_dir
+            self._keystone_species_csv,
+            self._environmentallayer_dir,
+            self._maxent_dir,
+            **self._maxent_options,
         )
 
-        probability_raster = arcutils.any_raster([arcpy.Raster(asc) for asc in ascs])
-        main_habitat_raster = asa.Con(probability_raster >= self._threshold, 1)
-        distance_raster = asa.EucDistance(main_habitat_raster, cell_size=self._cellsize)
-
-        medium_codes = arcutils.get_medium_codes([16])
-        query = arcutils.query_isin("비오톱", medium_codes)
-        selected = am.SelectLayerByAttribute(self._biotope_shp, "NEW_SELECTION", query)
-
-        with arcpy.EnvManager(outputCoordinateSystem=arcutils.ITRF2000_PRJ):
-            result_table = asa.ZonalStatisticsAsTable(
-                selected,
-                "BT_ID",
-                distance_raster,
-                "memory/result_table",
-                statistics_type="MINIMUM",
-            )
-        am.Delete(selected)
-        result_df = arcutils.shp_to_df(result_table)
-        am.Delete(result_table)
+        probability_raster = self._gis.any_raster(
+            [self._gis.read_raster(asc) for asc in ascs]
+        )
+        main_habitat_raster = self._gis.threshold_raster(
+            probability_raster, self._threshold
+        )
+        distance_raster = self._gis.euc_distance(main_habitat_raster, self._cellsize)
+
+        classification = _classify(self._gis, self._biotope_shp, self._classification)
+        is_measured = classification.masks["main_habitat"]
+        if targets is not None:
+            is_measured = is_measured & targets
+        result_df = self._gis.zonal_statistics(
+            self._biotope_shp, distance_raster, "MINIMUM", is_measured
+        )
+        return result_df.drop(columns="ZONE_CODE")
 
+    def save(self, result_df):
         maximum = result_df["MIN"].max()
         result_df = result_df.assign(H6_RESULT=lambda x: 1 - (x["MIN"] / maximum))
-        result_df = result_df.drop(columns="ZONE_CODE")
         result_df = result_df.rename(
             columns={
                 "COUNT": "H6_COUNT",
@@ -316,7 +372,9 @@ class PieceoflandAvailability:
                 "MIN": "H6_MIN",
             }
         )
-        biotope_df = arcutils.shp_to_df(self._biotope_shp)
+        biotope_df = self._gis.shp_to_df(self._biotope_shp, ["BT_ID"])
         result_df = biotope_df[["BT_ID"]].merge(result_df, how="left", on="BT_ID")
         result_df = result_df.fillna({"H6_RESULT": 0})
-        return arcutils.clean_join(self._biotope_shp, result_df, self._result_shp)
+        return self._gis.clean_join(
+            self._biotope_shp, result_df, self._result_shp, csv=self._write_csv
+        )
@@ -0,0 +1,155 @@
+"""Measurements of indicators kept between runs, to re-evaluate only the
+biotopes which an edit of the biotope map can change.
+
+Each biotope is identified by BT_ID, with a digest of its shape and attributes
+and its bounds. A snapshot holds them with the table an indicator measured, so
+the next run compares digests, measures again only the affected biotopes, and
+reuses the rows of the others. Scores normalized over all biotopes are
+computed from the whole table again.
+"""
+import json
+from os import PathLike
+from pathlib import Path
+from typing import Callable, NamedTuple, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+from biotools import dbf, shputils
+
+# meters per degree, the smallest along a meridian and the largest along the
+# equator, so that margins in degrees never fall short
+METERS_PER_LATITUDE = 110_574
+METERS_PER_LONGITUDE = 111_320
+
+
+class MapState(NamedTuple):
+    """Digest and WGS1984 bounds of each biotope, indexed by BT_ID."""
+
+    digests: pd.Series
+    bounds: pd.DataFrame
+
+    @classmethod
+    def read(cls, biotope_shp: Union[str, PathLike]) -> "MapState":
+        bt_ids = pd.Index(dbf.read_columns(biotope_shp, ["BT_ID"])["BT_ID"])
+        return cls(
+            pd.Series(shputils.record_digests(biotope_shp), index=bt_ids),
+            pd.DataFrame(
+                shputils.record_bounds(biotope_shp),
+                index=bt_ids,
+                columns=["XMIN", "YMIN", "XMAX", "YMAX"],
+            ),
+        )
+
+    def changed_ids(self, previous: "MapState") -> pd.Index:
+        """Gets BT_ID of biotopes added, removed or edited since `previous`."""
+        digests = self.digests.reindex(previous.digests.index.union(self.digests.index))
+        previous_digests = previous.digests.reindex(digests.index)
+        return digests.index[digests.ne(previous_digests)]
+
+    def near(self, previous: "MapState", ids: pd.Index, distance: float) -> np.ndarray:
+        """Gets mask of biotopes whose bounds are within `distance` meters of the
+        bounds of `ids`, now or in `previous`.
+
+        Bounds are compared in degrees with margins which are never shorter than
+        `distance`, so the mask may include a few more biotopes than needed.
+        """
+        anchors = pd.concat(
+            [
+                self.bounds.reindex(self.bounds.index.intersection(ids)),
+                previous.bounds.reindex(previous.bounds.index.intersection(ids)),
+            ]
+        ).dropna()
+        bounds = self.bounds.to_numpy()
+        latitude = np.radians(np.nanmax(np.abs(bounds[:, [1, 3]]), initial=0))
+        margin_x = distance / (METERS_PER_LONGITUDE * max(np.cos(latitude), 1e-6))
+        margin_y = distance / METERS_PER_LATITUDE
+
+        is_near = np.zeros(len(bounds), dtype=bool)
+        for xmin, ymin, xmax, ymax in anchors.to_numpy():
+            with np.errstate(invalid="ignore"):  # null shapes
+                is_near |= (
+                    (bounds[:, 0] <= xmax + margin_x)
+                    & (bounds[:, 2] >= xmin - margin_x)
+                    & (bounds[:, 1] <= ymax + margin_y)
+                    & (bounds[:, 3] >= ymin - margin_y)
+                )
+        return is_near
+
+
+class Snapshot(NamedTuple):
+    key: str
+    state: MapState
+    table: pd.DataFrame
+
+
+class ResultStore:
+    """Snapshots of indicators by tag, saved as pickle files in `directory`."""
+
+    def __init__(self, directory: Union[str, PathLike]):
+        self._directory = Path(directory)
+
+    def _path(self, tag):
+        return self._directory / f"{tag}.pkl"
+
+    def load(self, tag: str, key) -> Optional[Snapshot]:
+        """Loads the snapshot of `tag`, or gets `None` if it was saved with
+        another key or cannot be read.
+        """
+        try:
+            snapshot = Snapshot(*pd.read_pickle(self._path(tag)))
+        except (OSError, EOFError, TypeError, ValueError):
+            return None
+        return snapshot if snapshot.key == json.dumps(key) else None
+
+    def save(self, tag: str, key, state: MapState, table: pd.DataFrame):
+        self._directory.mkdir(parents=True, exist_ok=True)
+        temp = self._path(tag).with_suffix(".tmp")
+        pd.to_pickle(tuple(Snapshot(json.dumps(key), state, table)), temp)
+        temp.replace(self._path(tag))
+
+
+def measure_incrementally(
+    store: ResultStore,
+    tag: str,
+    key,
+    state: MapState,
+    measure: Callable[[Optional[np.ndarray]], pd.DataFrame],
+    affected: Callable[[MapState, pd.Index], np.ndarray],
+) -> pd.DataFrame:
+    """Measures only biotopes affected by changes since the last snapshot.
+
+    Args:
+        `store`: Store of snapshots.
+        `tag`: Indicator whose snapshot is used.
+        `key`: JSON serializable arguments and inputs other than the biotope
+            map. Everything is measured again if it differs from the snapshot.
+        `state`: Current state of the biotope map.
+        `measure`: Function which measures biotopes where a boolean mask in the
+            order of records is `True`, or all of them for `None`, into a table
+            with BT_ID. It may measure more biotopes than the mask, such as
+            whole patches, and their rows replace those of the snapshot.
+        `affected`: Function which gets the mask of biotopes to measure again
+            from the previous state and BT_ID of changed biotopes.
+
+    Returns:
+        Table of all biotopes, as `measure(None)` would get.
+    """
+    snapshot = store.load(tag, key)
+    if snapshot is None:
+        table = measure(None)
+    else:
+        changed = state.changed_ids(snapshot.state)
+        if len(changed):
+            targets = affected(snapshot.state, changed)
+        else:
+            targets = np.zeros(len(state.digests), dtype=bool)
+        remeasured = state.digests.index[targets].union(changed)
+        measured = measure(targets) if targets.any() else None
+        if measured is not None:
+            remeasured = remeasured.union(measured["BT_ID"])
+        table = snapshot.table[~snapshot.table["BT_ID"].isin(remeasured)]
+        if measured is not None:
+            table = pd.concat([table, measured], ignore_index=True)
+    store.save(tag, key, state, table)
+    return table
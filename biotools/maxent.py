@@ -1,19 +1,47 @@
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
 import importlib.resources
+import itertools
+import json
+import os
 from os import PathLike
 from pathlib import Path
+import shutil
 import subprocess
+import time
 from typing import List, Union
+import uuid
 
 import pandas as pd
 
+from biotools.shputils import file_digest
+
+MANIFEST = "manifest.json"
+PUBLISHED = "published"
+LAYER_SUFFIXES = (".asc", ".grd", ".gri", ".bil", ".hdr")
+
 
 def run_maxent(
     samplesfile: Union[str, PathLike],
     environmentallayers: Union[str, PathLike],
     outputdirectory: Union[str, PathLike],
+    workers: int = 1,
+    memory: str = "512m",
+    threads: int = None,
     **kwargs,
 ) -> List[str]:
     """
+    Runs are cached in a subdirectory of `outputdirectory` named by a hash of
+    the samples, the environmental layers and the options. It has a manifest
+    listing the outputs, so a rerun with identical inputs returns them without
+    running maxent, and any change of the inputs runs maxent again.
+    maxentResults.csv and the .asc file of each species of the latest run are
+    also copied to `outputdirectory` itself, where maxent would write them.
+    maxent writes into a temporary subdirectory which is renamed to the cached
+    one when it finishes, so processes sharing `outputdirectory` never see or
+    remove a run of another. Cached runs are kept until `prune_runs` removes
+    them.
+
     Args:
         `samplesfile`: PathLike
             Path to table which contians species occurrence information (.csv).
@@ -21,6 +49,13 @@ def run_maxent(
             Path to directory which contains environmant variable maps (.asc).
         `outputdirectory`: PathLike
             Path to directory to which maxent saves results.
+        `workers`: int, default 1
+            If it is greater than 1, samples are split by species, and each
+            species is modeled by its own maxent process on a pool of `workers`.
+        `memory`: str, default "512m"
+            Maximum heap size of each java process.
+        `threads`: int, default `None`
+            Number of threads of each maxent process. Maxent decides it if `None`.
 
         Options of basicRun:
             `skipifexists`: boolean, default `True`
@@ -36,39 +71,286 @@ def run_maxent(
             `appendtoresultsfile`: boolean, default `False`
                 결과파일(maxentResults.csv) 초기화(F) or 추가(T)
             `writebackgroundpredictions`: boolean, default `False`
+
+    Returns:
+        Paths to .asc files of species in `samplesfile`, in the cached run.
+
+    Raises:
+        `MaxentError`: If maxent fails. It has stdout and stderr of maxent.
     """
-    kwargs.setdefault("skipifexists", True)
-    kwargs.setdefault("autorun", True)
-    kwargs.setdefault("autofeature", True)
-    kwargs.setdefault("responsecurves", True)
-    kwargs.setdefault("jackknife", True)
-    kwargs.setdefault("visible", False)
-    kwargs.setdefault("warnings", False)
-    kwargs.setdefault("writeplotdata", False)
-    kwargs.setdefault("appendtoresultsfile", True)
-    kwargs.setdefault("writebackgroundpredictions", False)
-
-    Path(outputdirectory).mkdir(parents=True, exist_ok=True)
+    kwargs = _default_options(kwargs)
+    key = cache_key(samplesfile, environmentallayers, kwargs)
+    output_dir = Path(outputdirectory) / key
+    ascs = read_manifest(output_dir)
+    if ascs is not None:
+        os.utime(output_dir / MANIFEST)  # used lately, see `prune_runs`
+    else:
+        ascs = _run_cached(
+            samplesfile,
+            environmentallayers,
+            output_dir,
+            key,
+            kwargs,
+            workers,
+            memory,
+            threads,
+        )
+    publish(outputdirectory, output_dir, ascs)
+    return ascs
+
+
+def _run_cached(
+    samplesfile, environmentallayers, output_dir, key, kwargs, workers, memory, threads
+):
+    temp_dir = output_dir.with_name(f"{output_dir.name}.{uuid.uuid4().hex}.tmp")
+    temp_dir.mkdir(parents=True)
+    try:
+        if workers > 1:
+            ascs = _run_by_species(
+                samplesfile,
+                environmentallayers,
+                temp_dir,
+                kwargs,
+                workers,
+                memory,
+                threads,
+            )
+        else:
+            _run(samplesfile, environmentallayers, temp_dir, kwargs, memory, threads)
+            ascs = _read_outputs(temp_dir)
+        write_manifest(temp_dir, key, samplesfile, environmentallayers, kwargs, ascs)
+    except BaseException:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+        raise
+
+    if output_dir.exists() and read_manifest(output_dir) is None:
+        _remove(output_dir)  # incomplete run
+    try:
+        temp_dir.rename(output_dir)
+    except OSError:  # finished by another process meanwhile
+        shutil.rmtree(temp_dir)
+    return read_manifest(output_dir)
+
+
+def _remove(directory):
+    """Removes `directory` after renaming it, so no one sees it half removed."""
+    trash = directory.with_name(f"{directory.name}.{uuid.uuid4().hex}.trash")
+    try:
+        directory.rename(trash)
+    except OSError:  # removed by another process meanwhile
+        return
+    shutil.rmtree(trash)
+
+
+class MaxentError(RuntimeError):
+    def __init__(self, command, result):
+        self.command = command
+        self.returncode = result.returncode
+        self.stdout = _decode_output(result.stdout)
+        self.stderr = _decode_output(result.stderr)
+        super().__init__(
+            f"maxent failed with exit code {self.returncode}.\n"
+            f"stdout:\n{self.stdout}\nstderr:\n{self.stderr}"
+        )
 
+
+def _decode_output(output):
+    if isinstance(output, bytes):
+        return output.decode(errors="replace")
+    return output or ""
+
+
+def _run(samplesfile, environmentallayers, output_dir, options, memory, threads):
     with importlib.resources.path("biotools.lib", "maxent.jar") as path:
         command = [
             "java",
-            "-mx512m",
+            f"-mx{memory}",
             "-jar",
             str(path),
             f"samplesfile={str(samplesfile)}",
             f"environmentallayers={str(environmentallayers)}",
-            f"outputdirectory={str(outputdirectory)}",
+            f"outputdirectory={str(output_dir)}",
         ]
-        command += kwargs_to_command(kwargs)
+        command += kwargs_to_command(options)
+        if threads is not None:
+            command.append(f"threads={threads}")
+        result = subprocess.run(command, capture_output=True)
 
-    subprocess.run(command, capture_output=True)
+    if result.returncode != 0 or not (output_dir / "maxentResults.csv").exists():
+        raise MaxentError(command, result)
 
-    output_dir = Path(outputdirectory)
+
+def _read_outputs(output_dir):
     summary_df = pd.read_csv(output_dir / "maxentResults.csv", encoding="euc-kr")
-    name_s = summary_df["Species"]
-    return [str(output_dir / f"{name}.asc") for name in name_s]
+    names = summary_df["Species"].drop_duplicates().tolist()
+    return [str(output_dir / f"{name}.asc") for name in names]
+
+
+def _run_by_species(
+    samplesfile, environmentallayers, output_dir, options, workers, memory, threads
+):
+    samples_df = pd.read_csv(samplesfile, encoding="euc-kr")
+    species_dirs = []
+    for i, (_, species_df) in enumerate(samples_df.groupby(samples_df.columns[0])):
+        species_dir = output_dir / f"species{i}"
+        species_dir.mkdir()
+        species_df.to_csv(species_dir / "samples.csv", index=False, encoding="euc-kr")
+        species_dirs.append(species_dir)
+
+    def run(species_dir):
+        samples = species_dir / "samples.csv"
+        _run(samples, environmentallayers, species_dir, options, memory, threads)
+        return _read_outputs(species_dir)
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(itertools.chain.from_iterable(executor.map(run, species_dirs)))
 
 
 def kwargs_to_command(kwargs):
     return [f"{param}={arg}" for param, arg in kwargs.items()]
+
+
+def list_layers(environmentallayers: Union[str, PathLike]) -> List[Path]:
+    layer_dir = Path(environmentallayers)
+    if layer_dir.is_file():
+        return [layer_dir]
+    return sorted(
+        path
+        for path in layer_dir.iterdir()
+        if path.is_file() and path.suffix.lower() in LAYER_SUFFIXES
+    )
+
+
+def _default_options(options):
+    return {
+        "skipifexists": True,
+        "autorun": True,
+        "autofeature": True,
+        "responsecurves": True,
+        "jackknife": True,
+        "visible": False,
+        "warnings": False,
+        "writeplotdata": False,
+        "appendtoresultsfile": False,
+        "writebackgroundpredictions": False,
+        **options,
+    }
+
+
+def run_key(
+    samplesfile: Union[str, PathLike],
+    environmentallayers: Union[str, PathLike],
+    workers: int = 1,
+    memory: str = "512m",
+    threads: int = None,
+    **kwargs,
+) -> str:
+    """Gets the key of the run which `run_maxent` caches for the same arguments.
+
+    `workers`, `memory` and `threads` do not change the outputs, and are not
+    part of the key.
+    """
+    return cache_key(samplesfile, environmentallayers, _default_options(kwargs))
+
+
+def cache_key(samplesfile, environmentallayers, options) -> str:
+    """Hashes the contents of the samples and the layers, and the options."""
+    digest = hashlib.sha256()
+    with importlib.resources.path("biotools.lib", "maxent.jar") as path:
+        digest.update(file_digest(path).encode())
+    digest.update(file_digest(samplesfile).encode())
+    for layer in list_layers(environmentallayers):
+        digest.update(layer.name.encode())
+        digest.update(file_digest(layer).encode())
+    digest.update(json.dumps(options, sort_keys=True, default=str).encode())
+    return digest.hexdigest()[:16]
+
+
+def read_manifest(output_dir: Union[str, PathLike]) -> Union[List[str], None]:
+    """Gets outputs of a finished run, or `None` if it is missing or incomplete."""
+    manifest = Path(output_dir) / MANIFEST
+    try:
+        outputs = json.loads(manifest.read_text(encoding="utf-8"))["outputs"]
+    except (OSError, ValueError, KeyError):  # missing, or cut by a crash
+        return None
+    ascs = [str(Path(output_dir) / name) for name in outputs]
+    if not all(Path(asc).exists() for asc in ascs):
+        return None
+    return ascs
+
+
+def write_manifest(output_dir, key, samplesfile, environmentallayers, options, ascs):
+    manifest = {
+        "key": key,
+        "samplesfile": str(samplesfile),
+        "environmentallayers": [
+            str(layer) for layer in list_layers(environmentallayers)
+        ],
+        "options": options,
+        "outputs": [Path(asc).relative_to(output_dir).as_posix() for asc in ascs],
+    }
+    text = json.dumps(manifest, ensure_ascii=False, indent=2, default=str)
+    temp = Path(output_dir) / f"{MANIFEST}.{uuid.uuid4().hex}.tmp"
+    temp.write_text(text, encoding="utf-8")
+    temp.replace(Path(output_dir) / MANIFEST)
+
+
+def prune_runs(
+    outputdirectory: Union[str, PathLike], keep: int = 4, grace: float = 86400
+) -> List[Path]:
+    """Removes cached runs of `run_maxent` in `outputdirectory` but the `keep`
+    most recently used ones.
+
+    Temporary directories of runs which crashed are removed too, unless they
+    were modified within `grace` seconds, as a run of another process may
+    still be writing them.
+
+    Returns:
+        Paths to removed directories.
+    """
+    subdirs = [path for path in Path(outputdirectory).iterdir() if path.is_dir()]
+    runs = [path for path in subdirs if (path / MANIFEST).exists()]
+    runs.sort(key=lambda path: (path / MANIFEST).stat().st_mtime_ns, reverse=True)
+    removed = runs[keep:]
+    removed += [
+        path
+        for path in subdirs
+        if path.suffix in (".tmp", ".trash")
+        and time.time() - path.stat().st_mtime > grace
+    ]
+    for path in removed:
+        _remove(path)
+    return removed
+
+
+def publish(
+    outputdirectory: Union[str, PathLike], output_dir: Union[str, PathLike], ascs
+):
+    """Copies maxentResults.csv and `ascs` of the run in `output_dir` to
+    `outputdirectory`, unless they were copied from it last time.
+
+    Results of runs by species are concatenated into one maxentResults.csv.
+    """
+    outputdirectory, output_dir = Path(outputdirectory), Path(output_dir)
+    published = outputdirectory / PUBLISHED
+    copies = [outputdirectory / Path(asc).name for asc in ascs]
+    if (
+        published.exists()
+        and published.read_text() == output_dir.name
+        and all(copy.exists() for copy in copies)
+    ):
+        return
+
+    published.unlink(missing_ok=True)
+    summaries = sorted(output_dir.glob("**/maxentResults.csv"))
+    summary_csv = outputdirectory / "maxentResults.csv"
+    if len(summaries) == 1:
+        shutil.copyfile(summaries[0], summary_csv)
+    else:
+        summary_df = pd.concat(
+            [pd.read_csv(summary, encoding="euc-kr") for summary in summaries]
+        )
+        summary_df.to_csv(summary_csv, index=False, encoding="euc-kr")
+    for asc, copy in zip(ascs, copies):
+        shutil.copyfile(asc, copy)
+    published.write_text(output_dir.name)
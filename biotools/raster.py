@@ -0,0 +1,276 @@
+import os
+from os import PathLike
+from pathlib import Path
+from typing import Sequence, Union
+
+import numpy as np
+
+CACHE_DIRECTORY = "npy.cache"
+BLOCK_ROWS = 256
+
+
+class Raster:
+    """Grid of cell values, whose NoData cells are `nan`.
+
+    Row 0 is the northernmost row, as in Esri ASCII grid.
+    """
+
+    def __init__(self, array, xmin, ymin, cellsize):
+        self.array = array
+        self.xmin = xmin
+        self.ymin = ymin
+        self.cellsize = cellsize
+
+    @classmethod
+    def empty(cls, extent, cellsize, fill_value=np.nan, dtype=np.float32):
+        (nrows, ncols), xmin, ymin = grid_of(extent, cellsize)
+        array = np.full((nrows, ncols), fill_value, dtype=dtype)
+        return cls(array, xmin, ymin, cellsize)
+
+    @property
+    def nrows(self):
+        return self.array.shape[0]
+
+    @property
+    def ncols(self):
+        return self.array.shape[1]
+
+    @property
+    def xmax(self):
+        return self.xmin + self.ncols * self.cellsize
+
+    @property
+    def ymax(self):
+        return self.ymin + self.nrows * self.cellsize
+
+    @property
+    def extent(self):
+        return self.xmin, self.ymin, self.xmax, self.ymax
+
+    def with_array(self, array):
+        """Creates a raster on the same grid with `array`."""
+        return Raster(array, self.xmin, self.ymin, self.cellsize)
+
+    def center_xs(self, start=0, stop=None):
+        stop = self.ncols if stop is None else stop
+        return self.xmin + (np.arange(start, stop) + 0.5) * self.cellsize
+
+    def center_ys(self, start=0, stop=None):
+        stop = self.nrows if stop is None else stop
+        return self.ymax - (np.arange(start, stop) + 0.5) * self.cellsize
+
+    def index(self, xs, ys):
+        """Gets row and column indices of cells containing points."""
+        cols = np.floor((np.asarray(xs) - self.xmin) / self.cellsize).astype(int)
+        rows = np.floor((self.ymax - np.asarray(ys)) / self.cellsize).astype(int)
+        return rows, cols
+
+    def strip(self, rows):
+        """Creates a raster of a slice of rows, without cell values."""
+        return Raster(
+            np.empty((rows.stop - rows.start, self.ncols), dtype=np.uint8),
+            self.xmin,
+            self.ymax - rows.stop * self.cellsize,
+            self.cellsize,
+        )
+
+    def iter_strips(self, strip_rows=BLOCK_ROWS):
+        """Yields slices of rows and cell values of them, from north to south."""
+        for rows in _blocks(self.nrows, strip_rows):
+            yield rows, self.array[rows]
+
+    def window(self, bounds):
+        """Gets row and column slices of cells whose centers may lie in `bounds`."""
+        xmin, ymin, xmax, ymax = bounds
+        col_start = max(int(np.floor((xmin - self.xmin) / self.cellsize - 0.5)), 0)
+        col_stop = min(int(np.ceil((xmax - self.xmin) / self.cellsize - 0.5)), self.ncols)
+        row_start = max(int(np.floor((self.ymax - ymax) / self.cellsize - 0.5)), 0)
+        row_stop = min(int(np.ceil((self.ymax - ymin) / self.cellsize - 0.5)), self.nrows)
+        return slice(row_start, max(row_stop, row_start)), slice(
+            col_start, max(col_stop, col_start)
+        )
+
+
+class StripRaster(Raster):
+    """Raster whose cell values are computed by strips of rows when they are
+    iterated, so that the whole grid does not have to be in memory.
+
+    `strips` is a function which yields slices of rows and cell values of them
+    from north to south, like `Raster.iter_strips`. Accessing `array` computes
+    and holds the whole grid.
+    """
+
+    def __init__(self, strips, shape, xmin, ymin, cellsize):
+        self._strips = strips
+        self.shape = shape
+        self.xmin = xmin
+        self.ymin = ymin
+        self.cellsize = cellsize
+
+    @property
+    def array(self):
+        return np.vstack([values for _, values in self._strips()])
+
+    @property
+    def nrows(self):
+        return self.shape[0]
+
+    @property
+    def ncols(self):
+        return self.shape[1]
+
+    def iter_strips(self, strip_rows=None):
+        return self._strips()
+
+
+def grid_of(extent, cellsize):
+    """Gets shape, xmin and ymin of the grid covering `extent` from its top left."""
+    xmin, ymin, xmax, ymax = extent
+    ncols = max(int(np.ceil((xmax - xmin) / cellsize)), 1)
+    nrows = max(int(np.ceil((ymax - ymin) / cellsize)), 1)
+    return (nrows, ncols), xmin, ymax - nrows * cellsize
+
+
+def _read_asc_header(file):
+    header = {}
+    while True:
+        position = file.tell()
+        line = file.readline()
+        if not line[:1].isalpha():
+            file.seek(position)
+            return header
+        key, value = line.split()
+        header[key.lower().decode()] = float(value)
+
+
+def _cache_path(asc):
+    return asc.parent / CACHE_DIRECTORY / (asc.name + ".npy")
+
+
+def _load_cache(npy, asc, shape):
+    try:
+        if npy.stat().st_mtime_ns < asc.stat().st_mtime_ns:
+            return None
+        array = np.load(npy, mmap_mode="r")
+    except (OSError, ValueError):
+        return None
+    return array if array.shape == shape else None
+
+
+def _save_cache(npy, array):
+    try:
+        npy.parent.mkdir(exist_ok=True)
+        temp = npy.with_name(f"{npy.name}.{os.getpid()}.tmp")
+        with open(temp, "wb") as file:
+            np.save(file, array)
+        os.replace(temp, npy)
+    except OSError:
+        return False  # read-only directory
+    return True
+
+
+def read_asc(asc: Union[str, PathLike], cache: bool = True) -> Raster:
+    """Reads Esri ASCII grid.
+
+    Args:
+        `asc`: Path to .asc file.
+        `cache`: If it is `True`, cell values are saved as .npy file in
+            `CACHE_DIRECTORY` next to `asc` at the first read, and later reads
+            memory-map it instead of parsing the text again, while it is newer
+            than `asc`. Memory-mapped arrays are read-only.
+    """
+    asc = Path(asc)
+    with open(asc, "rb") as file:
+        header = _read_asc_header(file)
+        shape = (int(header["nrows"]), int(header["ncols"]))
+        npy = _cache_path(asc)
+        array = _load_cache(npy, asc, shape) if cache else None
+        if array is None:
+            array = np.loadtxt(file, dtype=np.float32, ndmin=2)
+            if "nodata_value" in header:
+                array[array == header["nodata_value"]] = np.nan
+            if cache and _save_cache(npy, array):
+                array = np.load(npy, mmap_mode="r")  # to release parsed array
+
+    cellsize = header["cellsize"]
+    xmin = header.get("xllcorner", header.get("xllcenter", 0) - cellsize / 2)
+    ymin = header.get("yllcorner", header.get("yllcenter", 0) - cellsize / 2)
+    return Raster(array, xmin, ymin, cellsize)
+
+
+def _blocks(nrows, block_rows):
+    for start in range(0, nrows, block_rows):
+        yield slice(start, min(start + block_rows, nrows))
+
+
+def combine_any(arrays: Sequence, block_rows: int = BLOCK_ROWS) -> np.ndarray:
+    """For each cell, gets the probability that at least one probability will be
+    true.
+
+    Arrays on the same grid are read by blocks of `block_rows` rows, so memory
+    use does not grow with the number of arrays if they are memory-mapped. The
+    product of complements is accumulated in log-space not to underflow.
+    """
+    result = np.empty(arrays[0].shape, dtype=np.float32)
+    for rows in _blocks(result.shape[0], block_rows):
+        log_complement = np.zeros(result[rows].shape, dtype=np.float32)
+        for array in arrays:
+            with np.errstate(divide="ignore"):  # probability 1
+                log_complement += np.log1p(-np.asarray(array[rows], dtype=np.float32))
+        result[rows] = -np.expm1(log_complement)
+    return result
+
+
+def combine_mean(arrays: Sequence, block_rows: int = BLOCK_ROWS) -> np.ndarray:
+    """For each cell, gets the mean of values which are not NoData.
+
+    Arrays on the same grid are read by blocks of `block_rows` rows, keeping a
+    running sum and count. Cells which are NoData in every array get `nan`.
+    """
+    result = np.empty(arrays[0].shape, dtype=np.float32)
+    for rows in _blocks(result.shape[0], block_rows):
+        sums = np.zeros(result[rows].shape, dtype=np.float64)
+        counts = np.zeros(result[rows].shape, dtype=np.int64)
+        for array in arrays:
+            values = np.asarray(array[rows], dtype=np.float64)
+            is_valid = ~np.isnan(values)
+            sums += np.where(is_valid, values, 0)
+            counts += is_valid
+        with np.errstate(invalid="ignore"):
+            result[rows] = np.where(counts > 0, sums / counts, np.nan)
+    return result
+
+
+def disc_offsets(radius: float) -> np.ndarray:
+    """Gets half widths of rows of the disc of cells whose centers lie within
+    `radius` cells from the center cell, from row -floor(radius) to floor(radius).
+    """
+    reach = int(np.floor(radius))
+    dys = np.arange(-reach, reach + 1)
+    return np.floor(np.sqrt(radius**2 - dys**2) + 1e-9).astype(int)
+
+
+def disc_sums(array: np.ndarray, radius: float) -> np.ndarray:
+    """Sums values within a disc around each cell, as a summed-area table of rows.
+
+    Args:
+        `array`: Values with `floor(radius)` extra rows above and below the rows
+            to sum. Cells out of the columns count as 0.
+        `radius`: Radius of the disc in cells.
+
+    Returns:
+        Sums of the rows without the extra rows.
+    """
+    widths = disc_offsets(radius)
+    reach = len(widths) // 2
+    nrows, ncols = array.shape[0] - 2 * reach, array.shape[1]
+    padded = np.pad(array, ((0, 0), (reach, reach)))
+    prefix = np.zeros((padded.shape[0], padded.shape[1] + 1))
+    np.cumsum(padded, axis=1, out=prefix[:, 1:])
+
+    sums = np.zeros((nrows, ncols))
+    for dy, width in enumerate(widths):
+        rows = prefix[dy : dy + nrows]
+        sums += rows[:, reach + width + 1 : reach + width + 1 + ncols]
+        sums -= rows[:, reach - width : reach - width + ncols]
+    return sums
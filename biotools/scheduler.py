@@ -0,0 +1,59 @@
+"""Runs tasks of a dependency graph on a thread pool.
+
+A task starts as soon as all of its dependencies have finished, so independent
+tasks run at the same time while dependent ones wait only for what they need.
+"""
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, NamedTuple, Sequence
+
+
+class Task(NamedTuple):
+    function: Callable[[], Any]
+    dependencies: Sequence[str] = ()
+
+
+def run_tasks(tasks: Dict[str, Task], workers: int = 1) -> Dict[str, Any]:
+    """Runs `tasks` in dependency order with at most `workers` at a time.
+
+    Args:
+        `tasks`: Tasks by name. Dependencies are names of other tasks.
+        `workers`: Number of threads.
+
+    Returns:
+        Return value of each task by name.
+
+    Raises:
+        `ValueError`: If a dependency is unknown or dependencies are cyclic.
+        Exception of the first failed task, after running tasks have finished.
+        Tasks which have not started are not run.
+    """
+    for name, task in tasks.items():
+        unknown = set(task.dependencies) - set(tasks)
+        if unknown:
+            raise ValueError(
+                f"Task {name!r} depends on unknown tasks {sorted(unknown)}."
+            )
+
+    results = {}
+    pending = dict(tasks)
+    running = {}
+    with ThreadPoolExecutor(max(workers, 1)) as executor:
+        while pending or running:
+            ready = [
+                name
+                for name, task in pending.items()
+                if all(dependency in results for dependency in task.dependencies)
+            ]
+            for name in ready:
+                running[executor.submit(pending.pop(name).function)] = name
+            if not running:
+                raise ValueError(f"Tasks {sorted(pending)} have cyclic dependencies.")
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                if future.exception() is not None:
+                    wait(running)
+                    raise future.exception()
+                results[name] = future.result()
+    return results
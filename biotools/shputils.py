@@ -0,0 +1,128 @@
+"""Shapefile utilities shared by geoprocessing backends."""
+import functools
+import hashlib
+from os import PathLike
+from pathlib import Path
+import shutil
+from typing import Union
+
+import numpy as np
+import pandas as pd
+
+from biotools import dbf, tablecache
+
+
+def fingerprint(path: Union[str, PathLike]) -> tuple:
+    """Identifies the content of a file, with its .dbf file for shapefiles."""
+    paths = [Path(path)]
+    if paths[0].suffix.lower() == ".shp":
+        paths.append(paths[0].with_suffix(".dbf"))
+    stats = [p.stat() for p in paths]
+    return tuple((str(p), s.st_size, s.st_mtime_ns) for p, s in zip(paths, stats))
+
+
+@functools.lru_cache(maxsize=None)
+def _file_digest(path, size, mtime_ns):
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def file_digest(path: Union[str, PathLike]) -> str:
+    """Gets sha256 of a file. It is memoized until its fingerprint changes."""
+    stat = Path(path).stat()
+    return _file_digest(str(Path(path).absolute()), stat.st_size, stat.st_mtime_ns)
+
+
+def _read_records(shp):
+    """Reads content bytes of each shape record, using offsets in the .shx file."""
+    shp = Path(shp).with_suffix(".shp")
+    index = np.fromfile(shp.with_suffix(".shx"), dtype=">i4", offset=100)
+    offsets = index[0::2].astype(np.int64) * 2 + 8
+    lengths = index[1::2].astype(np.int64) * 2
+    data = shp.read_bytes()
+    return [data[o : o + n] for o, n in zip(offsets, lengths)]
+
+
+def record_digests(shp: Union[str, PathLike]) -> np.ndarray:
+    """Gets a digest of the geometry and attributes of each record of a shapefile.
+
+    Records are compared by their raw bytes, so the digest of a record changes
+    only if its shape or any of its attribute values is edited.
+    """
+    shapes = _read_records(shp)
+    dbf_path = Path(shp).with_suffix(".dbf")
+    _, attributes, _ = dbf._load(dbf_path, dbf.get_encoding(dbf_path))
+    return np.array(
+        [
+            hashlib.blake2b(shape + row.tobytes(), digest_size=16).hexdigest()
+            for shape, row in zip(shapes, attributes)
+        ],
+        dtype=object,
+    )
+
+
+def record_bounds(shp: Union[str, PathLike]) -> np.ndarray:
+    """Gets xmin, ymin, xmax and ymax of each record of a polygon or polyline
+    shapefile from the record headers, without reading the shapes. Null shapes
+    get `nan`.
+    """
+    shapes = _read_records(shp)
+    bounds = np.full((len(shapes), 4), np.nan)
+    for i, shape in enumerate(shapes):
+        if len(shape) >= 36:
+            bounds[i] = np.frombuffer(shape, dtype="<f8", count=4, offset=4)
+    return bounds
+
+
+def clean_join(
+    target_shp: Union[str, PathLike],
+    df: pd.DataFrame,
+    result_shp: Union[str, PathLike],
+    on: str = "BT_ID",
+    csv: bool = True,
+) -> str:
+    """Saves `target_shp` with columns of `df` joined to it on `on`.
+
+    Geometries of `target_shp` are copied as they are, and the joined attribute
+    table is written in one pass. Columns of `df` already in `target_shp` are
+    not joined again. The written columns are kept in the session table cache,
+    so reading them back takes no decoding.
+
+    Args:
+        `target_shp`: Path to shapefile to which `df` is joined.
+        `df`: Table to join. Only the first row of each `on` value is joined.
+        `result_shp`: Path to result shapefile. Existing one is replaced.
+        `on`: Field on which `df` is joined.
+        `csv`: If it is `True`, `df` is also saved as a euc-kr csv file next to
+            `result_shp`.
+
+    Returns:
+        Path to result shapefile.
+    """
+    target_shp = Path(target_shp)
+    result_shp = Path(result_shp)
+    for path in result_shp.parent.glob(result_shp.stem + ".*"):
+        path.unlink()
+    if csv:
+        df.to_csv(result_shp.with_suffix(".csv"), encoding="euc-kr", index=False)
+
+    for suffix in (".shp", ".shx", ".prj", ".cpg"):
+        source = target_shp.with_suffix(suffix)
+        if source.exists():
+            shutil.copyfile(source, result_shp.with_suffix(suffix))
+
+    encoding = dbf.get_encoding(target_shp)
+    target_fields = [field.name for field in dbf.read_fields(target_shp, encoding)]
+    target_df = dbf.read_dbf(target_shp, [on], encoding)
+    joined_df = target_df.merge(df.drop_duplicates(on), how="left", on=on)
+    joined_df = joined_df.drop(columns=[c for c in target_fields if c in joined_df])
+    dbf.write_dbf(result_shp, joined_df, encoding, template=target_shp)
+    tablecache.SESSION.put_columns(
+        result_shp,
+        {on: target_df[on].to_numpy(), **dbf.written_columns(joined_df, encoding)},
+        target_df.index.to_numpy(),
+    )
+    return str(result_shp)
@@ -0,0 +1,351 @@
+"""Generator of synthetic inputs of any size, to measure how evaluations scale.
+
+A biotope map is a grid of quadrilaterals whose shared corners are jittered,
+so that neighbouring biotopes share edges as in real maps. Codes are drawn by
+blocks of cells, so that biotopes of a group form patches. Survey points,
+commercial points, keystone species and environmental layers are scattered
+over the same extent, and foodchain information covers the surveyed species.
+
+Every polygon has the same number of points, so the shapefiles are written as
+fixed-size records at once with numpy, and 1M polygons take seconds.
+"""
+import json
+from os import PathLike
+from pathlib import Path
+from typing import NamedTuple, Union
+
+import numpy as np
+import pandas as pd
+import pyproj
+
+from biotools import codes, dbf, raster
+from biotools.geoutils import ITRF2000_PRJ, WGS1984_PRJ
+
+# central belt of Korea, in which the fixture maps are drawn
+BIOTOPE_PRJ = pyproj.CRS.from_proj4(
+    "+proj=tmerc +lat_0=38 +lon_0=127 +k=1 +x_0=200000 +y_0=600000 +ellps=GRS80 "
+    "+units=m +no_defs"
+)
+ORIGIN = (195000.0, 510000.0)
+MANIFEST = "synthetic.json"
+VERSION = 1
+
+SURVEYPOINTS_PER_POLYGON = 0.1
+COMMERCIALPOINTS_PER_POLYGON = 0.01
+SPECIES_COUNT = 50
+KEYSTONE_SPECIES = ("까마귀", "멧비둘기")
+KEYSTONE_SAMPLES = 30
+LAYER_CELLSIZE = 30
+# cells of environmental layers around the biotope map
+LAYER_MARGIN = 10
+LAYER_NAMES = ("Green", "Water")
+
+
+class SyntheticInputs(NamedTuple):
+    biotope_shp: Path
+    environmentallayer_directory: Path
+    keystone_species_csv: Path
+    commercialpoint_csv: Path
+    surveypoint_shp: Path
+    foodchain_info_csv: Path
+
+    @property
+    def arguments(self) -> dict:
+        """Keyword arguments of `Biotools` besides the biotope map."""
+        return {k: v for k, v in self._asdict().items() if k != "biotope_shp"}
+
+
+def _shp_header(shape_type, file_bytes, bbox):
+    return (
+        np.array([9994, 0, 0, 0, 0, 0, file_bytes // 2], dtype=">i4").tobytes()
+        + np.array([1000, shape_type], dtype="<i4").tobytes()
+        + np.array([*bbox, 0, 0, 0, 0], dtype="<f8").tobytes()
+    )
+
+
+def _write_shapes(shp, shape_type, contents, bbox, crs):
+    """Writes .shp, .shx and .prj of records whose contents have the same size.
+
+    Args:
+        `contents`: Structured array of the contents of records.
+    """
+    shp = Path(shp)
+    count, size = len(contents), contents.dtype.itemsize
+    headers = np.empty(count, dtype=[("number", ">i4"), ("length", ">i4")])
+    headers["number"] = np.arange(1, count + 1)
+    headers["length"] = size // 2
+    records = np.empty(
+        count, dtype=[("header", headers.dtype), ("content", f"V{size}")]
+    )
+    records["header"] = headers
+    records["content"] = contents.view(f"V{size}")
+    with open(shp, "wb") as file:
+        file.write(_shp_header(shape_type, 100 + records.nbytes, bbox))
+        file.write(records.tobytes())
+
+    index = np.empty(count, dtype=[("offset", ">i4"), ("length", ">i4")])
+    index["offset"] = (100 + np.arange(count) * records.dtype.itemsize) // 2
+    index["length"] = size // 2
+    with open(shp.with_suffix(".shx"), "wb") as file:
+        file.write(_shp_header(shape_type, 100 + index.nbytes, bbox))
+        file.write(index.tobytes())
+
+    shp.with_suffix(".cpg").write_text("UTF-8")
+    shp.with_suffix(".prj").write_text(crs.to_wkt(pyproj.enums.WktVersion.WKT1_ESRI))
+    return shp
+
+
+def _write_polygons(shp, rings, crs):
+    """Writes polygons of one clockwise ring of 5 points each."""
+    contents = np.empty(
+        len(rings),
+        dtype=[
+            ("type", "<i4"),
+            ("bbox", "<f8", 4),
+            ("parts", "<i4", 2),
+            ("start", "<i4"),
+            ("points", "<f8", (5, 2)),
+        ],
+    )
+    contents["type"] = 5
+    contents["bbox"] = np.concatenate([rings.min(axis=1), rings.max(axis=1)], axis=1)
+    contents["parts"] = (1, 5)
+    contents["start"] = 0
+    contents["points"] = rings
+    bbox = (*rings.min(axis=(0, 1)), *rings.max(axis=(0, 1)))
+    return _write_shapes(shp, 5, contents, bbox, crs)
+
+
+def _write_points(shp, points, crs):
+    contents = np.empty(len(points), dtype=[("type", "<i4"), ("point", "<f8", 2)])
+    contents["type"] = 1
+    contents["point"] = points
+    bbox = (*points.min(axis=0), *points.max(axis=0))
+    return _write_shapes(shp, 1, contents, bbox, crs)
+
+
+def _grid_rings(rng, polygons, cellsize):
+    """Makes rings of the first `polygons` cells of a square grid, row by row."""
+    ncols = int(np.ceil(np.sqrt(polygons)))
+    nrows = int(np.ceil(polygons / ncols))
+    jitter = rng.uniform(-0.2, 0.2, (nrows + 1, ncols + 1, 2)) * cellsize
+    jitter[[0, -1]] = jitter[:, [0, -1]] = 0  # straight outline
+    ys, xs = np.meshgrid(np.arange(nrows + 1), np.arange(ncols + 1), indexing="ij")
+    corners = np.stack([xs, ys], axis=-1) * cellsize + jitter + ORIGIN
+
+    rows, cols = np.divmod(np.arange(polygons), ncols)
+    # clockwise from the lower left corner, closed
+    offsets = [(0, 0), (1, 0), (1, 1), (0, 1), (0, 0)]
+    rings = np.stack([corners[rows + dr, cols + dc] for dr, dc in offsets], axis=1)
+    return rings, rows, cols
+
+
+def _ring_areas(rings):
+    xs, ys = rings[..., 0], rings[..., 1]
+    return np.abs(
+        (xs[:, :-1] * ys[:, 1:] - xs[:, 1:] * ys[:, :-1]).sum(axis=1) / 2
+    )
+
+
+def _draw_codes(rng, rows, cols, block):
+    """Draws a large category for each block of cells, and a medium code of it
+    for each cell."""
+    large_codes = np.array(sorted(codes.BIOTOPE_CODES))
+    blocks = rows // block * (cols.max() // block + 1) + cols // block
+    block_large = rng.choice(large_codes, blocks.max() + 1)[blocks]
+    medium_codes = np.empty(len(rows), dtype=object)
+    for large_code in large_codes:
+        is_member = block_large == large_code
+        members = codes.BIOTOPE_CODES[large_code]
+        medium_codes[is_member] = rng.choice(members, is_member.sum())
+    return medium_codes
+
+
+def _uniform_points(rng, count, extent):
+    xmin, ymin, xmax, ymax = extent
+    return np.column_stack(
+        [rng.uniform(xmin, xmax, count), rng.uniform(ymin, ymax, count)]
+    )
+
+
+def _write_foodchain_info(csv, rng, species):
+    count = len(species)
+    pd.DataFrame(
+        {
+            "S_Name": species,
+            "Owls_foods": rng.choice(["Prey_S", "Normal_S"], count, p=[0.3, 0.7]),
+            "D_Level": rng.choice(["D1", "D2", "D3"], count, p=[0.2, 0.3, 0.5]),
+            "Alternative_S": rng.choice(
+                ["Threatened_S", "Alt_Alien_S", "Alt_S", "Normal_S"],
+                count,
+                p=[0.05, 0.2, 0.15, 0.6],
+            ),
+        }
+    ).to_csv(csv, index=False, encoding="euc-kr")
+
+
+def _write_surveypoints(shp, rng, count, extent, species):
+    _write_points(shp, _uniform_points(rng, count, extent), BIOTOPE_PRJ)
+    names = rng.choice(species, count).astype(object)
+    names[rng.random(count) < 0.05] = ""  # unnamed records
+    table_df = pd.DataFrame(
+        {
+            "구분": rng.choice(["조류", "포유류", "양서파충류"], count),
+            "지점": rng.integers(1, 100, count),
+            "국명": names,
+            "개체수": rng.integers(1, 20, count).astype(str),
+        }
+    )
+    dbf.write_dbf(shp, table_df)
+
+
+def _write_commercialpoints(csv, rng, count, extent):
+    points = _uniform_points(rng, count, extent)
+    to_wgs = pyproj.Transformer.from_crs(BIOTOPE_PRJ, WGS1984_PRJ, always_xy=True)
+    lons, lats = to_wgs.transform(points[:, 0], points[:, 1])
+    corners = [(-1, -1), (1, -1), (1, 1), (-1, 1), (-1, -1)]
+    areas = [
+        json.dumps(
+            {
+                "type": "Polygon",
+                "coordinates": [
+                    [[x + dx * 0.001, y + dy * 0.001] for dx, dy in corners]
+                ],
+            }
+        )
+        for x, y in zip(lons, lats)
+    ]
+    pd.DataFrame(
+        {
+            "상권명": [f"상권{i}" for i in range(count)],
+            "다중지역정보": areas,
+            "업종정보": rng.choice(["한식", "커피/음료", "편의점", "학원"], count),
+            "점포수": rng.integers(3, 300, count),
+            "위도": lats,
+            "경도": lons,
+        }
+    ).to_csv(csv, index=False, encoding="euc-kr")
+
+
+def _layer_extent(extent):
+    """Gets extent of environmental layers covering `extent` in ITRF2000."""
+    to_itrf = pyproj.Transformer.from_crs(BIOTOPE_PRJ, ITRF2000_PRJ, always_xy=True)
+    xmin, ymin, xmax, ymax = extent
+    xs, ys = to_itrf.transform([xmin, xmin, xmax, xmax], [ymin, ymax, ymin, ymax])
+    margin = LAYER_MARGIN * LAYER_CELLSIZE
+    return min(xs) - margin, min(ys) - margin, max(xs) + margin, max(ys) + margin
+
+
+def _write_layers(directory, rng, extent):
+    (nrows, ncols), xmin, ymin = raster.grid_of(extent, LAYER_CELLSIZE)
+    header = (
+        f"ncols         {ncols}\nnrows         {nrows}\nxllcorner     {xmin}\n"
+        f"yllcorner     {ymin}\ncellsize      {LAYER_CELLSIZE}\nNODATA_value  -9999"
+    )
+    ys, xs = np.ogrid[:nrows, :ncols]
+    ascs = []
+    for i, name in enumerate(LAYER_NAMES):
+        period = rng.uniform(40, 120, 2)
+        values = 1000 * (
+            2 + np.sin(xs / period[0] + i) + np.cos(ys / period[1] - i)
+        ) + rng.normal(0, 50, (nrows, ncols))
+        asc = directory / f"Synthetic{name}.asc"
+        np.savetxt(asc, values, fmt="%.3f", header=header, comments="")
+        raster.read_asc(asc)  # to parse it once before measurements
+        ascs.append(asc)
+    return ascs
+
+
+def _write_keystone_species(csv, rng, extent):
+    xmin, ymin, xmax, ymax = extent
+    margin = LAYER_MARGIN * LAYER_CELLSIZE
+    inner = (xmin + margin, ymin + margin, xmax - margin, ymax - margin)
+    count = len(KEYSTONE_SPECIES) * KEYSTONE_SAMPLES
+    points = _uniform_points(rng, count, inner)
+    pd.DataFrame(
+        {
+            "국명": np.repeat(KEYSTONE_SPECIES, KEYSTONE_SAMPLES),
+            "POINT_X": points[:, 0],
+            "POINT_Y": points[:, 1],
+        }
+    ).to_csv(csv, index=False, encoding="euc-kr")
+
+
+def generate(
+    directory: Union[str, PathLike],
+    polygons: int,
+    seed: int = 0,
+    cellsize: float = 50.0,
+    block: int = 4,
+) -> SyntheticInputs:
+    """Generates inputs of all indicators with a biotope map of `polygons`
+    polygons.
+
+    Inputs which were generated in `directory` with the same arguments are
+    reused.
+
+    Args:
+        `directory`: Path to directory in which inputs are written.
+        `polygons`: Number of biotopes.
+        `seed`: Seed of random values. The same seed makes the same inputs.
+        `cellsize`: Width of a biotope in meters.
+        `block`: Width of the blocks of biotopes in the same large category, in
+            biotopes.
+
+    Returns:
+        Paths to generated inputs.
+    """
+    directory = Path(directory).absolute()
+    layer_dir = directory / "envlayer"
+    inputs = SyntheticInputs(
+        directory / "biotope.shp",
+        layer_dir,
+        directory / "keystone_species.csv",
+        directory / "commercialpoint.csv",
+        directory / "survey_point.shp",
+        directory / "foodchain_info.csv",
+    )
+    arguments = {
+        "version": VERSION,
+        "polygons": polygons,
+        "seed": seed,
+        "cellsize": cellsize,
+        "block": block,
+    }
+    manifest = directory / MANIFEST
+    if manifest.exists() and json.loads(manifest.read_text()) == arguments:
+        return inputs
+
+    layer_dir.mkdir(parents=True, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    rings, rows, cols = _grid_rings(rng, polygons, cellsize)
+    _write_polygons(inputs.biotope_shp, rings, BIOTOPE_PRJ)
+    biotope_df = pd.DataFrame(
+        {
+            "비오톱": _draw_codes(rng, rows, cols, block),
+            "Area": _ring_areas(rings),
+        }
+    )
+    dbf.write_dbf(inputs.biotope_shp, biotope_df)
+    extent = (*rings.min(axis=(0, 1)), *rings.max(axis=(0, 1)))
+
+    species = np.array([f"종{i:03d}" for i in range(SPECIES_COUNT)])
+    _write_foodchain_info(inputs.foodchain_info_csv, rng, species)
+    _write_surveypoints(
+        inputs.surveypoint_shp,
+        rng,
+        max(10, int(polygons * SURVEYPOINTS_PER_POLYGON)),
+        extent,
+        species,
+    )
+    _write_commercialpoints(
+        inputs.commercialpoint_csv,
+        rng,
+        max(3, int(polygons * COMMERCIALPOINTS_PER_POLYGON)),
+        extent,
+    )
+    layer_extent = _layer_extent(extent)
+    _write_layers(layer_dir, rng, layer_extent)
+    _write_keystone_species(inputs.keystone_species_csv, rng, layer_extent)
+    manifest.write_text(json.dumps(arguments))
+    return inputs
@@ -0,0 +1,149 @@
+"""Decoded attribute columns and geometries of shapefiles kept in memory during
+a session.
+
+Indicators read the same biotope map again and again. Each column and each
+projection of the geometries is decoded once and kept until the file changes,
+and the least recently used ones are evicted when their total size exceeds
+the limit of the cache. The limit of the session is set once for all
+`Biotools` with `SESSION.max_bytes`.
+"""
+from collections import OrderedDict
+from os import PathLike
+from pathlib import Path
+import threading
+from typing import Callable, Dict, Hashable, Sequence, Union
+
+import numpy as np
+import pandas as pd
+import shapely
+
+from biotools import dbf, shputils
+
+DEFAULT_MAX_BYTES = 1 << 30
+# approximate size of a shapely geometry besides its coordinates
+GEOMETRY_OVERHEAD = 200
+
+
+def _sizeof(array):
+    if array.dtype != object:
+        return array.nbytes
+    if len(array) and isinstance(array[0], shapely.Geometry):
+        coordinates = shapely.get_num_coordinates(array).sum()
+        return array.nbytes + len(array) * GEOMETRY_OVERHEAD + int(coordinates) * 16
+    return int(pd.Series(array).memory_usage(index=False, deep=True))
+
+
+class TableCache:
+    """Least recently used arrays, up to `max_bytes` in total.
+
+    Arrays are read-only, so that those given to callers cannot change the
+    cached ones.
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._nbytes = 0
+        self._lock = threading.Lock()
+        self.max_bytes = max_bytes
+
+    @property
+    def max_bytes(self) -> int:
+        """Limit of the total size. Arrays are evicted at once when it is set."""
+        return self._max_bytes
+
+    @max_bytes.setter
+    def max_bytes(self, value: int):
+        with self._lock:
+            self._max_bytes = value
+            self._evict()
+
+    @property
+    def nbytes(self) -> int:
+        """Total size of cached arrays."""
+        return self._nbytes
+
+    def _get(self, key):
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return self._entries[key][0]
+
+    def _put(self, key, array):
+        array.flags.writeable = False
+        size = _sizeof(array)
+        with self._lock:
+            if key in self._entries:
+                self._nbytes -= self._entries.pop(key)[1]
+            if size <= self._max_bytes:
+                self._entries[key] = (array, size)
+                self._nbytes += size
+            self._evict()
+        return array
+
+    def _evict(self):
+        while self._nbytes > self._max_bytes:
+            self._nbytes -= self._entries.popitem(last=False)[1][1]
+
+    def get(self, key: Hashable, load: Callable[[], np.ndarray]) -> np.ndarray:
+        """Gets array of `key`, loading it with `load` if it is not cached."""
+        array = self._get(key)
+        return self._put(key, load()) if array is None else array
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._nbytes = 0
+
+    def read_dbf(
+        self, shp: Union[str, PathLike], fields: Sequence[str] = None
+    ) -> pd.DataFrame:
+        """Reads attribute table as `dbf.read_dbf` does, decoding only fields
+        which are not cached for the current content of `shp`.
+        """
+        if fields is None:
+            fields = [field.name for field in dbf.read_fields(shp)]
+        base = (str(Path(shp).absolute()), shputils.fingerprint(shp))
+        columns = {name: self._get((*base, name)) for name in ["FID", *fields]}
+        missing = [name for name in fields if columns[name] is None]
+        if missing or columns["FID"] is None:
+            table_df = dbf.read_dbf(shp, missing)
+            columns["FID"] = self._put((*base, "FID"), table_df.index.to_numpy())
+            for name in missing:
+                columns[name] = self._put((*base, name), table_df[name].to_numpy())
+        return pd.DataFrame(
+            {name: columns[name] for name in fields},
+            index=pd.Index(columns["FID"], name="FID"),
+        )
+
+    def put_columns(
+        self, shp: Union[str, PathLike], columns: Dict[str, np.ndarray], fids: np.ndarray
+    ):
+        """Caches `columns` of records of `fids` which were just written to
+        `shp`, as `dbf.read_columns` would read them.
+        """
+        base = (str(Path(shp).absolute()), shputils.fingerprint(shp))
+        self._put((*base, "FID"), np.asarray(fids))
+        for name, values in columns.items():
+            self._put((*base, name), values)
+
+    def read_geometries(
+        self,
+        shp: Union[str, PathLike],
+        load: Callable[[], np.ndarray],
+        crs=None,
+    ) -> np.ndarray:
+        """Gets geometries of `shp` projected to `crs`, loading them with `load`
+        if they are not cached for the current content of `shp`.
+        """
+        crs_key = None if crs is None else crs.to_wkt()
+        key = (str(Path(shp).absolute()), shputils.fingerprint(shp), "Shape", crs_key)
+        return self.get(key, load)
+
+
+# cache shared by backends in the session
+SESSION = TableCache()
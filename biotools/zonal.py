@@ -0,0 +1,90 @@
+"""Zonal statistics of value rasters over zone rasters.
+
+A zone raster holds the index of the zone containing each cell center, or -1.
+Statistics of all zones are computed at once with grouped reductions, so a
+zone raster can be reused for any value raster on the same grid.
+"""
+from typing import Sequence
+
+import numpy as np
+import pandas as pd
+
+STATISTICS = ("COUNT", "AREA", "MIN", "MAX", "MEAN", "SUM")
+
+
+class ZonalAccumulator:
+    """Accumulates statistics of zones over pieces of rasters, such as strips of
+    rows, so that a whole raster does not have to be in memory at once.
+
+    Args:
+        `zone_count`: Number of zones.
+        `statistics`: Columns of the result among `STATISTICS`.
+    """
+
+    def __init__(self, zone_count: int, statistics: Sequence[str] = STATISTICS):
+        unknown = set(statistics) - set(STATISTICS)
+        if unknown:
+            raise ValueError(f"Unknown statistics {sorted(unknown)}.")
+        self.statistics = list(statistics)
+        self._counts = np.zeros(zone_count)
+        self._sums = np.zeros(zone_count)
+        self._mins = np.full(zone_count, np.inf) if "MIN" in statistics else None
+        self._maxs = np.full(zone_count, -np.inf) if "MAX" in statistics else None
+
+    def add(self, zone: np.ndarray, array: np.ndarray):
+        """Adds cell values of `array` in `zone` of the same shape."""
+        zone = np.asarray(zone).ravel()
+        values = np.asarray(array, dtype=np.float64).ravel()
+        is_valid = (zone >= 0) & ~np.isnan(values)
+        zone = zone[is_valid]
+        values = values[is_valid]
+
+        zone_count = len(self._counts)
+        self._counts += np.bincount(zone, minlength=zone_count)
+        self._sums += np.bincount(zone, weights=values, minlength=zone_count)
+        if self._mins is not None:
+            np.minimum.at(self._mins, zone, values)
+        if self._maxs is not None:
+            np.maximum.at(self._maxs, zone, values)
+
+    def result(self, cellsize: float) -> pd.DataFrame:
+        """Gets table indexed by zone index. Zones without valid cells are excluded.
+
+        Args:
+            `cellsize`: Cell size of the rasters, for AREA.
+        """
+        counts = self._counts
+        columns = {
+            "COUNT": lambda: counts,
+            "AREA": lambda: counts * cellsize**2,
+            "MIN": lambda: self._mins,
+            "MAX": lambda: self._maxs,
+            "MEAN": lambda: self._sums / np.where(counts > 0, counts, 1),
+            "SUM": lambda: self._sums,
+        }
+        result_df = pd.DataFrame({name: columns[name]() for name in self.statistics})
+        return result_df[counts > 0]
+
+
+def summarize(
+    zone: np.ndarray,
+    array: np.ndarray,
+    cellsize: float,
+    zone_count: int,
+    statistics: Sequence[str] = STATISTICS,
+) -> pd.DataFrame:
+    """Summarizes `array` within each zone of `zone`.
+
+    Args:
+        `zone`: Zone raster of the same shape as `array`.
+        `array`: Cell values, whose NoData cells are `nan`.
+        `cellsize`: Cell size of the rasters, for AREA.
+        `zone_count`: Number of zones.
+        `statistics`: Columns of the result among `STATISTICS`.
+
+    Returns:
+        Table indexed by zone index. Zones without valid cells are excluded.
+    """
+    accumulator = ZonalAccumulator(zone_count, statistics)
+    accumulator.add(zone, array)
+    return accumulator.result(cellsize)
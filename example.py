@@ -1,3 +1,5 @@
+import pandas as pd
+
 from biotools import arcutils, Biotools
 
 
@@ -59,8 +61,8 @@ def main():
     f6 = bt.run_f6()
     print(arcutils.shp_to_df(f6))
 
-    full = bt.merge()
-    print(arcutils.shp_to_df(full))
+    full = bt.merge(shapefile=True)
+    print(pd.read_parquet(full))
 
 
 if __name__ == "__main__":
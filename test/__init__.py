@@ -0,0 +1,24 @@
+"""Inputs in test/fixture shared by test modules of the native backend."""
+from os import PathLike
+from typing import Union
+
+from biotools import Biotools
+
+SURVEY_INPUTS = {
+    "surveypoint_shp": "test/fixture/survey_point.shp",
+    "foodchain_info_csv": "test/fixture/foodchain_info.csv",
+}
+KEYSTONE_INPUTS = {
+    "environmentallayer_directory": "test/fixture/envlayer/",
+    "keystone_species_csv": "test/fixture/keystone_species.csv",
+}
+COMMERCIAL_INPUTS = {"commercialpoint_csv": "test/fixture/commercialpoint.csv"}
+
+
+def native_biotools(
+    biotope_shp: Union[str, PathLike],
+    result_directory: Union[str, PathLike],
+    **kwargs,
+) -> Biotools:
+    """Creates `Biotools` of the native backend."""
+    return Biotools(biotope_shp, result_directory, backend="native", **kwargs)
@@ -0,0 +1,62 @@
+from pathlib import Path
+import tempfile
+import unittest
+
+import numpy as np
+import shapely
+
+from biotools import adjacency
+
+
+class TestAdjacency(unittest.TestCase):
+    def setUp(self):
+        self.geometries = [
+            shapely.box(0, 0, 1, 1),
+            shapely.box(1, 0, 2, 1),  # shares an edge with 0
+            shapely.box(2, 1, 3, 2),  # touches 1 only at a corner
+            shapely.box(2.5, 1.5, 4, 4),  # overlaps 2
+            shapely.box(10, 10, 11, 11),
+        ]
+        self.graph = adjacency.build_graph(
+            self.geometries, [f"BT_ID{i}" for i in range(5)]
+        )
+
+    def test_edges(self):
+        self.assertListEqual(self.graph.edges.tolist(), [[0, 1], [2, 3]])
+
+    def test_components(self):
+        self.assertListEqual(self.graph.components().tolist(), [0, 0, 2, 2, 4])
+
+    def test_subgraph(self):
+        subgraph = self.graph.subgraph(np.array([False, True, True, True, False]))
+        self.assertListEqual(subgraph.bt_ids.tolist(), ["BT_ID1", "BT_ID2", "BT_ID3"])
+        self.assertListEqual(subgraph.edges.tolist(), [[1, 2]])
+
+    def test_chain(self):
+        edges = np.array([[i, i + 1] for i in range(99)])[::-1]
+        labels = adjacency.connected_components(100, edges)
+        self.assertTrue((labels == 0).all())
+
+    def test_save_load(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            npz = self.graph.save(Path(temp_dir) / "graph.npz", key=["a", 1])
+            graph = adjacency.AdjacencyGraph.load(npz, key=["a", 1])
+            self.assertIsNone(adjacency.AdjacencyGraph.load(npz, key=["a", 2]))
+        self.assertListEqual(graph.bt_ids.tolist(), self.graph.bt_ids.tolist())
+        np.testing.assert_array_equal(graph.edges, self.graph.edges)
+
+    def test_update_graph(self):
+        bt_ids = [f"BT_ID{i}" for i in range(5)]
+        digests = np.array(list("abcde"), dtype=object)
+        previous = adjacency.build_graph(self.geometries, bt_ids, digests=digests)
+        geometries = self.geometries.copy()
+        geometries[1] = shapely.box(1, 0, 2.5, 1.5)  # now overlaps 2 as well
+        geometries[4] = shapely.box(3, 3, 5, 5)  # now overlaps 3
+        digests = np.array(list("aBcdE"), dtype=object)
+        graph = adjacency.update_graph(previous, geometries, bt_ids, digests)
+        expected = adjacency.build_graph(geometries, bt_ids)
+        self.assertListEqual(
+            sorted(map(tuple, graph.edges.tolist())),
+            sorted(map(tuple, expected.edges.tolist())),
+        )
+        self.assertListEqual(graph.digests.tolist(), digests.tolist())
@@ -0,0 +1,32 @@
+from pathlib import Path
+import shutil
+import unittest
+
+import pandas as pd
+
+from test import native_biotools
+
+
+class TestH3Raster(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.temp_result_dir = Path("test/temp_result/")
+        bt = native_biotools("test/fixture/biotope.shp", cls.temp_result_dir)
+        cls.result = pd.read_csv(
+            Path(bt.run_h3(method="raster")).with_suffix(".csv")
+        )
+        cls.answer = pd.read_csv("test/answer/result_h3/biotope_WGS_h3.csv")
+
+    def test_columns(self):
+        self.assertListEqual(
+            self.result.columns.tolist(), self.answer.columns.tolist()
+        )
+
+    def test_error_against_vector(self):
+        error = (self.result["H3_RESULT"] - self.answer["H3_RESULT"]).abs()
+        self.assertLess(error.mean(), 1)  # percentage points
+        self.assertLess(error.max(), 3)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.temp_result_dir)
@@ -0,0 +1,33 @@
+import unittest
+
+import pandas as pd
+
+from biotools import geoutils
+from biotools.codes import ClassificationIndex
+
+
+class TestTabulateBufferIntersection(unittest.TestCase):
+    biotope_shp = "test/answer/result_h1/biotope_WGS_h1.shp"
+
+    def test_batches(self):
+        biotope_df = geoutils.shp_to_df(self.biotope_shp, ["비오톱"])
+        is_green = ClassificationIndex(biotope_df["비오톱"]).masks["green"]
+        whole_df = geoutils.tabulate_buffer_intersection(
+            self.biotope_shp, is_green, 125
+        )
+        batched_df = geoutils.tabulate_buffer_intersection(
+            self.biotope_shp, is_green, 125, batch_size=2
+        )
+        pd.testing.assert_frame_equal(batched_df, whole_df)
+
+    def test_buffer_distance(self):
+        biotope_df = geoutils.shp_to_df(self.biotope_shp, ["비오톱"])
+        is_green = ClassificationIndex(biotope_df["비오톱"]).masks["green"]
+        near_df = geoutils.tabulate_buffer_intersection(
+            self.biotope_shp, is_green, 10
+        )
+        far_df = geoutils.tabulate_buffer_intersection(
+            self.biotope_shp, is_green, 125
+        )
+        self.assertTrue((near_df["AREA"] <= far_df["AREA"] + 1e-6).all())
+        self.assertTrue((near_df["PERCENTAGE"] >= far_df["PERCENTAGE"] - 1e-6).all())
@@ -0,0 +1,61 @@
+from pathlib import Path
+import shutil
+import unittest
+
+from biotools.cache import ProcessCache, content_key
+
+
+class TestProcessCache(unittest.TestCase):
+    temp_dir = Path("test/temp_cache/")
+
+    def setUp(self):
+        self.temp_dir.mkdir()
+        self.input_csv = self.temp_dir / "input.csv"
+        self.input_csv.write_text("a,b\n1,2\n")
+        self.built = []
+
+    def build(self, output):
+        self.built.append(output)
+        output.write_text(self.input_csv.read_text().upper())
+        output.with_suffix(".txt").write_text("sidecar")
+
+    def test_built_once(self):
+        (self.temp_dir / "process1").mkdir()
+        cache = ProcessCache(self.temp_dir / "process1")
+        for _ in range(2):
+            output = cache.build("output.csv", [self.input_csv], {"n": 1}, self.build)
+        self.assertEqual(len(self.built), 1)
+        self.assertEqual(output.read_text(), "A,B\n1,2\n")
+
+    def test_changed_input_is_built_again(self):
+        (self.temp_dir / "process1").mkdir()
+        cache = ProcessCache(self.temp_dir / "process1")
+        cache.build("output.csv", [self.input_csv], {}, self.build)
+        self.input_csv.write_text("a,b\n30,40\n")  # same name, other content
+        output = cache.build("output.csv", [self.input_csv], {}, self.build)
+        self.assertEqual(len(self.built), 2)
+        self.assertEqual(output.read_text(), "A,B\n30,40\n")
+
+        cache.build("output.csv", [self.input_csv], {"n": 2}, self.build)
+        self.assertEqual(len(self.built), 3)
+
+    def test_shared_between_process_directories(self):
+        shared_dir = self.temp_dir / "shared"
+        outputs = []
+        for name in ["process1", "process2"]:
+            (self.temp_dir / name).mkdir()
+            cache = ProcessCache(self.temp_dir / name, shared_dir)
+            outputs.append(cache.build("output.csv", [self.input_csv], {}, self.build))
+        self.assertEqual(len(self.built), 1)
+        self.assertEqual(outputs[1].read_text(), outputs[0].read_text())
+        self.assertTrue(outputs[1].with_suffix(".txt").exists())
+
+    def test_content_key_ignores_file_name(self):
+        copy_csv = self.temp_dir / "copy.csv"
+        shutil.copy(self.input_csv, copy_csv)
+        self.assertEqual(
+            content_key([self.input_csv], {}), content_key([copy_csv], {})
+        )
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
@@ -0,0 +1,29 @@
+import unittest
+
+import numpy as np
+
+from biotools import codes
+
+
+class TestClassificationIndex(unittest.TestCase):
+    def test_masks(self):
+        index = codes.ClassificationIndex(["A1", "L2", "N1", "A3"])
+        self.assertListEqual(index.large_codes.tolist(), [1, 14, 16, 1])
+        np.testing.assert_array_equal(
+            index.masks["developed"], [True, False, False, True]
+        )
+        np.testing.assert_array_equal(index.masks["green"], [False, True, False, False])
+        np.testing.assert_array_equal(
+            index.masks["main_habitat"], [False, False, True, False]
+        )
+
+    def test_unknown_codes(self):
+        with self.assertWarnsRegex(UserWarning, "XX"):
+            index = codes.ClassificationIndex(["A1", "XX", None, "XX"])
+        self.assertDictEqual(index.unknown_codes, {"": 1, "XX": 2})
+        self.assertEqual(index.large_codes[1], -1)
+        self.assertFalse(any(mask[1] for mask in index.masks.values()))
+
+    def test_medium_codes_reusable(self):
+        medium_codes = codes.get_medium_codes([16])
+        self.assertListEqual(list(medium_codes), list(medium_codes))
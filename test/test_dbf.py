@@ -0,0 +1,125 @@
+from pathlib import Path
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from biotools import dbf
+
+
+class TestDbf(unittest.TestCase):
+
+    def test_read_fields(self):
+        fields = dbf.read_fields("test/fixture/biotope.shp")
+        self.assertListEqual([field.name for field in fields], ["비오톱", "Area"])
+        self.assertListEqual([field.type for field in fields], ["C", "F"])
+
+    def test_read_text(self):
+        df = dbf.read_dbf("test/fixture/biotope.shp")
+        self.assertListEqual(
+            df["비오톱"].tolist(), ["L2", "L2", "L4", "N1", "A3", "A3", "M2"]
+        )
+
+    def test_read_number(self):
+        columns = dbf.read_columns("test/fixture/survey_point.dbf", ["지점", "y"])
+        self.assertEqual(columns["지점"].dtype, np.int64)
+        self.assertEqual(columns["y"].dtype, np.float64)
+        self.assertAlmostEqual(columns["y"][0], 37.28033333)
+
+    def test_select_fields(self):
+        df = dbf.read_dbf("test/fixture/survey_point.shp", ["개체수", "국명"])
+        self.assertListEqual(df.columns.tolist(), ["개체수", "국명"])
+        self.assertEqual(df.index.name, "FID")
+        self.assertEqual(len(df), 76)
+
+    def test_missing_field(self):
+        with self.assertRaises(KeyError):
+            dbf.read_dbf("test/fixture/biotope.shp", ["BT_ID"])
+
+    def test_write_round_trip(self):
+        df = pd.DataFrame(
+            {
+                "BT_ID": ["BT_ID0", "BT_ID1", None],
+                "COUNT": [1, 2, 3],
+                "RESULT": [0.5, np.nan, 2.0],
+                "비오톱": ["가나", "", "다"],
+            }
+        )
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = dbf.write_dbf(Path(temp_dir) / "table.dbf", df)
+            fields = dbf.read_fields(path, "utf-8")
+            result = dbf.read_dbf(path, encoding="utf-8")
+        self.assertListEqual(
+            [field[1:] for field in fields],
+            [("C", 254, 0), ("N", 10, 0), ("F", 19, 11), ("C", 254, 0)],
+        )
+        self.assertListEqual(result["BT_ID"].tolist(), ["BT_ID0", "BT_ID1", ""])
+        self.assertListEqual(result["COUNT"].tolist(), [1, 2, 3])
+        self.assertTrue(np.isnan(result["RESULT"][1]))
+        self.assertListEqual(result["비오톱"].tolist(), ["가나", "", "다"])
+
+    def test_written_columns(self):
+        df = pd.DataFrame(
+            {
+                "BT_ID": ["BT_ID0", None],
+                "H3_PERCENTAGE": [1 / 3, np.nan],
+                "FLAG": [True, False],
+            }
+        )
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = dbf.write_dbf(Path(temp_dir) / "table.dbf", df)
+            expected = dbf.read_columns(path, encoding="utf-8")
+        columns = dbf.written_columns(df)
+        self.assertListEqual(list(columns), ["BT_ID", "H3_PERCENT", "FLAG"])
+        for name, values in expected.items():
+            np.testing.assert_array_equal(columns[name], values)
+
+    def test_write_with_template(self):
+        df = pd.DataFrame({"RESULT": np.arange(7) / 2})
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = dbf.write_dbf(
+                Path(temp_dir) / "table.dbf",
+                df,
+                template="test/fixture/biotope.dbf",
+            )
+            with open(path, "rb") as file:
+                data = file.read()
+            result = dbf.read_dbf(path, encoding="utf-8")
+        self.assertListEqual(result.columns.tolist(), ["비오톱", "Area", "RESULT"])
+        self.assertEqual(result["비오톱"][2], "L4")
+        self.assertIn(b"  1.50000000000e+00", data)  # as ArcGIS writes
+
+    def test_write_with_deleted_template(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            template = Path(temp_dir) / "template.dbf"
+            data = bytearray(Path("test/fixture/biotope.dbf").read_bytes())
+            header_size, record_size = np.frombuffer(data, "<u2", 2, offset=8)
+            data[header_size + 2 * record_size] = ord("*")  # deletes FID 2
+            template.write_bytes(bytes(data))
+            shutil.copyfile("test/fixture/biotope.cpg", template.with_suffix(".cpg"))
+            df = pd.DataFrame({"RESULT": [0.0, 1.0, 3.0, 4.0, 5.0, 6.0]})
+            path = dbf.write_dbf(Path(temp_dir) / "table.dbf", df, template=template)
+            record_count = np.frombuffer(path.read_bytes(), "<u4", 1, offset=4)[0]
+            result = dbf.read_dbf(path, encoding="utf-8")
+            with self.assertRaises(ValueError):
+                dbf.write_dbf(Path(temp_dir) / "table.dbf", df[:5], template=template)
+        self.assertEqual(record_count, 7)
+        self.assertListEqual(result.index.tolist(), [0, 1, 3, 4, 5, 6])
+        self.assertListEqual(result["RESULT"].tolist(), [0, 1, 3, 4, 5, 6])
+        self.assertEqual(result["비오톱"][3], "N1")
+
+    def test_number_too_wide(self):
+        df = pd.DataFrame({"COUNT": [1, 123456789012]})
+        with tempfile.TemporaryDirectory() as temp_dir:
+            with self.assertRaises(ValueError):
+                dbf.write_dbf(Path(temp_dir) / "table.dbf", df)
+
+    def test_same_names_within_10_bytes(self):
+        df = pd.DataFrame({"H3_PERCENTAGE": [1.0], "H3_PERCENTILE": [2.0]})
+        with tempfile.TemporaryDirectory() as temp_dir:
+            with self.assertRaises(ValueError):
+                dbf.write_dbf(Path(temp_dir) / "table.dbf", df)
+        with self.assertRaises(ValueError):
+            dbf.written_columns(df)
@@ -0,0 +1,68 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from biotools import geoutils
+from biotools.distance import distance_strips
+from biotools.raster import StripRaster, read_asc
+
+
+def brute_force(is_source, cellsize):
+    rows, cols = np.indices(is_source.shape)
+    source_rows, source_cols = np.nonzero(is_source)
+    squared = (rows[..., np.newaxis] - source_rows) ** 2 + (
+        cols[..., np.newaxis] - source_cols
+    ) ** 2
+    return np.sqrt(squared.min(axis=-1)) * cellsize
+
+
+def transform(is_source, cellsize, strip_rows):
+    strips = distance_strips(
+        lambda rows: is_source[rows], is_source.shape, cellsize, strip_rows
+    )
+    return np.vstack([distances for _, distances in strips])
+
+
+class TestDistanceStrips(unittest.TestCase):
+    def test_exact(self):
+        rng = np.random.default_rng(0)
+        for shape, density, strip_rows in [
+            ((40, 50), 0.01, 7),
+            ((33, 21), 0.2, 256),
+            ((1, 9), 0.3, 1),
+        ]:
+            is_source = rng.random(shape) < density
+            is_source[0, 0] = True
+            np.testing.assert_allclose(
+                transform(is_source, 5, strip_rows),
+                brute_force(is_source, 5),
+                rtol=1e-6,
+            )
+
+    def test_far_source(self):
+        is_source = np.zeros((30, 4), dtype=bool)
+        is_source[29, 3] = True
+        np.testing.assert_allclose(
+            transform(is_source, 1, 4), brute_force(is_source, 1), rtol=1e-6
+        )
+
+    def test_no_source(self):
+        distances = transform(np.zeros((5, 5), dtype=bool), 1, 2)
+        self.assertTrue(np.isnan(distances).all())
+
+
+class TestStripZonalStatistics(unittest.TestCase):
+    def test_same_as_in_memory(self):
+        grid = read_asc("test/fixture/envlayer/SuwonGreen.asc", cache=False)
+        source = geoutils.threshold_raster(grid, np.nanquantile(grid.array, 0.99))
+        distance_raster = geoutils.euc_distance(source, grid.cellsize)
+        self.assertIsInstance(distance_raster, StripRaster)
+
+        biotope_shp = "test/answer/result_h1/biotope_WGS_h1.shp"
+        strip_df = geoutils.zonal_statistics(biotope_shp, distance_raster, "ALL")
+        memory_df = geoutils.zonal_statistics(
+            biotope_shp, distance_raster.with_array(distance_raster.array), "ALL"
+        )
+        self.assertGreater(len(strip_df), 0)
+        pd.testing.assert_frame_equal(strip_df, memory_df)
@@ -0,0 +1,104 @@
+import datetime
+from pathlib import Path
+import shutil
+import sqlite3
+import unittest
+
+import numpy as np
+import pandas as pd
+import shapely
+
+from biotools import Biotools
+from biotools.gpkg import APPLICATION_ID, GeoPackageStore
+
+
+class TestGeoPackageStore(unittest.TestCase):
+    temp_dir = Path("test/temp_gpkg/")
+
+    def setUp(self):
+        self.temp_dir.mkdir()
+        self.path = self.temp_dir / "results.gpkg"
+        self.store = GeoPackageStore(self.path)
+        wkbs = shapely.to_wkb(shapely.points([[127, 37], [127, 38], [128, 37]]))
+        self.store.write_biotopes(["a", "b", "c"], wkbs, "key")
+        self.result_df = pd.DataFrame(
+            {"BT_ID": ["a", "b", "c"], "H1_RESULT": [1.0, np.nan, 3.0]}
+        )
+
+    def test_only_changed_rows_are_written(self):
+        self.assertEqual(self.store.upsert(self.result_df), 2)  # NaN is stored
+        self.assertEqual(self.store.upsert(self.result_df), 0)
+        changed_df = self.result_df.assign(H1_RESULT=[1.0, 2.0, 3.0])
+        self.assertEqual(self.store.upsert(changed_df), 1)
+        pd.testing.assert_frame_equal(self.store.read(["H1_RESULT"]), changed_df)
+
+    def test_read_biotopes(self):
+        self.store.upsert(self.result_df)
+        self.store.upsert(pd.DataFrame({"BT_ID": ["b"], "H3_RESULT": [5]}))
+        result = self.store.read(bt_ids=["c", "b"])
+        self.assertListEqual(
+            result.columns.tolist(), ["BT_ID", "H1_RESULT", "H3_RESULT"]
+        )
+        self.assertListEqual(result["BT_ID"].tolist(), ["b", "c"])
+
+    def test_biotopes_written_again(self):
+        self.store.upsert(self.result_df)
+        wkbs = shapely.to_wkb(shapely.points([[127, 37], [128, 37]]))
+        self.store.write_biotopes(["a", "c"], wkbs, "other key")
+        self.assertEqual(self.store.biotopes_key, "other key")
+        self.assertListEqual(self.store.read()["BT_ID"].tolist(), ["a", "c"])
+
+    def test_runs(self):
+        started = datetime.datetime(2024, 1, 1)
+        self.store.record_run("h1", {"scores": [1, 2]}, started, 0.5, 3)
+        runs = self.store.runs()
+        self.assertEqual(runs["arguments"].iloc[0], '{"scores": [1, 2]}')
+        self.assertEqual(runs["started"].iloc[0], "2024-01-01T00:00:00")
+
+    def test_geopackage(self):
+        with sqlite3.connect(self.path) as connection:
+            application_id = connection.execute("PRAGMA application_id").fetchone()
+            contents = connection.execute(
+                "SELECT table_name, data_type FROM gpkg_contents"
+            ).fetchall()
+            blob = connection.execute("SELECT geom FROM biotope_results").fetchone()
+        self.assertEqual(application_id[0], APPLICATION_ID)
+        self.assertIn(("biotope_results", "features"), contents)
+        self.assertEqual(blob[0][:2], b"GP")
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+
+class TestResultsStore(unittest.TestCase):
+    temp_result_dir = Path("test/temp_result/")
+
+    def setUp(self):
+        self.path = self.temp_result_dir / "results.gpkg"
+        self.temp_result_dir.mkdir()
+        self.bt = Biotools(
+            "test/fixture/biotope.shp",
+            self.temp_result_dir,
+            backend="native",
+            results_gpkg=self.path,
+        )
+
+    def test_results_stored(self):
+        h1_csv = Path(self.bt.run_h1()).with_suffix(".csv")
+        self.bt.run_h3()
+        self.bt.run_h1()
+        result = GeoPackageStore(self.path).read()
+        answer = pd.read_csv(h1_csv, encoding="euc-kr")
+        pd.testing.assert_frame_equal(
+            result[["BT_ID", "H1_HECTARE", "H1_RESULT"]],
+            answer[["BT_ID", "H1_HECTARE", "H1_RESULT"]],
+            check_dtype=False,
+        )
+        self.assertIn("H3_RESULT", result.columns)
+
+        runs = GeoPackageStore(self.path).runs()
+        self.assertListEqual(runs["tag"].tolist(), ["h1", "h3", "h1"])
+        self.assertListEqual(runs["changed_rows"].tolist(), [len(answer)] * 2 + [0])
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_result_dir)
@@ -0,0 +1,137 @@
+from pathlib import Path
+import shutil
+import unittest
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+from biotools import geoutils
+from biotools.incremental import MapState, ResultStore, measure_incrementally
+from test import COMMERCIAL_INPUTS, native_biotools
+
+
+def make_state(digests, bounds):
+    index = pd.Index(list(digests))
+    return MapState(
+        pd.Series(list(digests.values()), index=index),
+        pd.DataFrame(bounds, index=index, columns=["XMIN", "YMIN", "XMAX", "YMAX"]),
+    )
+
+
+class TestMapState(unittest.TestCase):
+    def test_changed_ids(self):
+        previous = make_state({"A": "a", "B": "b", "C": "c"}, np.zeros((3, 4)))
+        state = make_state({"A": "a", "B": "x", "D": "d"}, np.zeros((3, 4)))
+        self.assertListEqual(state.changed_ids(previous).tolist(), ["B", "C", "D"])
+
+    def test_near(self):
+        bounds = [[127, 37, 127.001, 37.001], [127.002, 37, 127.003, 37.001]]
+        state = make_state({"A": "a", "B": "b"}, bounds)
+        far = make_state({"A": "a", "B": "b", "C": "c"}, bounds + [[128, 37, 128, 37]])
+        # the two boxes are about 89 meters apart
+        self.assertListEqual(state.near(state, ["A"], 50).tolist(), [True, False])
+        self.assertListEqual(state.near(state, ["A"], 100).tolist(), [True, True])
+        self.assertListEqual(state.near(far, ["C"], 100).tolist(), [False, False])
+
+
+class TestMeasureIncrementally(unittest.TestCase):
+    def setUp(self):
+        self.store = ResultStore("test/temp_incremental/")
+        self.measured = []
+
+    def measure(self, values):
+        def function(targets):
+            self.measured.append(targets)
+            table = pd.DataFrame({"BT_ID": list(values), "MIN": list(values.values())})
+            return table if targets is None else table[targets]
+
+        return function
+
+    def run_measure(self, state, values, key="key"):
+        def affected(previous, changed):
+            return state.digests.index.isin(changed)
+
+        table = measure_incrementally(
+            self.store, "h5", key, state, self.measure(values), affected
+        )
+        return table.sort_values("BT_ID", ignore_index=True)
+
+    def test_only_changed_are_measured(self):
+        bounds = np.zeros((3, 4))
+        values = {"A": 1.0, "B": 2.0, "C": 3.0}
+        self.run_measure(make_state({"A": "a", "B": "b", "C": "c"}, bounds), values)
+
+        values = {"A": 1.0, "B": 5.0, "D": 4.0}
+        state = make_state({"A": "a", "B": "x", "D": "d"}, bounds)
+        table = self.run_measure(state, values)
+        self.assertListEqual(self.measured[-1].tolist(), [False, True, True])
+        pd.testing.assert_frame_equal(
+            table, pd.DataFrame({"BT_ID": ["A", "B", "D"], "MIN": [1.0, 5.0, 4.0]})
+        )
+
+        self.run_measure(state, values)
+        self.assertEqual(len(self.measured), 2)  # nothing changed
+
+    def test_other_key_measures_all(self):
+        state = make_state({"A": "a"}, np.zeros((1, 4)))
+        self.run_measure(state, {"A": 1.0}, key=[5, "raster"])
+        self.run_measure(state, {"A": 1.0}, key=[10, "raster"])
+        self.assertListEqual(self.measured, [None, None])
+
+    def tearDown(self):
+        if Path("test/temp_incremental/").exists():
+            shutil.rmtree("test/temp_incremental/")
+
+
+class TestIncremental(unittest.TestCase):
+    temp_dir = Path("test/temp_incremental/")
+
+    def setUp(self):
+        self.temp_dir.mkdir()
+        for path in Path("test/fixture").glob("biotope.*"):
+            shutil.copy(path, self.temp_dir)
+        self.biotope_shp = self.temp_dir / "biotope.shp"
+
+    def evaluate(self, result_directory, incremental):
+        bt = native_biotools(
+            self.biotope_shp,
+            self.temp_dir / result_directory,
+            incremental=incremental,
+            **COMMERCIAL_INPUTS,
+        )
+        with mock.patch.object(
+            bt._gis, "nearest_point_distance", wraps=bt._gis.nearest_point_distance
+        ) as nearest_point_distance, mock.patch.object(
+            bt._gis, "patch_hectares", wraps=bt._gis.patch_hectares
+        ) as patch_hectares:
+            h5_shp = bt.run_h5(method="vector")
+            h1_shp = bt.run_h1()
+        h3_shp = bt.run_h3(buffer_distance=10)
+        self.targets = nearest_point_distance.call_args.kwargs["targets"]
+        self.patch_targets = patch_hectares.call_args.kwargs["targets"]
+        return [
+            pd.read_csv(Path(shp).with_suffix(".csv"))
+            for shp in [h1_shp, h3_shp, h5_shp]
+        ]
+
+    def test_same_as_full_run(self):
+        self.evaluate("incremental", True)
+        self.assertIsNone(self.targets)
+
+        shape_type, fields, shapes, records = geoutils._read_shapes(self.biotope_shp)
+        shapes[0].points = [(x + 3, y) for x, y in shapes[0].points]
+        crs = geoutils._get_crs(self.biotope_shp)
+        geoutils._write_shapes(
+            self.biotope_shp, shape_type, fields, shapes, records, crs
+        )
+
+        results = self.evaluate("incremental", True)
+        self.assertListEqual(self.targets.tolist(), [True] + [False] * 6)
+        self.assertTrue(self.patch_targets[0])
+        self.assertFalse(self.patch_targets.all())
+        for result, answer in zip(results, self.evaluate("full", False)):
+            pd.testing.assert_frame_equal(result, answer)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
@@ -0,0 +1,125 @@
+from pathlib import Path
+import shutil
+import subprocess
+import tempfile
+import unittest
+from unittest import mock
+
+import pandas as pd
+
+from biotools import maxent
+
+
+def fake_maxent(command, **kwargs):
+    """Writes outputs as maxent does, for each species in the samples."""
+    options = dict(arg.split("=", 1) for arg in command if "=" in arg)
+    output_dir = Path(options["outputdirectory"])
+    species = pd.read_csv(options["samplesfile"], encoding="euc-kr").iloc[:, 0]
+    for name in species.unique():
+        (output_dir / f"{name}.asc").write_text("")
+    pd.DataFrame({"Species": species.unique()}).to_csv(
+        output_dir / "maxentResults.csv", index=False, encoding="euc-kr"
+    )
+    return subprocess.CompletedProcess(command, 0, b"", b"")
+
+
+def failing_maxent(command, **kwargs):
+    return subprocess.CompletedProcess(command, 1, b"", b"java.lang.OutOfMemoryError")
+
+
+class TestMaxentCache(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp())
+        self.samples = self.temp_dir / "samples.csv"
+        shutil.copyfile("test/fixture/keystone_species.csv", self.samples)
+        self.patcher = mock.patch("subprocess.run", side_effect=fake_maxent)
+        self.run = self.patcher.start()
+
+    def run_maxent(self, **kwargs):
+        return maxent.run_maxent(
+            self.samples, "test/fixture/envlayer", self.temp_dir / "out", **kwargs
+        )
+
+    def test_rerun_cached(self):
+        ascs = self.run_maxent()
+        self.assertEqual(self.run.call_count, 1)
+        self.assertListEqual(self.run_maxent(), ascs)
+        self.assertEqual(self.run.call_count, 1)
+        self.assertTrue(all(Path(asc).exists() for asc in ascs))
+
+    def test_changed_inputs(self):
+        first = self.run_maxent()
+        self.run_maxent(jackknife=False)
+        self.assertEqual(self.run.call_count, 2)
+
+        with open(self.samples, "a", encoding="euc-kr") as file:
+            file.write(open(self.samples, encoding="euc-kr").readlines()[-1])
+        second = self.run_maxent()
+        self.assertEqual(self.run.call_count, 3)
+        self.assertNotEqual(Path(first[0]).parent, Path(second[0]).parent)
+
+    def test_incomplete_run(self):
+        ascs = self.run_maxent()
+        Path(ascs[0]).unlink()
+        self.assertListEqual(self.run_maxent(), ascs)
+        self.assertEqual(self.run.call_count, 2)
+
+    def test_truncated_manifest(self):
+        ascs = self.run_maxent()
+        manifest = Path(ascs[0]).parent / maxent.MANIFEST
+        manifest.write_text(manifest.read_text(encoding="utf-8")[:20])
+        self.assertListEqual(self.run_maxent(), ascs)
+        self.assertEqual(self.run.call_count, 2)
+        self.assertListEqual(
+            [path.name for path in (self.temp_dir / "out").glob("*.t*")], []
+        )
+
+    def test_prune_runs(self):
+        kept = self.run_maxent(jackknife=False)
+        for options in [{}, {"autofeature": False}]:
+            self.run_maxent(**options)
+        self.assertListEqual(self.run_maxent(jackknife=False), kept)  # used lately
+        removed = maxent.prune_runs(self.temp_dir / "out", keep=1)
+        self.assertEqual(len(removed), 2)
+        self.assertTrue(all(Path(asc).exists() for asc in kept))
+        self.assertEqual(self.run.call_count, 3)
+
+    def test_by_species(self):
+        ascs = self.run_maxent(workers=2, memory="1g", threads=2)
+        self.assertEqual(self.run.call_count, 2)
+        self.assertListEqual([Path(asc).name for asc in ascs], ["까마귀.asc", "박새.asc"])
+        command = self.run.call_args[0][0]
+        self.assertIn("-mx1g", command)
+        self.assertIn("threads=2", command)
+        self.assertListEqual(self.run_maxent(workers=2), ascs)
+
+    def test_run_key(self):
+        ascs = self.run_maxent(memory="1g", jackknife=False)
+        key = maxent.run_key(self.samples, "test/fixture/envlayer", jackknife=False)
+        self.assertEqual(Path(ascs[0]).parent.name, key)
+        self.assertNotEqual(maxent.run_key(self.samples, "test/fixture/envlayer"), key)
+
+    def test_published(self):
+        output_dir = self.temp_dir / "out"
+        self.run_maxent(workers=2)
+        summary_df = pd.read_csv(output_dir / "maxentResults.csv", encoding="euc-kr")
+        self.assertListEqual(summary_df["Species"].tolist(), ["까마귀", "박새"])
+        self.assertTrue((output_dir / "박새.asc").exists())
+
+        ascs = self.run_maxent(jackknife=False)  # published over the previous run
+        self.assertEqual(self.run.call_count, 3)
+        self.assertEqual(
+            (output_dir / "maxentResults.csv").read_bytes(),
+            (Path(ascs[0]).parent / "maxentResults.csv").read_bytes(),
+        )
+
+    def test_failure(self):
+        self.run.side_effect = failing_maxent
+        with self.assertRaises(maxent.MaxentError) as context:
+            self.run_maxent()
+        self.assertIn("OutOfMemoryError", str(context.exception))
+        self.assertListEqual(list((self.temp_dir / "out").glob("*.tmp")), [])
+
+    def tearDown(self):
+        self.patcher.stop()
+        shutil.rmtree(self.temp_dir)
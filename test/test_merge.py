@@ -0,0 +1,51 @@
+import json
+from pathlib import Path
+import shutil
+import unittest
+
+import pandas as pd
+import pyarrow.parquet as pq
+
+from test import native_biotools
+
+
+class TestMerge(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.temp_result_dir = Path("test/temp_result/")
+        bt = native_biotools("test/fixture/biotope.shp", cls.temp_result_dir)
+        cls.h1_csv = Path(bt.run_h1()).with_suffix(".csv")
+        cls.h3_csv = Path(bt.run_h3()).with_suffix(".csv")
+        cls.parquet = Path(bt.merge(shapefile=True))
+
+    def test_columns(self):
+        result = pd.read_parquet(self.parquet)
+        self.assertListEqual(
+            result.columns.tolist(),
+            ["BT_ID", "비오톱", "Area", "H1_HECTARE", "H1_RESULT", "H3_AREA"]
+            + ["H3_RESULT", "geometry"],
+        )
+
+    def test_values(self):
+        result = pd.read_parquet(self.parquet)
+        for csv in [self.h1_csv, self.h3_csv]:
+            answer = pd.read_csv(csv, encoding="euc-kr")
+            pd.testing.assert_frame_equal(
+                result[answer.columns], answer, check_dtype=False
+            )
+
+    def test_geoparquet_metadata(self):
+        metadata = json.loads(pq.read_schema(self.parquet).metadata[b"geo"])
+        self.assertEqual(metadata["primary_column"], "geometry")
+        self.assertDictEqual(
+            metadata["columns"]["geometry"],
+            {"encoding": "WKB", "geometry_types": ["Polygon"]},
+        )
+
+    def test_shapefile(self):
+        self.assertTrue(self.parquet.with_suffix(".shp").exists())
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.temp_result_dir)
+
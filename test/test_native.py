@@ -0,0 +1,143 @@
+from pathlib import Path
+import shutil
+import unittest
+
+import pandas as pd
+
+from test import COMMERCIAL_INPUTS, KEYSTONE_INPUTS, SURVEY_INPUTS, native_biotools
+
+
+class NativeTestCase(unittest.TestCase):
+    """Checks parity of native backend with the answers made by arcpy backend."""
+
+    tag = None
+    biotope = None
+    inputs = {}
+    arguments = {}
+    tolerances = {}
+    requires_java = False
+
+    @classmethod
+    def setUpClass(cls):
+        if cls.tag is None:
+            raise unittest.SkipTest("base class")
+        if cls.requires_java and shutil.which("java") is None:
+            raise unittest.SkipTest("java is required for maxent")
+
+        cls.temp_result_dir = Path("test/temp_result/")
+        cls.bt = native_biotools(
+            f"test/fixture/{cls.biotope}.shp", cls.temp_result_dir, **cls.inputs
+        )
+        getattr(cls.bt, f"run_{cls.tag}")(**cls.arguments)
+
+        stem = f"{cls.biotope}_WGS_{cls.tag}"
+        cls.shp = cls.temp_result_dir / f"result_{cls.tag}/{stem}.shp"
+        cls.csv = cls.temp_result_dir / f"result_{cls.tag}/{stem}.csv"
+        cls.answer_csv = f"test/answer/result_{cls.tag}/{stem}.csv"
+
+    def test_shp_exists(self):
+        self.assertTrue(self.shp.exists())
+
+    def test_csv_correct(self):
+        result = pd.read_csv(self.csv)
+        answer = pd.read_csv(self.answer_csv)
+        self.assertListEqual(result.columns.tolist(), answer.columns.tolist())
+        self.assertListEqual(result["BT_ID"].tolist(), answer["BT_ID"].tolist())
+        for column, atol in self.tolerances.items():
+            pd.testing.assert_series_equal(
+                result[column], answer[column], check_exact=False, atol=atol
+            )
+
+    @classmethod
+    def tearDownClass(cls):
+        if hasattr(cls, "temp_result_dir"):
+            shutil.rmtree(cls.temp_result_dir)
+
+
+class TestH1(NativeTestCase):
+    tag = "h1"
+    biotope = "biotope"
+    tolerances = {"H1_HECTARE": 1e-6, "H1_RESULT": 0}
+
+
+class TestH3(NativeTestCase):
+    tag = "h3"
+    biotope = "biotope"
+    tolerances = {"H3_AREA": 10, "H3_RESULT": 0.05}  # buffer segmentation differs
+
+
+class TestH4(NativeTestCase):
+    tag = "h4"
+    biotope = "biotope"
+    inputs = KEYSTONE_INPUTS
+    tolerances = {"H4_COUNT": 0, "H4_MEAN": 1e-6, "H4_RESULT": 1e-6}
+    requires_java = True
+
+
+class TestH5(NativeTestCase):
+    tag = "h5"
+    biotope = "biotope"
+    inputs = COMMERCIAL_INPUTS
+    tolerances = {"H5_MIN": 5, "H5_RESULT": 0.02}  # within a cell
+
+
+class TestH6(NativeTestCase):
+    tag = "h6"
+    biotope = "biotope2"
+    inputs = KEYSTONE_INPUTS
+    arguments = {"threshold": 0.936}
+    tolerances = {"H6_COUNT": 0, "H6_MIN": 1e-3, "H6_RESULT": 1e-6}
+    requires_java = True
+
+
+class TestF1(NativeTestCase):
+    tag = "f1"
+    biotope = "biotope3"
+    inputs = SURVEY_INPUTS
+    tolerances = {"F1_PREY_N": 0, "F1_TOTAL_N": 0, "F1_RESULT": 1e-9}
+
+
+class TestF2(NativeTestCase):
+    tag = "f2"
+    biotope = "biotope3"
+    inputs = SURVEY_INPUTS
+    tolerances = {"F2_COUNT": 0, "F2_SHANNON": 1e-9, "F2_RESULT": 1e-9}
+
+
+class TestF3(NativeTestCase):
+    tag = "f3"
+    biotope = "biotope3"
+    inputs = SURVEY_INPUTS
+    tolerances = {"F3_D1_N": 0, "F3_D2_N": 0, "F3_D3_N": 0, "F3_RESULT": 0}
+
+
+class TestF4(NativeTestCase):
+    tag = "f4"
+    biotope = "biotope3"
+    inputs = SURVEY_INPUTS
+    tolerances = {"F4_PREY_N": 0, "F4_RESULT": 0}
+
+
+class TestF5(NativeTestCase):
+    tag = "f5"
+    biotope = "biotope3"
+    inputs = SURVEY_INPUTS
+    tolerances = {
+        "F5_ALIEN_N": 0,
+        "F5_ALT_N": 0,
+        "F5_NORM_N": 0,
+        "F5_THRT_N": 0,
+        "F5_RESULT": 0,
+    }
+
+
+class TestF6(NativeTestCase):
+    tag = "f6"
+    biotope = "biotope3"
+    inputs = {
+        "environmentallayer_directory": "test/fixture/envlayer/",
+        "surveypoint_shp": "test/fixture/survey_point.shp",
+        "foodchain_info_csv": "test/fixture/foodchain_info2.csv",
+    }
+    tolerances = {"F6_COUNT": 0, "F6_RESULT": 1e-6}
+    requires_java = True
@@ -0,0 +1,38 @@
+from pathlib import Path
+import shutil
+import unittest
+
+import pandas as pd
+
+from test import COMMERCIAL_INPUTS, native_biotools
+
+
+class TestH5Vector(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.temp_result_dir = Path("test/temp_result/")
+        bt = native_biotools(
+            "test/fixture/biotope.shp", cls.temp_result_dir, **COMMERCIAL_INPUTS
+        )
+        cls.result = pd.read_csv(
+            Path(bt.run_h5(method="vector")).with_suffix(".csv")
+        )
+        cls.answer = pd.read_csv("test/answer/result_h5/biotope_WGS_h5.csv")
+
+    def test_columns(self):
+        self.assertListEqual(
+            self.result.columns.tolist(),
+            [*self.answer.columns.drop(["H5_COUNT", "H5_AREA"])],
+        )
+
+    def test_within_a_cell_of_raster(self):
+        pd.testing.assert_series_equal(
+            self.result["H5_MIN"], self.answer["H5_MIN"], atol=5 * 2**0.5
+        )
+
+    def test_no_distance_is_skipped(self):
+        self.assertFalse(self.result["H5_MIN"].isna().any())
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.temp_result_dir)
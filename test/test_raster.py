@@ -0,0 +1,69 @@
+from pathlib import Path
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from biotools import raster
+
+
+ASC = """ncols 3
+nrows 2
+xllcorner 10
+yllcorner 20
+cellsize 5
+NODATA_value -9999
+1 2 -9999
+4 5 6
+"""
+
+
+class TestReadAsc(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.asc = Path(self.temp_dir.name) / "layer.asc"
+        self.asc.write_text(ASC)
+
+    def test_read(self):
+        grid = raster.read_asc(self.asc, cache=False)
+        self.assertEqual(grid.extent, (10, 20, 25, 30))
+        self.assertTrue(np.isnan(grid.array[0, 2]))
+        self.assertEqual(grid.array[1, 0], 4)
+        self.assertFalse((self.asc.parent / raster.CACHE_DIRECTORY).exists())
+
+    def test_cache(self):
+        first = raster.read_asc(self.asc)
+        second = raster.read_asc(self.asc)
+        self.assertIsInstance(second.array, np.memmap)
+        np.testing.assert_array_equal(first.array, second.array)
+
+    def test_stale_cache(self):
+        raster.read_asc(self.asc)
+        self.asc.write_text(ASC.replace("4 5 6", "7 8 9"))
+        os.utime(self.asc, ns=(2**62, 2**62))
+        self.assertEqual(raster.read_asc(self.asc).array[1, 0], 7)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+
+class TestCombine(unittest.TestCase):
+    def setUp(self):
+        self.arrays = [
+            np.array([[0.5, np.nan], [1.0, 0.0]], dtype=np.float32),
+            np.array([[0.5, 0.2], [0.3, np.nan]], dtype=np.float32),
+        ]
+
+    def test_any(self):
+        result = raster.combine_any(self.arrays, block_rows=1)
+        np.testing.assert_allclose(result, [[0.75, np.nan], [1.0, np.nan]])
+
+    def test_any_many(self):
+        arrays = [np.full((2, 2), 0.01, dtype=np.float32)] * 5000
+        result = raster.combine_any(arrays)
+        np.testing.assert_allclose(result, 1 - 0.99**5000, rtol=1e-6)
+
+    def test_mean(self):
+        result = raster.combine_mean(self.arrays, block_rows=1)
+        np.testing.assert_allclose(result, [[0.5, 0.2], [0.65, 0.0]], rtol=1e-6)
@@ -0,0 +1,144 @@
+from pathlib import Path
+import shutil
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+import pandas as pd
+
+from biotools.scheduler import Task, run_tasks
+from test import SURVEY_INPUTS, native_biotools
+
+
+class TestRunTasks(unittest.TestCase):
+    def test_dependency_order(self):
+        finished = []
+
+        def task(name):
+            def function():
+                finished.append(name)
+                return name.upper()
+
+            return function
+
+        results = run_tasks(
+            {
+                "c": Task(task("c"), ["a", "b"]),
+                "a": Task(task("a")),
+                "b": Task(task("b"), ["a"]),
+            },
+            workers=3,
+        )
+        self.assertDictEqual(results, {"a": "A", "b": "B", "c": "C"})
+        self.assertListEqual(finished, ["a", "b", "c"])
+
+    def test_independent_tasks_run_together(self):
+        barrier = threading.Barrier(2, timeout=5)
+        results = run_tasks(
+            {"a": Task(barrier.wait), "b": Task(barrier.wait)}, workers=2
+        )
+        self.assertSetEqual(set(results.values()), {0, 1})
+
+    def test_failure(self):
+        def fail():
+            raise RuntimeError("failed")
+
+        finished = []
+        with self.assertRaisesRegex(RuntimeError, "failed"):
+            run_tasks(
+                {"a": Task(fail), "b": Task(lambda: finished.append("b"), ["a"])}
+            )
+        self.assertListEqual(finished, [])
+
+    def test_invalid_dependencies(self):
+        with self.assertRaises(ValueError):
+            run_tasks({"a": Task(print, ["z"])})
+        with self.assertRaises(ValueError):
+            run_tasks({"a": Task(print, ["b"]), "b": Task(print, ["a"])})
+
+
+class TestRunAll(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.temp_result_dir = Path("test/temp_result/")
+        cls.bt = native_biotools(
+            "test/fixture/biotope3.shp", cls.temp_result_dir, **SURVEY_INPUTS
+        )
+        with mock.patch.object(
+            cls.bt._gis, "locate_points", wraps=cls.bt._gis.locate_points
+        ) as locate_points:
+            cls.result_shps = cls.bt.run_all(workers=4)
+        cls.locate_count = locate_points.call_count
+
+    def test_runnable_indicators(self):
+        self.assertListEqual(
+            list(self.result_shps), ["h1", "h2", "h3", "f1", "f2", "f3", "f4", "f5"]
+        )
+
+    def test_surveypoint_enriched_once(self):
+        self.assertEqual(self.locate_count, 1)
+
+    def test_csv_correct(self):
+        for tag in ["f1", "f2", "f3", "f4", "f5"]:
+            result = pd.read_csv(Path(self.result_shps[tag]).with_suffix(".csv"))
+            answer = pd.read_csv(f"test/answer/result_{tag}/biotope3_WGS_{tag}.csv")
+            pd.testing.assert_frame_equal(result, answer, check_exact=False)
+
+    def test_missing_inputs(self):
+        with self.assertRaises(ValueError):
+            self.bt.run_all(["h5"])
+
+    def test_surveypoint_locked(self):
+        with tempfile.TemporaryDirectory() as result_dir:
+            bt = native_biotools(
+                "test/fixture/biotope3.shp", result_dir, **SURVEY_INPUTS
+            )
+            bt._gis_lock = threading.Lock()  # as with the arcpy backend
+            locate_points = bt._gis.locate_points
+
+            def locked_locate_points(*args, **kwargs):
+                self.assertTrue(bt._gis_lock.locked())
+                return locate_points(*args, **kwargs)
+
+            with mock.patch.object(
+                bt._gis, "locate_points", side_effect=locked_locate_points
+            ) as spy:
+                bt.run_all(["f1"])
+        self.assertEqual(spy.call_count, 1)
+
+    def test_surveypoint_by_skip_noname(self):
+        with tempfile.TemporaryDirectory() as result_dir:
+            bt = native_biotools(
+                "test/fixture/biotope3.shp", result_dir, **SURVEY_INPUTS
+            )
+            with mock.patch.object(
+                bt._gis, "locate_points", wraps=bt._gis.locate_points
+            ) as locate_points:
+                bt.run_all(
+                    ["f1", "f2", "f3"], arguments={"f2": {"skip_noname": False}}
+                )
+        self.assertEqual(locate_points.call_count, 2)
+
+    def test_maxent_unlocked(self):
+        with tempfile.TemporaryDirectory() as result_dir:
+            bt = native_biotools(
+                "test/fixture/biotope3.shp",
+                result_dir,
+                environmentallayer_directory="test/fixture/envlayer/",
+                **SURVEY_INPUTS,
+            )
+            bt._gis_lock = threading.Lock()  # as with the arcpy backend
+            locked = []
+
+            def fake_maxent(*args, **kwargs):
+                locked.append(bt._gis_lock.locked())
+                return [str(path) for path in Path(args[1]).glob("*.asc")]
+
+            with mock.patch("biotools.maxent.run_maxent", side_effect=fake_maxent):
+                bt.run_all(["f6"])
+        self.assertListEqual(locked, [False, True])  # the second one is cached
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.temp_result_dir)
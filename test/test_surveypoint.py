@@ -0,0 +1,63 @@
+import os
+from pathlib import Path
+import shutil
+import unittest
+from unittest import mock
+
+import pandas as pd
+
+from test import SURVEY_INPUTS, native_biotools
+
+
+class TestSurveypointCache(unittest.TestCase):
+    def setUp(self):
+        self.temp_result_dir = Path("test/temp_result/")
+        self.foodchain_info_csv = self.temp_result_dir / "foodchain_info.csv"
+        self.temp_result_dir.mkdir(parents=True, exist_ok=True)
+        shutil.copyfile(SURVEY_INPUTS["foodchain_info_csv"], self.foodchain_info_csv)
+        self.bt = native_biotools(
+            "test/fixture/biotope3.shp",
+            self.temp_result_dir,
+            surveypoint_shp=SURVEY_INPUTS["surveypoint_shp"],
+            foodchain_info_csv=self.foodchain_info_csv,
+        )
+
+    def test_spatial_join_once(self):
+        with mock.patch.object(
+            self.bt._gis, "locate_points", wraps=self.bt._gis.locate_points
+        ) as spatial_join:
+            for tag in ["f1", "f2", "f3", "f4", "f5"]:
+                getattr(self.bt, f"run_{tag}")()
+            self.assertEqual(spatial_join.call_count, 1)
+
+            self.bt.run_f1(skip_noname=False)
+            self.assertEqual(spatial_join.call_count, 2)
+            self.bt.run_f2()  # each skip_noname is kept
+            self.assertEqual(spatial_join.call_count, 2)
+
+            os.utime(self.foodchain_info_csv, ns=(0, 0))  # input changed
+            self.bt.run_f1(skip_noname=False)
+            self.assertEqual(spatial_join.call_count, 3)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_result_dir)
+
+
+class TestFoodchainAll(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.temp_result_dir = Path("test/temp_result/")
+        cls.bt = native_biotools(
+            "test/fixture/biotope3.shp", cls.temp_result_dir, **SURVEY_INPUTS
+        )
+        cls.result_shps = cls.bt.evaluate_foodchain_all()
+
+    def test_csv_correct(self):
+        for i, shp in enumerate(self.result_shps, start=1):
+            result = pd.read_csv(Path(shp).with_suffix(".csv"))
+            answer = pd.read_csv(f"test/answer/result_f{i}/biotope3_WGS_f{i}.csv")
+            pd.testing.assert_frame_equal(result, answer, check_exact=False)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.temp_result_dir)
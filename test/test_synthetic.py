@@ -0,0 +1,96 @@
+from pathlib import Path
+import shutil
+import unittest
+
+import numpy as np
+import pandas as pd
+import shapely
+
+from biotools import Biotools, benchmark, codes, dbf, geoutils, synthetic
+
+
+class TestGenerate(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.temp_dir = Path("test/temp_synthetic/")
+        cls.inputs = synthetic.generate(cls.temp_dir / "inputs", 500, seed=1)
+
+    def test_biotope_map(self):
+        geometries = geoutils.read_geometries(self.inputs.biotope_shp)
+        self.assertEqual(len(geometries), 500)
+        self.assertTrue(shapely.is_valid(geometries).all())
+        biotope_df = dbf.read_dbf(self.inputs.biotope_shp)
+        np.testing.assert_allclose(biotope_df["Area"], shapely.area(geometries))
+        classification = codes.ClassificationIndex(biotope_df["비오톱"].to_numpy())
+        self.assertDictEqual(classification.unknown_codes, {})
+
+    def test_biotopes_share_edges(self):
+        geometries = geoutils.read_geometries(self.inputs.biotope_shp)
+        self.assertAlmostEqual(
+            shapely.union_all(geometries).area, shapely.area(geometries).sum()
+        )
+        self.assertTrue(shapely.touches(geometries[0], geometries[1]))
+
+    def test_same_seed_same_inputs(self):
+        inputs = synthetic.generate(self.temp_dir / "again", 500, seed=1)
+        for name in ["biotope.shp", "biotope.dbf", "foodchain_info.csv"]:
+            self.assertEqual(
+                (self.temp_dir / "again" / name).read_bytes(),
+                (self.temp_dir / "inputs" / name).read_bytes(),
+            )
+
+    def test_surveyed_species_have_foodchain_info(self):
+        surveypoint_df = geoutils.shp_to_df(self.inputs.surveypoint_shp, ["국명"])
+        info_df = pd.read_csv(self.inputs.foodchain_info_csv, encoding="euc-kr")
+        names = set(surveypoint_df["국명"]) - {""}
+        self.assertTrue(names <= set(info_df["S_Name"]))
+
+    def test_indicators_run(self):
+        bt = Biotools(
+            self.inputs.biotope_shp,
+            self.temp_dir / "result",
+            backend="native",
+            **self.inputs.arguments,
+        )
+        for tag in ["h1", "h3", "h5", "f1"]:
+            result_df = geoutils.shp_to_df(getattr(bt, f"run_{tag}")())
+            self.assertEqual(len(result_df), 500)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.temp_dir)
+
+
+class TestBenchmark(unittest.TestCase):
+    def test_run_benchmark(self):
+        temp_dir = Path("test/temp_benchmark/")
+        self.addCleanup(shutil.rmtree, temp_dir)
+        result_df = benchmark.run_benchmark(
+            temp_dir, [100, 400], ["h1"], trace_memory=True
+        )
+        self.assertListEqual(result_df["polygons"].tolist(), [100, 400])
+        columns = ["seconds", "peak_mb", "traced_mb"]
+        self.assertTrue((result_df[columns] > 0).all().all())
+        # resident memory includes what tracemalloc cannot see
+        self.assertTrue((result_df["peak_mb"] > result_df["traced_mb"]).all())
+        self.assertFalse(benchmark.scaling_exponents(result_df).isna().any())
+
+    def test_scaling_exponents(self):
+        result_df = pd.DataFrame(
+            {
+                "polygons": [10, 100, 1000] * 2,
+                "tag": ["h1"] * 3 + ["h3"] * 3,
+                "seconds": [1, 10, 100, 1, 100, 10000],
+            }
+        )
+        exponents = benchmark.scaling_exponents(result_df)
+        self.assertAlmostEqual(exponents["h1"], 1)
+        self.assertAlmostEqual(exponents["h3"], 2)
+
+    def test_compare(self):
+        baseline_df = pd.DataFrame(
+            {"polygons": [10, 10], "tag": ["h1", "h3"], "seconds": [1, 1]}
+        ).assign(peak_mb=5.0)
+        result_df = baseline_df.assign(seconds=[1.2, 3])
+        compared_df = benchmark.compare(result_df, baseline_df, tolerance=1.5)
+        self.assertListEqual(compared_df["regressed"].tolist(), [False, True])
@@ -0,0 +1,93 @@
+from pathlib import Path
+import shutil
+import unittest
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+from biotools import Biotools, dbf, geoutils, tablecache
+from biotools.tablecache import TableCache
+
+
+class TestTableCache(unittest.TestCase):
+    def test_least_recently_used_is_evicted(self):
+        cache = TableCache(max_bytes=2000)
+        for key in ["a", "b"]:
+            cache.get(key, lambda: np.zeros(100))  # 800 bytes each
+        cache.get("a", mock.Mock())
+        cache.get("c", lambda: np.zeros(100))
+        self.assertEqual(cache.nbytes, 1600)
+
+        load = mock.Mock(return_value=np.zeros(100))
+        cache.get("a", load)
+        cache.get("b", load)
+        self.assertEqual(load.call_count, 1)  # only "b" was evicted
+
+        cache.max_bytes = 1000
+        self.assertEqual(cache.nbytes, 800)
+
+    def test_arrays_are_read_only(self):
+        array = TableCache().get("a", lambda: np.zeros(3))
+        with self.assertRaises(ValueError):
+            array[0] = 1
+
+    def test_read_dbf(self):
+        cache = TableCache()
+        shp = "test/fixture/biotope.shp"
+        with mock.patch.object(dbf, "read_dbf", wraps=dbf.read_dbf) as read_dbf:
+            cache.read_dbf(shp, ["비오톱"])
+            result_df = cache.read_dbf(shp, ["Area", "비오톱"])
+            cache.read_dbf(shp, ["비오톱", "Area"])
+        self.assertListEqual(
+            [call.args[1] for call in read_dbf.call_args_list], [["비오톱"], ["Area"]]
+        )
+        pd.testing.assert_frame_equal(result_df, dbf.read_dbf(shp, ["Area", "비오톱"]))
+
+
+class TestSession(unittest.TestCase):
+    def setUp(self):
+        tablecache.SESSION.clear()
+
+    def test_biotope_map_decoded_once(self):
+        temp_result_dir = Path("test/temp_result/")
+        bt = Biotools(
+            "test/fixture/biotope.shp",
+            temp_result_dir,
+            commercialpoint_csv="test/fixture/commercialpoint.csv",
+            backend="native",
+        )
+        self.addCleanup(shutil.rmtree, temp_result_dir)
+        with mock.patch.object(
+            geoutils, "_decode_geometries", wraps=geoutils._decode_geometries
+        ) as decode, mock.patch.object(
+            dbf, "read_dbf", wraps=dbf.read_dbf
+        ) as read_dbf:
+            for tag in ["h1", "h2", "h3", "h5"]:
+                getattr(bt, f"run_{tag}")()
+            bt.run_h3(method="raster")
+            bt.merge()
+        biotope_shp = str(bt._biotope_wgs_shp)
+        self.assertListEqual(
+            [str(call.args[0]) for call in decode.call_args_list], [biotope_shp]
+        )
+        biotope_reads = [
+            call.args[1]
+            for call in read_dbf.call_args_list
+            if call.args[0] == biotope_shp
+        ]
+        self.assertListEqual(biotope_reads, [["BT_ID"]])
+
+    def test_changed_file_is_decoded_again(self):
+        temp_dir = Path("test/temp_tablecache/")
+        temp_dir.mkdir()
+        self.addCleanup(shutil.rmtree, temp_dir)
+        for path in Path("test/fixture").glob("biotope.*"):
+            shutil.copy(path, temp_dir)
+        shp = temp_dir / "biotope.shp"
+
+        before = geoutils.shp_to_df(shp, ["Area"])
+        table_df = dbf.read_dbf(shp).assign(Area=lambda x: x["Area"] * 2)
+        dbf.write_dbf(shp, table_df, dbf.get_encoding(shp))
+        after = geoutils.shp_to_df(shp, ["Area"])
+        pd.testing.assert_series_equal(after["Area"], before["Area"] * 2)
@@ -0,0 +1,54 @@
+import unittest
+from unittest import mock
+
+import numpy as np
+
+from biotools import geoutils, tablecache, zonal
+from biotools.raster import read_asc
+
+
+class TestSummarize(unittest.TestCase):
+    def test_statistics(self):
+        zone = np.array([[0, 0, 1], [-1, 1, 1]])
+        array = np.array([[1.0, 3.0, np.nan], [9.0, 4.0, 6.0]])
+        result_df = zonal.summarize(zone, array, 2, 3)
+        self.assertListEqual(result_df.index.tolist(), [0, 1])
+        self.assertListEqual(result_df["COUNT"].tolist(), [2, 2])
+        self.assertListEqual(result_df["AREA"].tolist(), [8, 8])
+        self.assertListEqual(result_df["MIN"].tolist(), [1, 4])
+        self.assertListEqual(result_df["MAX"].tolist(), [3, 6])
+        self.assertListEqual(result_df["MEAN"].tolist(), [2, 5])
+        self.assertListEqual(result_df["SUM"].tolist(), [4, 10])
+
+    def test_unknown_statistics(self):
+        with self.assertRaises(ValueError):
+            zonal.summarize(np.zeros(1, int), np.zeros(1), 1, 1, ["RANGE"])
+
+
+class TestZoneRaster(unittest.TestCase):
+    def test_rasterize_once(self):
+        tablecache.SESSION.clear()
+        grid = read_asc("test/fixture/envlayer/SuwonGreen.asc", cache=False)
+        biotope_shp = "test/answer/result_h1/biotope_WGS_h1.shp"
+        with mock.patch.object(geoutils, "rasterize", wraps=geoutils.rasterize) as rasterize:
+            minimum_df = geoutils.zonal_statistics(
+                biotope_shp, grid.with_array(grid.array + 1), "MINIMUM"
+            )
+            all_df = geoutils.zonal_statistics(
+                biotope_shp, grid.with_array(grid.array * 0 + 2), "ALL"
+            )
+        self.assertEqual(rasterize.call_count, 1)
+        self.assertGreater(len(all_df), 0)
+        self.assertListEqual(minimum_df["BT_ID"].tolist(), all_df["BT_ID"].tolist())
+
+    def test_bounded_by_bytes(self):
+        grid = read_asc("test/fixture/envlayer/SuwonGreen.asc", cache=False)
+        biotope_shp = "test/answer/result_h1/biotope_WGS_h1.shp"
+        max_bytes = tablecache.SESSION.max_bytes
+        tablecache.SESSION.clear()
+        try:
+            tablecache.SESSION.max_bytes = grid.array.size * 4 - 1
+            geoutils.zonal_statistics(biotope_shp, grid, "MEAN")
+            self.assertLess(tablecache.SESSION.nbytes, grid.array.size * 4)
+        finally:
+            tablecache.SESSION.max_bytes = max_bytes